@@ -0,0 +1,118 @@
+"""Справочник городов
+
+Revision ID: 2e6d9b4f7a13
+Revises: 7c4e1f9a2d35
+Create Date: 2026-10-17 23:48:12.306214
+
+"""
+import difflib
+import re
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e6d9b4f7a13'
+down_revision: Union[str, None] = '7c4e1f9a2d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Города из handlers/enums/cities.py на момент миграции
+BASE_CITIES = ["Челябинск", "Копейск", "Миасс", "Чебаркуль", "Сатка", "Златоуст", "Магнитогорск", "Коркино"]
+# Та же граница похожести, что CITY_TYPO_CUTOFF по умолчанию в database/city_registry.py
+TYPO_CUTOFF = 0.85
+
+
+def _normalize(city):
+    # Копия database.city_registry.normalize_city: миграция не должна зависеть от кода приложения
+    key = (city or "").strip().casefold().replace("ё", "е")
+    key = re.sub(r"^(г\.|г |город )", "", key).strip()
+    return re.sub(r"[\s\-]+", " ", key)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cities',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'city_aliases',
+        sa.Column('alias', sa.Text(), nullable=False),
+        sa.Column('city_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['city_id'], ['cities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('alias'),
+    )
+    op.create_index('ix_city_aliases_city_id', 'city_aliases', ['city_id'])
+
+    op.add_column('users', sa.Column('city_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False))
+    op.add_column('group_profiles', sa.Column('city_id', sa.Integer(), nullable=True))
+
+    # Сопоставление написаний с опечатками делается в Python, поэтому нужна живая БД (не --sql)
+    if not context.is_offline_mode():
+        _fill_city_ids(op.get_bind())
+
+    op.create_index('ix_users_city_ids', 'users', ['city_ids'], postgresql_using='gin')
+    op.create_index('ix_group_profiles_city_id', 'group_profiles', ['city_id'])
+
+
+def _fill_city_ids(bind) -> None:
+    aliases = {}
+
+    def resolve(city):
+        key = _normalize(city)
+        if not key:
+            return None
+        if key not in aliases:
+            match = difflib.get_close_matches(key, aliases.keys(), n=1, cutoff=TYPO_CUTOFF)
+            if match:
+                city_id = aliases[match[0]]
+            else:
+                city_id = bind.execute(
+                    sa.text("INSERT INTO cities (name) VALUES (:name) RETURNING id"), {"name": city.strip()}
+                ).scalar_one()
+            bind.execute(
+                sa.text("INSERT INTO city_aliases (alias, city_id) VALUES (:alias, :city_id)"),
+                {"alias": key, "city_id": city_id},
+            )
+            aliases[key] = city_id
+        return aliases[key]
+
+    for city in BASE_CITIES:
+        resolve(city)
+
+    # Текст города в анкетах не трогаем — только проставляем id по справочнику
+    user_cities = bind.execute(sa.text("SELECT DISTINCT city FROM users WHERE city IS NOT NULL")).scalars().all()
+    for city in user_cities:
+        city_ids = list(dict.fromkeys(
+            city_id for city_id in (resolve(part) for part in city.split(",")) if city_id is not None
+        ))
+        if city_ids:
+            bind.execute(
+                sa.text("UPDATE users SET city_ids = :city_ids WHERE city = :city"),
+                {"city_ids": city_ids, "city": city},
+            )
+
+    group_cities = bind.execute(sa.text("SELECT DISTINCT city FROM group_profiles WHERE city IS NOT NULL")).scalars().all()
+    for city in group_cities:
+        city_id = resolve(city)
+        if city_id is not None:
+            bind.execute(
+                sa.text("UPDATE group_profiles SET city_id = :city_id WHERE city = :city"),
+                {"city_id": city_id, "city": city},
+            )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_group_profiles_city_id', table_name='group_profiles')
+    op.drop_index('ix_users_city_ids', table_name='users')
+    op.drop_column('group_profiles', 'city_id')
+    op.drop_column('users', 'city_ids')
+    op.drop_index('ix_city_aliases_city_id', table_name='city_aliases')
+    op.drop_table('city_aliases')
+    op.drop_table('cities')
@@ -0,0 +1,28 @@
+"""Версии анкет для кэша карточек
+
+Revision ID: 3f9c2d7a1b84
+Revises: e4a7b9d2c615
+Create Date: 2026-10-17 16:22:08.114305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7a1b84'
+down_revision: Union[str, None] = 'e4a7b9d2c615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('group_profiles', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('group_profiles', 'version')
+    op.drop_column('users', 'version')
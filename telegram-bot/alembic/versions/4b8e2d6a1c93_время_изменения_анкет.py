@@ -0,0 +1,44 @@
+"""Время изменения анкет
+
+Revision ID: 4b8e2d6a1c93
+Revises: 9a5f3c1e8d47
+Create Date: 2026-10-18 10:12:40.218733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e2d6a1c93'
+down_revision: Union[str, None] = '9a5f3c1e8d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_users_updated_at', 'users', ['updated_at'])
+
+    # Бот ставит updated_at сам (onupdate в модели), триггер нужен для правок из Go-бэкенда
+    op.execute("""
+        CREATE FUNCTION users_set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER users_set_updated_at BEFORE UPDATE ON users
+        FOR EACH ROW EXECUTE FUNCTION users_set_updated_at()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER users_set_updated_at ON users")
+    op.execute("DROP FUNCTION users_set_updated_at()")
+    op.drop_index('ix_users_updated_at', table_name='users')
+    op.drop_column('users', 'updated_at')
@@ -0,0 +1,68 @@
+"""Индексы для ленты анкет, лайков и мэтчей
+
+Revision ID: 5d1e8a4c9b2f
+Revises: cfbf1776c075
+Create Date: 2026-10-17 12:40:15.502114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1e8a4c9b2f'
+down_revision: Union[str, None] = 'cfbf1776c075'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, колонки, параметры)
+INDEXES = [
+    ('idx_unique_swipe', 'user_likes_user', ['swiper_user_id', 'target_user_id'], {'unique': True}),
+    ('ix_user_likes_user_target_action', 'user_likes_user', ['target_user_id', 'action'],
+     {'postgresql_include': ['swiper_user_id']}),
+    ('ux_user_likes_group_swiper_target', 'user_likes_group', ['swiper_user_id', 'target_group_id'], {'unique': True}),
+    ('ix_instruments_user_id', 'instruments', ['user_id'], {}),
+    ('ix_user_genres_name_user_id', 'user_genres', ['name', 'user_id'], {}),
+    ('ix_group_genres_group_id', 'group_genres', ['group_id'], {}),
+    ('ix_group_genres_name_group_id', 'group_genres', ['name', 'group_id'], {}),
+    ('ix_group_members_user_id', 'group_members', ['user_id'], {}),
+    ('ix_users_visible_age', 'users', ['age'], {'postgresql_where': sa.text('is_visible')}),
+    ('ix_group_profiles_visible', 'group_profiles', ['id'], {'postgresql_where': sa.text('is_visible')}),
+]
+
+
+def upgrade() -> None:
+    # Перед уникальными индексами убираем дубли свайпов: от пары остается лайк, если он был,
+    # иначе самый поздний свайп — лайк, поставленный после пропуска, не теряется
+    for table, target in (('user_likes_user', 'target_user_id'), ('user_likes_group', 'target_group_id')):
+        op.execute(f"""
+            DELETE FROM {table}
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY swiper_user_id, {target}
+                        ORDER BY (action = 'LIKE') IS TRUE DESC, id DESC
+                    ) AS rank
+                    FROM {table}
+                ) ranked
+                WHERE rank > 1
+            )
+        """)
+
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            # idx_unique_swipe уже может быть создан init.sql Go-бэкенда
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True, **kwargs)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            if name == 'idx_unique_swipe':
+                # Принадлежит init.sql Go-бэкенда
+                continue
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
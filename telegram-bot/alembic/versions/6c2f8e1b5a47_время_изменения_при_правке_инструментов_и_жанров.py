@@ -0,0 +1,49 @@
+"""Время изменения анкеты при правке инструментов и жанров
+
+Revision ID: 6c2f8e1b5a47
+Revises: 4b8e2d6a1c93
+Create Date: 2026-10-18 14:02:51.640318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2f8e1b5a47'
+down_revision: Union[str, None] = '4b8e2d6a1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Дочерние таблицы анкеты, которые Go-бэкенд правит напрямую, не трогая users
+CHILD_TABLES = ['instruments', 'user_genres']
+
+
+def upgrade() -> None:
+    # Синхронизация индекса фильтров ищет изменения по users.updated_at — правка инструментов
+    # (в том числе уровня владения) и жанров тоже должна его сдвигать
+    op.execute("""
+        CREATE FUNCTION touch_user_updated_at() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE users SET updated_at = now() WHERE id = OLD.user_id;
+            END IF;
+            IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+                UPDATE users SET updated_at = now() WHERE id = NEW.user_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in CHILD_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_touch_user_updated_at AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION touch_user_updated_at()
+        """)
+
+
+def downgrade() -> None:
+    for table in reversed(CHILD_TABLES):
+        op.execute(f"DROP TRIGGER {table}_touch_user_updated_at ON {table}")
+    op.execute("DROP FUNCTION touch_user_updated_at()")
@@ -0,0 +1,55 @@
+"""Массивы жанров и инструментов в анкетах
+
+Revision ID: 7c4e1f9a2d35
+Revises: 3f9c2d7a1b84
+Create Date: 2026-10-17 23:05:41.528017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e1f9a2d35'
+down_revision: Union[str, None] = '3f9c2d7a1b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('genre_names', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False))
+    op.add_column('users', sa.Column('instrument_names', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False))
+    op.add_column('group_profiles', sa.Column('genre_names', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False))
+
+    # Заполняем из дочерних таблиц в порядке добавления — так же их показывают карточки
+    op.execute("""
+        UPDATE users u SET genre_names = g.names
+        FROM (SELECT user_id, array_agg(name ORDER BY id) AS names FROM user_genres GROUP BY user_id) g
+        WHERE g.user_id = u.id
+    """)
+    op.execute("""
+        UPDATE users u SET instrument_names = i.names
+        FROM (SELECT user_id, array_agg(name ORDER BY id) AS names FROM instruments GROUP BY user_id) i
+        WHERE i.user_id = u.id
+    """)
+    op.execute("""
+        UPDATE group_profiles p SET genre_names = g.names
+        FROM (SELECT group_id, array_agg(name ORDER BY id) AS names FROM group_genres GROUP BY group_id) g
+        WHERE g.group_id = p.id
+    """)
+
+    op.create_index('ix_users_genre_names', 'users', ['genre_names'], postgresql_using='gin')
+    op.create_index('ix_users_instrument_names', 'users', ['instrument_names'], postgresql_using='gin')
+    op.create_index('ix_group_profiles_genre_names', 'group_profiles', ['genre_names'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_group_profiles_genre_names', table_name='group_profiles')
+    op.drop_index('ix_users_instrument_names', table_name='users')
+    op.drop_index('ix_users_genre_names', table_name='users')
+    op.drop_column('group_profiles', 'genre_names')
+    op.drop_column('users', 'instrument_names')
+    op.drop_column('users', 'genre_names')
@@ -0,0 +1,48 @@
+"""Таблица взаимных лайков (мэтчей)
+
+Revision ID: 8b3c6f0e2a71
+Revises: 5d1e8a4c9b2f
+Create Date: 2026-10-17 14:05:52.731940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3c6f0e2a71'
+down_revision: Union[str, None] = '5d1e8a4c9b2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'matches',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('matched_user_id', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['matched_user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'matched_user_id'),
+    )
+    op.create_index('ix_matches_user_created', 'matches', ['user_id', 'created_at', 'matched_user_id'])
+
+    # Мэтчи из уже накопленных лайков: время мэтча — время второго лайка пары
+    op.execute("""
+        INSERT INTO matches (user_id, matched_user_id, created_at)
+        SELECT a.swiper_user_id, a.target_user_id, GREATEST(a.created_at, b.created_at)
+        FROM user_likes_user a
+        JOIN user_likes_user b
+          ON b.swiper_user_id = a.target_user_id
+         AND b.target_user_id = a.swiper_user_id
+        WHERE a.action = 'LIKE' AND b.action = 'LIKE'
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_matches_user_created', table_name='matches')
+    op.drop_table('matches')
@@ -0,0 +1,76 @@
+"""Массивы жанров и инструментов поддерживаются триггерами
+
+Revision ID: 8d3a5f7c2e91
+Revises: 6c2f8e1b5a47
+Create Date: 2026-10-18 14:40:17.093256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3a5f7c2e91'
+down_revision: Union[str, None] = '6c2f8e1b5a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Дочерняя таблица -> (родительская таблица, ключ родителя, столбец-массив).
+# Бот пишет массивы сам, но Go-бэкенд меняет только дочерние таблицы
+ARRAYS = {
+    'instruments': ('users', 'user_id', 'instrument_names'),
+    'user_genres': ('users', 'user_id', 'genre_names'),
+    'group_genres': ('group_profiles', 'group_id', 'genre_names'),
+}
+
+
+def _function(child: str) -> str:
+    return f'{child}_rebuild_names'
+
+
+def upgrade() -> None:
+    for child, (parent, key, column) in ARRAYS.items():
+        # Названия без повторов в порядке добавления — как их записывает бот и как заполнила миграция 7c4e1f9a2d35
+        op.execute(f"""
+            CREATE FUNCTION {_function(child)}(parent_id BIGINT) RETURNS void AS $$
+                UPDATE {parent} SET {column} = names.value
+                FROM (
+                    SELECT coalesce(array_agg(name ORDER BY first_id), '{{}}') AS value
+                    FROM (SELECT name, min(id) AS first_id FROM {child} WHERE {key} = parent_id GROUP BY name) n
+                ) names
+                WHERE id = parent_id AND {column} IS DISTINCT FROM names.value
+            $$ LANGUAGE sql
+        """)
+        op.execute(f"""
+            CREATE FUNCTION {_function(child)}_trigger() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    PERFORM {_function(child)}(NEW.{key});
+                ELSIF TG_OP = 'DELETE' THEN
+                    PERFORM {_function(child)}(OLD.{key});
+                ELSE
+                    PERFORM {_function(child)}(OLD.{key});
+                    IF NEW.{key} IS DISTINCT FROM OLD.{key} THEN
+                        PERFORM {_function(child)}(NEW.{key});
+                    END IF;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {_function(child)} AFTER INSERT OR DELETE OR UPDATE OF name, {key} ON {child}
+            FOR EACH ROW EXECUTE FUNCTION {_function(child)}_trigger()
+        """)
+
+    # Анкеты, правленные Go-бэкендом после заполнения массивов, уже могли разойтись с дочерними таблицами
+    for child, (parent, _, _) in ARRAYS.items():
+        op.execute(f"SELECT {_function(child)}(id) FROM {parent}")
+
+
+def downgrade() -> None:
+    for child in reversed(list(ARRAYS)):
+        op.execute(f"DROP TRIGGER {_function(child)} ON {child}")
+        op.execute(f"DROP FUNCTION {_function(child)}_trigger()")
+        op.execute(f"DROP FUNCTION {_function(child)}(BIGINT)")
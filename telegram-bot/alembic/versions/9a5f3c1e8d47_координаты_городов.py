@@ -0,0 +1,75 @@
+"""Координаты городов
+
+Revision ID: 9a5f3c1e8d47
+Revises: 2e6d9b4f7a13
+Create Date: 2026-10-18 00:31:09.774152
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a5f3c1e8d47'
+down_revision: Union[str, None] = '2e6d9b4f7a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Города Челябинской области: из handlers/enums/cities.py и соседние, которые часто вводят вручную.
+# Имя -> (широта, долгота) центра города
+REGION_CITIES = {
+    "Челябинск": (55.1644, 61.4368),
+    "Копейск": (55.1167, 61.6179),
+    "Миасс": (55.0450, 60.1083),
+    "Чебаркуль": (54.9776, 60.3700),
+    "Сатка": (55.0406, 59.0289),
+    "Златоуст": (55.1711, 59.6508),
+    "Магнитогорск": (53.4072, 58.9791),
+    "Коркино": (54.8903, 61.3997),
+    "Троицк": (54.0843, 61.5586),
+    "Карабаш": (55.4853, 60.2078),
+    "Верхний Уфалей": (56.0522, 60.2314),
+    "Южноуральск": (54.4425, 61.2581),
+    "Аша": (54.9906, 57.2783),
+    "Кыштым": (55.7061, 60.5563),
+    "Еманжелинск": (54.7553, 61.3172),
+}
+
+
+def _normalize(city):
+    # Копия database.city_registry.normalize_city: миграция не должна зависеть от кода приложения
+    key = (city or "").strip().casefold().replace("ё", "е")
+    key = re.sub(r"^(г\.|г |город )", "", key).strip()
+    return re.sub(r"[\s\-]+", " ", key)
+
+
+def upgrade() -> None:
+    op.add_column('cities', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('cities', sa.Column('longitude', sa.Float(), nullable=True))
+
+    for name, (latitude, longitude) in REGION_CITIES.items():
+        alias = _normalize(name)
+        # Город мог уже появиться в справочнике из анкет под другим написанием («челябинск», «г. Миасс») —
+        # ищем его по ключу написания и только дописываем координаты
+        op.execute(sa.text(
+            "UPDATE cities SET latitude = :latitude, longitude = :longitude "
+            "WHERE id = (SELECT city_id FROM city_aliases WHERE alias = :alias)"
+        ).bindparams(alias=alias, latitude=latitude, longitude=longitude))
+        op.execute(sa.text(
+            "INSERT INTO cities (name, latitude, longitude) "
+            "SELECT :name, :latitude, :longitude WHERE NOT EXISTS (SELECT 1 FROM city_aliases WHERE alias = :alias) "
+            "ON CONFLICT (name) DO UPDATE SET latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude"
+        ).bindparams(name=name, alias=alias, latitude=latitude, longitude=longitude))
+        op.execute(sa.text(
+            "INSERT INTO city_aliases (alias, city_id) SELECT :alias, id FROM cities WHERE name = :name "
+            "ON CONFLICT (alias) DO NOTHING"
+        ).bindparams(alias=alias, name=name))
+
+
+def downgrade() -> None:
+    # Добавленные города остаются в справочнике — на них уже могут ссылаться анкеты
+    op.drop_column('cities', 'longitude')
+    op.drop_column('cities', 'latitude')
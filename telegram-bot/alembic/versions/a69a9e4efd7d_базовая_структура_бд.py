@@ -18,9 +18,123 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+# Типы перечислений SQLAlchemy хранят имена членов enum
+ENUMS = {
+    'performanceexperience': ['NEVER', 'LOCAL_GIGS', 'TOURS', 'PROFESSIONAL'],
+    'financialstatus': ['POOR', 'READY_TO_INVEST', 'LIMITED_BUDGET'],
+    'seriousness_level': ['HOBBY', 'SEMI_PRO', 'PRO'],
+    'actions': ['SKIP', 'LIKE'],
+}
+
+# Схема на момент подключения alembic. IF NOT EXISTS: users, instruments, user_genres
+# и user_likes_user на свежей БД уже созданы init.sql Go-бэкенда, а в БД, поднятых
+# через create_all до миграций, есть все таблицы
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGINT PRIMARY KEY,
+        city VARCHAR,
+        name VARCHAR,
+        age INTEGER,
+        theoretical_knowledge_level INTEGER,
+        has_performance_experience performanceexperience,
+        photo_path VARCHAR,
+        audio_path VARCHAR,
+        external_link VARCHAR,
+        about_me TEXT,
+        is_visible BOOLEAN NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS instruments (
+        id SERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        name VARCHAR NOT NULL,
+        proficiency_level INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_genres (
+        id SERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        name VARCHAR NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS group_profiles (
+        id BIGSERIAL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        city VARCHAR,
+        formation_date INTEGER,
+        platforms VARCHAR[],
+        description TEXT,
+        is_visible BOOLEAN NOT NULL,
+        seriousness_level seriousness_level,
+        financial_status financialstatus,
+        concerts JSON,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS group_genres (
+        id SERIAL PRIMARY KEY,
+        group_id BIGINT NOT NULL REFERENCES group_profiles (id) ON DELETE CASCADE,
+        name VARCHAR NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS group_members (
+        id SERIAL PRIMARY KEY,
+        group_id BIGINT NOT NULL REFERENCES group_profiles (id) ON DELETE CASCADE,
+        user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        role VARCHAR NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_likes_user (
+        id SERIAL PRIMARY KEY,
+        swiper_user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        target_user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        action actions,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_likes_group (
+        id SERIAL PRIMARY KEY,
+        swiper_user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        target_group_id BIGINT NOT NULL REFERENCES group_profiles (id) ON DELETE CASCADE,
+        action actions,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analytics_events (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        event_name TEXT NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL
+    )
+    """,
+]
+
+
 def upgrade() -> None:
-    pass
+    # Раньше схему создавал create_all при старте бота, а эта ревизия была пустой отметкой.
+    # Теперь миграции — единственный источник схемы, и свежая БД доводится до head с нуля
+    for name, values in ENUMS.items():
+        labels = ", ".join(f"'{value}'" for value in values)
+        op.execute(f"""
+            DO $$ BEGIN
+                CREATE TYPE {name} AS ENUM ({labels});
+            EXCEPTION WHEN duplicate_object THEN NULL;
+            END $$
+        """)
+
+    for statement in TABLES:
+        op.execute(statement)
 
 
 def downgrade() -> None:
+    # Базовые таблицы общие с Go-бэкендом и хранят все данные — откат до пустой БД их не удаляет
     pass
@@ -0,0 +1,106 @@
+"""id городов для анкет, записанных в обход бота
+
+Revision ID: a7e4c2d9f316
+Revises: 8d3a5f7c2e91
+Create Date: 2026-10-18 15:21:36.811402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e4c2d9f316'
+down_revision: Union[str, None] = '8d3a5f7c2e91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ключ написания — то же, что database.city_registry.normalize_city
+    op.execute(r"""
+        CREATE FUNCTION normalize_city(city TEXT) RETURNS TEXT AS $$
+            SELECT regexp_replace(
+                btrim(regexp_replace(replace(lower(btrim(city)), 'ё', 'е'), '^(г\.|г |город )', '')),
+                '[\s\-]+', ' ', 'g'
+            )
+        $$ LANGUAGE sql IMMUTABLE
+    """)
+    # Точное совпадение по ключу написания; неизвестный город добавляется в справочник.
+    # Опечатки здесь не распознаются — их сопоставляет бот (city_registry.resolve)
+    op.execute("""
+        CREATE FUNCTION resolve_city_id(city TEXT) RETURNS INTEGER AS $$
+        DECLARE
+            key TEXT := normalize_city(city);
+            resolved_id INTEGER;
+        BEGIN
+            IF key = '' THEN
+                RETURN NULL;
+            END IF;
+            SELECT city_id INTO resolved_id FROM city_aliases WHERE alias = key;
+            IF resolved_id IS NOT NULL THEN
+                RETURN resolved_id;
+            END IF;
+
+            INSERT INTO cities (name) VALUES (btrim(city)) ON CONFLICT (name) DO NOTHING;
+            INSERT INTO city_aliases (alias, city_id)
+            SELECT key, id FROM cities WHERE name = btrim(city)
+            ON CONFLICT (alias) DO NOTHING;
+            SELECT city_id INTO resolved_id FROM city_aliases WHERE alias = key;
+            RETURN resolved_id;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Бот пишет city вместе с city_ids; Go-бэкенд меняет только city — тогда id находит триггер
+    op.execute("""
+        CREATE FUNCTION users_resolve_city_ids() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                IF NEW.city_ids <> '{}' THEN
+                    RETURN NEW;
+                END IF;
+            ELSIF NEW.city IS NOT DISTINCT FROM OLD.city OR NEW.city_ids IS DISTINCT FROM OLD.city_ids THEN
+                RETURN NEW;
+            END IF;
+
+            NEW.city_ids := coalesce((
+                SELECT array_agg(city_id ORDER BY position)
+                FROM (
+                    SELECT city_id, min(position) AS position
+                    FROM unnest(string_to_array(NEW.city, ',')) WITH ORDINALITY AS part(name, position),
+                         LATERAL resolve_city_id(part.name) AS city_id
+                    WHERE city_id IS NOT NULL
+                    GROUP BY city_id
+                ) ids
+            ), '{}');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER users_resolve_city_ids BEFORE INSERT OR UPDATE OF city, city_ids ON users
+        FOR EACH ROW EXECUTE FUNCTION users_resolve_city_ids()
+    """)
+
+    # Анкеты, уже записанные Go-бэкендом без id городов
+    op.execute("""
+        UPDATE users SET city_ids = coalesce((
+            SELECT array_agg(city_id ORDER BY position)
+            FROM (
+                SELECT city_id, min(position) AS position
+                FROM unnest(string_to_array(users.city, ',')) WITH ORDINALITY AS part(name, position),
+                     LATERAL resolve_city_id(part.name) AS city_id
+                WHERE city_id IS NOT NULL
+                GROUP BY city_id
+            ) ids
+        ), '{}')
+        WHERE city_ids = '{}' AND city IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER users_resolve_city_ids ON users")
+    op.execute("DROP FUNCTION users_resolve_city_ids()")
+    op.execute("DROP FUNCTION resolve_city_id(TEXT)")
+    op.execute("DROP FUNCTION normalize_city(TEXT)")
@@ -19,9 +19,8 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.add_column('users', sa.Column('contacts', sa.String(), nullable=True))
-    # ### end Alembic commands ###
+    # В users из init.sql Go-бэкенда колонка contacts уже есть
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS contacts VARCHAR")
 
 
 def downgrade() -> None:
@@ -0,0 +1,27 @@
+"""Добавление поля params в AnalyticsEvent
+
+Revision ID: cfbf1776c075
+Revises: ba2a17fa7953
+Create Date: 2026-10-17 11:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cfbf1776c075'
+down_revision: Union[str, None] = 'ba2a17fa7953'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('analytics_events', sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analytics_events', 'params')
@@ -0,0 +1,50 @@
+"""Входящие лайки (like_inbox)
+
+Revision ID: e4a7b9d2c615
+Revises: 8b3c6f0e2a71
+Create Date: 2026-10-17 15:21:08.114372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7b9d2c615'
+down_revision: Union[str, None] = '8b3c6f0e2a71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'like_inbox',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('liker_id', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['liker_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'liker_id'),
+    )
+    op.create_index('ix_like_inbox_user_created', 'like_inbox', ['user_id', 'created_at', 'liker_id'])
+
+    # Лайки, на которые получатель еще не ответил ни лайком, ни пропуском
+    op.execute("""
+        INSERT INTO like_inbox (user_id, liker_id, created_at)
+        SELECT l.target_user_id, l.swiper_user_id, l.created_at
+        FROM user_likes_user l
+        WHERE l.action = 'LIKE'
+          AND NOT EXISTS (
+              SELECT 1 FROM user_likes_user r
+              WHERE r.swiper_user_id = l.target_user_id
+                AND r.target_user_id = l.swiper_user_id
+          )
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_like_inbox_user_created', table_name='like_inbox')
+    op.drop_table('like_inbox')
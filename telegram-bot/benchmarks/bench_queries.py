@@ -0,0 +1,289 @@
+"""
+Замеры функций database.queries на заполненной локальной БД с результатами в JSON для сравнения коммитов.
+
+Запуск из каталога telegram-bot (те же переменные DB_*, что и у бота), только на локальной БД:
+
+    # Текущие данные БД
+    python -m benchmarks.bench_queries --iterations 200 --output before.json
+    # Несколько размеров: перед каждым БД заново заполняется benchmarks.seed_large (с --truncate!)
+    python -m benchmarks.bench_queries --sizes 10000,100000,1000000 --output after.json
+    # Сравнение двух прогонов; код выхода 1, если p95 какого-то замера вырос больше порога
+    python -m benchmarks.bench_queries --compare before.json after.json --threshold 10
+
+Каждая итерация берет другого свайпера из случайной (по --seed) выборки пользователей и сбрасывает
+его колоду кандидатов — замеряется холодный путь со сборкой колоды, а не снятие id из памяти.
+get_random_profile замеряется и через индекс фильтров, и через SQL-запрос (индекс не загружен).
+Изменяющие функции выполняются в транзакции, которая откатывается после каждой итерации.
+
+«Строк просмотрено» — сумма строк, прочитанных узлами сканирования таблиц (вместе с отброшенными
+фильтром), по EXPLAIN (ANALYZE, FORMAT JSON) всех выражений одного вызова.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+from benchmarks import seed_large
+from database.queries import (
+    create_group,
+    get_band_which_not_action,
+    get_my_matches,
+    get_random_profile,
+    get_users_who_liked_me,
+    load_filter_index,
+    profile_deck,
+    profile_index,
+    update_user_instruments,
+)
+from database.session import AsyncSessionLocal, current_session, engine
+from loadtest.replay_updates import percentile
+
+# Комбинации фильтров ленты: по одному фильтру и все вместе
+PROFILE_FILTERS = {
+    "none": None,
+    "cities": {"cities": ["Челябинск", "Москва"]},
+    "genres": {"genres": ["Рок", "Джаз"]},
+    "instruments": {"instruments": ["Бас", "Барабаны"]},
+    "experience": {"experience": ["LOCAL_GIGS", "TOURS"]},
+    "age_peers": {"age_mode": "peers"},
+    "min_level": {"min_level": 3},
+    "radius": {"radius_km": 60},
+    "all": {
+        "cities": ["Челябинск"], "genres": ["Рок"], "instruments": ["Бас"],
+        "experience": ["LOCAL_GIGS"], "age_mode": "older", "min_level": 2,
+    },
+}
+BAND_FILTERS = {
+    "none": None,
+    "cities": {"cities": ["Челябинск"]},
+    "genres": {"genres": ["Рок"]},
+    "seriousness": {"seriousness_level_names": ["SEMI_PRO", "PRO"]},
+    "radius": {"radius_km": 60},
+}
+# Узлы плана, которые читают строки таблицы
+SCAN_NODES = {"Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Tid Scan"}
+
+
+def _cases() -> dict[str, tuple[Callable[[int], Awaitable], bool]]:
+    """Имя замера -> (вызов для свайпера, нужен ли SQL-путь вместо индекса фильтров)."""
+    cases = {}
+    for path in ("index", "sql"):
+        for name, filters in PROFILE_FILTERS.items():
+            cases[f"get_random_profile[{path},{name}]"] = (
+                lambda swiper, filters=filters: get_random_profile(swiper, filters), path == "sql"
+            )
+    for name, filters in BAND_FILTERS.items():
+        cases[f"get_band_which_not_action[{name}]"] = (
+            lambda swiper, filters=filters: get_band_which_not_action(swiper, filters), False
+        )
+    cases["get_users_who_liked_me"] = (get_users_who_liked_me, False)
+    cases["get_my_matches"] = (get_my_matches, False)
+    cases["update_user_instruments"] = (lambda swiper: update_user_instruments(swiper, ["Бас", "Вокал"]), False)
+    cases["create_group"] = (lambda swiper: create_group({
+        "user_id": swiper, "name": "Бенчмарк", "city": "Челябинск", "genres": ["Рок", "Панк"],
+    }), False)
+    return cases
+
+
+async def _sample_swipers(count: int, seed: int) -> list[int]:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT setseed(:seed)"), {"seed": (seed % 1000) / 1000})
+        rows = await conn.execute(
+            text("SELECT id FROM users WHERE is_visible ORDER BY random() LIMIT :count"), {"count": count}
+        )
+        swipers = list(rows.scalars())
+    if not swipers:
+        raise SystemExit("В БД нет пользователей — сначала заполните ее (benchmarks.seed_large)")
+    return swipers
+
+
+async def _call(case: Callable[[int], Awaitable], swiper: int) -> float:
+    """Один вызов в своей сессии, как в DbSessionMiddleware, но с откатом — данные не меняются."""
+    profile_deck.invalidate(swiper)
+    async with AsyncSessionLocal() as session:
+        token = current_session.set(session)
+        try:
+            started = time.perf_counter()
+            await case(swiper)
+            return time.perf_counter() - started
+        finally:
+            current_session.reset(token)
+            await session.rollback()
+
+
+def _rows_scanned(plan: dict) -> int:
+    rows = 0
+    if plan.get("Node Type") in SCAN_NODES:
+        loops = plan.get("Actual Loops", 1)
+        rows += (plan.get("Actual Rows", 0) + plan.get("Rows Removed by Filter", 0)
+                 + plan.get("Rows Removed by Index Recheck", 0)) * loops
+    for child in plan.get("Plans", []):
+        rows += _rows_scanned(child)
+    return rows
+
+
+async def _explain_call(case: Callable[[int], Awaitable], swiper: int) -> tuple[int, int]:
+    """
+    Собирает выражения одного вызова и прогоняет их через EXPLAIN ANALYZE в откатываемой транзакции.
+    Выражение, которое не выполняется повторно (например, ссылается на id из откаченной вставки), пропускается.
+    """
+    statements = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", collect)
+    try:
+        await _call(case, swiper)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", collect)
+
+    rows = 0
+    async with engine.connect() as conn:
+        async with conn.begin() as trans:
+            for statement, parameters in statements:
+                if statement.lstrip().split(None, 1)[0].upper() not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+                    continue
+                try:
+                    async with conn.begin_nested():
+                        result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters)
+                        plan = result.scalar()
+                except DBAPIError:
+                    continue
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                rows += _rows_scanned(plan[0]["Plan"])
+            await trans.rollback()
+    return rows, len(statements)
+
+
+async def _bench_case(case, sql_path: bool, index_loaded: bool, warmup: list[int], swipers: list[int]) -> dict:
+    # Без загруженного индекса фильтров колода собирается SQL-запросом
+    profile_index.loaded = index_loaded and not sql_path
+    try:
+        for swiper in warmup:
+            await _call(case, swiper)
+
+        timings = [await _call(case, swiper) for swiper in swipers]
+        rows, statements = await _explain_call(case, swipers[0])
+    finally:
+        profile_index.loaded = index_loaded
+
+    return {
+        "iterations": len(timings),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 99) * 1000, 3),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "rows_scanned": rows,
+        "statements": statements,
+    }
+
+
+async def _bench_size(args: argparse.Namespace) -> dict:
+    await load_filter_index()
+    swipers = await _sample_swipers(args.iterations + args.warmup, args.seed)
+    warmup, swipers = swipers[:args.warmup], swipers[args.warmup:] or swipers
+
+    results = {}
+    for name, (case, sql_path) in _cases().items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        result = results[name] = await _bench_case(case, sql_path, profile_index.loaded, warmup, swipers)
+        print(f"  {name:<48} p50={result['p50_ms']:>8.2f} p95={result['p95_ms']:>8.2f} "
+              f"p99={result['p99_ms']:>8.2f} мс, строк={result['rows_scanned']}")
+    return results
+
+
+async def _table_sizes() -> dict[str, int]:
+    async with engine.connect() as conn:
+        rows = await conn.execute(text(
+            "SELECT relname, n_live_tup FROM pg_stat_user_tables ORDER BY relname"
+        ))
+        return {name: count for name, count in rows}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    report = {
+        "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    async with engine.connect() as conn:
+        report["postgres"] = (await conn.execute(text("SHOW server_version"))).scalar()
+
+    sizes = args.sizes or [None]
+    for size in sizes:
+        if size is not None:
+            print(f"Заполнение БД: {size} пользователей")
+            await seed_large.main(argparse.Namespace(
+                users=size, bands_ratio=0.05, swipes_mean=50, like_share=0.3, seed=args.seed, truncate=True,
+            ))
+        label = str(size) if size is not None else "current"
+        print(f"Размер {label}:")
+        report["sizes"][label] = {"tables": await _table_sizes(), "cases": await _bench_size(args)}
+
+    await engine.dispose()
+    return report
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}, порог регрессии p95: {threshold}%")
+    regressions = 0
+    for size, data in new["sizes"].items():
+        old_cases = old["sizes"].get(size, {}).get("cases", {})
+        print(f"\nРазмер {size}:")
+        print(f"{'замер':<48}{'p95 было':>10}{'p95 стало':>11}{'Δ%':>8}{'строк было':>12}{'строк стало':>13}")
+        for name, result in data["cases"].items():
+            before = old_cases.get(name)
+            if before is None:
+                print(f"{name:<48}{'—':>10}{result['p95_ms']:>11.2f}{'новый':>8}")
+                continue
+            delta = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            mark = ""
+            if delta > threshold:
+                regressions += 1
+                mark = "  <- регрессия"
+            print(f"{name:<48}{before['p95_ms']:>10.2f}{result['p95_ms']:>11.2f}{delta:>+8.1f}"
+                  f"{before['rows_scanned']:>12}{result['rows_scanned']:>13}{mark}")
+
+    print(f"\nРегрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100, help="вызовов на замер")
+    parser.add_argument("--warmup", type=int, default=5, help="вызовов на прогрев (не учитываются)")
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",")],
+                        help="размеры БД через запятую; без параметра — текущие данные")
+    parser.add_argument("--only", nargs="*", help="только замеры, в имени которых есть одна из подстрок")
+    parser.add_argument("--seed", type=int, default=42, help="зерно выборки свайперов и заполнения БД")
+    parser.add_argument("--output", help="куда записать результаты в JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="сравнить два JSON с результатами")
+    parser.add_argument("--threshold", type=float, default=10, help="рост p95 в процентах, считающийся регрессией")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Результаты записаны в {args.output}")
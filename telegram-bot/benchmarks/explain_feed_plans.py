@@ -0,0 +1,117 @@
+"""
+Планы запросов ленты, лайков и мэтчей до и после индексов из миграции 5d1e8a4c9b2f.
+
+Запуск из каталога telegram-bot (те же переменные DB_*, что и у бота):
+
+    python -m benchmarks.explain_feed_plans --swiper 123456789
+    python -m benchmarks.explain_feed_plans --filters '{"genres": ["Рок"], "age_mode": "peers"}'
+
+Для режима "до" индексы удаляются внутри транзакции, которая затем откатывается.
+DROP INDEX держит эксклюзивную блокировку таблиц до отката — запускать только на копии БД.
+"""
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects import postgresql
+
+from database.city_registry import city_registry
+from database.enums import Actions
+from database.models import User, UserLikesUser
+from database.queries import _profile_candidates_stmt, _users_who_liked_me_stmt, _my_matches_stmt
+from database.session import engine
+
+# Индексы миграции 5d1e8a4c9b2f (idx_unique_swipe был и раньше — из init.sql)
+NEW_INDEXES = [
+    "ix_user_likes_user_target_action",
+    "ux_user_likes_group_swiper_target",
+    "ix_instruments_user_id",
+    "ix_user_genres_name_user_id",
+    "ix_group_genres_group_id",
+    "ix_group_genres_name_group_id",
+    "ix_group_members_user_id",
+    "ix_users_visible_age",
+    "ix_group_profiles_visible",
+]
+
+
+def _sql(stmt) -> str:
+    sql = str(stmt.compile(dialect=postgresql.asyncpg.dialect(), compile_kwargs={"literal_binds": True}))
+    # Пустой массив без типа Postgres не принимает
+    return sql.replace("ARRAY[]", "ARRAY[]::BIGINT[]")
+
+
+async def _pick_swiper(conn) -> int:
+    """Пользователь с наибольшим числом входящих лайков — худший случай для лайков и мэтчей."""
+    stmt = (
+        select(UserLikesUser.target_user_id)
+        .where(UserLikesUser.action == Actions.LIKE)
+        .group_by(UserLikesUser.target_user_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    swiper_id = (await conn.execute(stmt)).scalar()
+    if swiper_id is None:
+        swiper_id = (await conn.execute(select(User.id).limit(1))).scalar()
+    if swiper_id is None:
+        raise SystemExit("В БД нет пользователей — сначала заполните ее данными")
+    return swiper_id
+
+
+async def _queries(conn, swiper_id: int, filters: dict | None) -> dict[str, str]:
+    # Фильтр по городам и сортировка по расстоянию берут id и расстояния из справочника
+    await city_registry.load(conn)
+    swiper_age, swiper_city_ids = (await conn.execute(select(User.age, User.city_ids).where(User.id == swiper_id))).one()
+    seen_ids = (await conn.execute(
+        select(UserLikesUser.target_user_id).where(UserLikesUser.swiper_user_id == swiper_id)
+    )).scalars().all()
+
+    return {
+        "get_random_profile": _sql(_profile_candidates_stmt(
+            swiper_id, swiper_age, swiper_city_ids, seen_ids, filters, set(), 200
+        )),
+        "get_users_who_liked_me": _sql(_users_who_liked_me_stmt(swiper_id, seen_ids)),
+        "get_my_matches": _sql(_my_matches_stmt(swiper_id, 10)),
+    }
+
+
+async def _explain(conn, queries: dict[str, str], title: str) -> None:
+    print(f"\n{'=' * 30} {title} {'=' * 30}")
+    for name, sql in queries.items():
+        rows = (await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))).scalars().all()
+        print(f"\n--- {name} ---")
+        print("\n".join(rows))
+
+
+async def main(swiper_id: int | None, filters: dict | None, only_after: bool) -> None:
+    async with engine.connect() as conn:
+        if swiper_id is None:
+            swiper_id = await _pick_swiper(conn)
+        print(f"Свайпер: {swiper_id}, фильтры: {filters}")
+
+        queries = await _queries(conn, swiper_id, filters)
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
+
+        if not only_after:
+            trans = await conn.begin()
+            for index in NEW_INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            await _explain(conn, queries, "ДО (без индексов)")
+            await trans.rollback()
+
+        async with conn.begin():
+            await _explain(conn, queries, "ПОСЛЕ (с индексами)")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--swiper", type=int, help="id свайпера (по умолчанию — самый лайкаемый пользователь)")
+    parser.add_argument("--filters", type=json.loads, help="фильтры ленты в формате JSON")
+    parser.add_argument("--only-after", action="store_true", help="не удалять индексы, показать только текущие планы")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.swiper, args.filters, args.only_after))
@@ -0,0 +1,368 @@
+"""
+Генератор больших синтетических данных для нагрузочных тестов и замеров запросов.
+
+Запуск из каталога telegram-bot (те же переменные DB_*, что и у бота), только на локальной БД:
+
+    python -m benchmarks.seed_large --users 1000000 --truncate
+    python -m benchmarks.seed_large --users 200000 --bands-ratio 0.1 --swipes-mean 80 --seed 7
+
+Данные детерминированы по --seed: каждая таблица генерируется своим генератором случайных чисел.
+Распределения перекошены, как в жизни: города и жанры — по закону Ципфа (Челябинск и рок
+встречаются чаще всего), число свайпов на пользователя — по Парето (немного очень активных),
+популярность анкет — тоже по Ципфу (немногие анкеты собирают большую часть лайков).
+
+Строки пишутся через COPY потоком, без накопления в памяти. Свайпы сначала копируются
+во временную таблицу, а в user_likes_user попадают через INSERT ... ON CONFLICT DO NOTHING —
+так повторные пары отбрасываются без глобального множества в памяти. Массивы жанров и инструментов
+в анкетах, id городов из справочника, мэтчи и входящие лайки потом заполняются запросами по образцу миграций.
+
+--truncate очищает все таблицы бота (TRUNCATE ... CASCADE).
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Sequence
+
+import asyncpg
+
+from database.enums import Actions, PerformanceExperience
+from database.session import DATABASE_URL
+from database.test_seed import ALL_CITIES, ALL_GENRES, ALL_INSTRUMENTS
+from handlers.enums.seriousness_level import SeriousnessLevel
+
+# Первый id синтетических пользователей и групп — выше реальных id Telegram
+ID_OFFSET = 10 ** 11
+# Сколько дней назад могут быть созданы свайпы и группы
+HISTORY_DAYS = 180
+# Потолок свайпов одного пользователя (хвост распределения Парето)
+MAX_SWIPES_PER_USER = 5000
+
+TABLES = [
+    "user_likes_group", "user_likes_user", "matches", "like_inbox",
+    "group_genres", "group_members", "group_profiles",
+    "user_genres", "instruments", "users",
+]
+
+# Массивы названий в анкетах — тем же запросом, что и в миграции 7c4e1f9a2d35
+NAME_ARRAYS_SQL = [
+    """
+    UPDATE users u SET genre_names = g.names
+    FROM (SELECT user_id, array_agg(name ORDER BY id) AS names FROM user_genres GROUP BY user_id) g
+    WHERE g.user_id = u.id
+    """,
+    """
+    UPDATE users u SET instrument_names = i.names
+    FROM (SELECT user_id, array_agg(name ORDER BY id) AS names FROM instruments GROUP BY user_id) i
+    WHERE i.user_id = u.id
+    """,
+    """
+    UPDATE group_profiles p SET genre_names = g.names
+    FROM (SELECT group_id, array_agg(name ORDER BY id) AS names FROM group_genres GROUP BY group_id) g
+    WHERE g.group_id = p.id
+    """,
+]
+# Генератор пишет города готовыми названиями без опечаток, поэтому новые города справочника
+# (миграция 2e6d9b4f7a13 заводит только города из перечисления) хватает сопоставить по lower()
+CITY_IDS_SQL = [
+    """
+    INSERT INTO cities (name)
+    SELECT city FROM users WHERE city IS NOT NULL
+    UNION SELECT city FROM group_profiles WHERE city IS NOT NULL
+    ON CONFLICT (name) DO NOTHING
+    """,
+    """
+    INSERT INTO city_aliases (alias, city_id)
+    SELECT lower(name), id FROM cities
+    ON CONFLICT (alias) DO NOTHING
+    """,
+    """
+    UPDATE users u SET city_ids = ARRAY[a.city_id]
+    FROM city_aliases a WHERE a.alias = lower(u.city)
+    """,
+    """
+    UPDATE group_profiles p SET city_id = a.city_id
+    FROM city_aliases a WHERE a.alias = lower(p.city)
+    """,
+]
+# Пары из этих запросов совпадают с бэкфиллом миграций 8b3c6f0e2a71 и e4a7b9d2c615
+MATCHES_SQL = """
+    INSERT INTO matches (user_id, matched_user_id, created_at)
+    SELECT a.swiper_user_id, a.target_user_id, GREATEST(a.created_at, b.created_at)
+    FROM user_likes_user a
+    JOIN user_likes_user b
+      ON b.swiper_user_id = a.target_user_id
+     AND b.target_user_id = a.swiper_user_id
+    WHERE a.action = 'LIKE' AND b.action = 'LIKE'
+    ON CONFLICT DO NOTHING
+"""
+LIKE_INBOX_SQL = """
+    INSERT INTO like_inbox (user_id, liker_id, created_at)
+    SELECT l.target_user_id, l.swiper_user_id, l.created_at
+    FROM user_likes_user l
+    WHERE l.action = 'LIKE'
+      AND NOT EXISTS (
+          SELECT 1 FROM user_likes_user r
+          WHERE r.swiper_user_id = l.target_user_id
+            AND r.target_user_id = l.swiper_user_id
+      )
+    ON CONFLICT DO NOTHING
+"""
+
+
+def _zipf_cum_weights(n: int, s: float) -> list[float]:
+    """Накопленные веса Ципфа: элемент ранга r выбирается с вероятностью ~ 1 / r^s."""
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def _weighted_sample(rng: random.Random, items: Sequence, cum_weights: list[float], k: int) -> list:
+    """
+    k разных элементов с учетом весов (k мало по сравнению с числом элементов).
+    Результат отсортирован: порядок обхода множества строк зависит от PYTHONHASHSEED.
+    """
+    k = min(k, len(items))
+    chosen = set()
+    while len(chosen) < k:
+        chosen.add(rng.choices(items, cum_weights=cum_weights)[0])
+    return sorted(chosen)
+
+
+def _pareto_count(rng: random.Random, mean: float, alpha: float, cap: int) -> int:
+    """Целое с распределением Парето и заданным средним: у большинства мало, у единиц — очень много."""
+    scale = mean * (alpha - 1) / alpha
+    return min(int(scale * rng.paretovariate(alpha)), cap)
+
+
+class SeedGenerator:
+    def __init__(self, users: int, bands_ratio: float, swipes_mean: float, like_share: float, seed: int):
+        self.users = users
+        self.bands = max(int(users * bands_ratio), 1)
+        self.swipes_mean = swipes_mean
+        self.like_share = like_share
+        self.seed = seed
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+        self.city_weights = _zipf_cum_weights(len(ALL_CITIES), 1.2)
+        self.genre_weights = _zipf_cum_weights(len(ALL_GENRES), 1.0)
+        self.instrument_weights = _zipf_cum_weights(len(ALL_INSTRUMENTS), 1.0)
+
+    def _rng(self, table: str) -> random.Random:
+        return random.Random(f"{self.seed}:{table}")
+
+    def _user_id(self, index: int) -> int:
+        return ID_OFFSET + index
+
+    def _past(self, rng: random.Random) -> datetime:
+        return self.now - timedelta(seconds=rng.uniform(0, HISTORY_DAYS * 86400))
+
+    def accounts(self) -> Iterator[tuple]:
+        # users.id ссылается на accounts.id в схеме Go-бэкенда
+        for index in range(self.users):
+            user_id = self._user_id(index)
+            yield user_id, f"seed_{user_id}", "seed"
+
+    def users_rows(self) -> Iterator[tuple]:
+        rng = self._rng("users")
+        experiences = [e.name for e in PerformanceExperience]
+        for index in range(self.users):
+            user_id = self._user_id(index)
+            city = rng.choices(ALL_CITIES, cum_weights=self.city_weights)[0]
+            yield (
+                user_id,
+                f"Музыкант {index}",
+                city,
+                max(16, min(60, int(rng.gauss(27, 7)))),
+                f"@seed_{user_id}" if rng.random() < 0.8 else None,
+                rng.randint(1, 5) if rng.random() < 0.7 else None,
+                rng.choice(experiences) if rng.random() < 0.7 else None,
+                f"Ищу группу, город {city}" if rng.random() < 0.5 else None,
+                rng.random() > 0.05,
+            )
+
+    def instruments(self) -> Iterator[tuple]:
+        rng = self._rng("instruments")
+        for index in range(self.users):
+            count = _pareto_count(rng, 1.5, 2.5, 5) or 1
+            for name in _weighted_sample(rng, ALL_INSTRUMENTS, self.instrument_weights, count):
+                yield self._user_id(index), name, rng.randint(1, 5)
+
+    def user_genres(self) -> Iterator[tuple]:
+        rng = self._rng("user_genres")
+        for index in range(self.users):
+            count = _pareto_count(rng, 2, 2, 6) or 1
+            for name in _weighted_sample(rng, ALL_GENRES, self.genre_weights, count):
+                yield self._user_id(index), name
+
+    def group_profiles(self) -> Iterator[tuple]:
+        rng = self._rng("group_profiles")
+        levels = [level.name for level in SeriousnessLevel]
+        for index in range(self.bands):
+            city = rng.choices(ALL_CITIES, cum_weights=self.city_weights)[0]
+            yield (
+                ID_OFFSET + index,
+                f"Группа {index}",
+                city,
+                rng.randint(1990, 2025),
+                f"Группа из {city}" if rng.random() < 0.6 else None,
+                rng.random() > 0.05,
+                rng.choice(levels) if rng.random() < 0.8 else None,
+                self._past(rng),
+            )
+
+    def group_members(self) -> Iterator[tuple]:
+        rng = self._rng("group_members")
+        for index in range(self.bands):
+            members = {rng.randrange(self.users) for _ in range(1 + _pareto_count(rng, 1.5, 2, 6))}
+            for position, member in enumerate(sorted(members)):
+                yield ID_OFFSET + index, self._user_id(member), "Основатель" if position == 0 else "Участник"
+
+    def group_genres(self) -> Iterator[tuple]:
+        rng = self._rng("group_genres")
+        for index in range(self.bands):
+            count = _pareto_count(rng, 2, 2, 5) or 1
+            for name in _weighted_sample(rng, ALL_GENRES, self.genre_weights, count):
+                yield ID_OFFSET + index, name
+
+    def user_swipes(self) -> Iterator[tuple]:
+        """
+        Свайпы по анкетам музыкантов. Цели выбираются по популярности (Ципф по случайной
+        перестановке анкет), часть лайков получает ответный лайк — из них получаются мэтчи.
+        Повторные пары возможны и отбрасываются при переносе из временной таблицы.
+        """
+        rng = self._rng("user_swipes")
+        popularity = list(range(self.users))
+        rng.shuffle(popularity)
+        cum_weights = _zipf_cum_weights(self.users, 0.8)
+
+        for swiper in range(self.users):
+            count = _pareto_count(rng, self.swipes_mean, 1.5, min(MAX_SWIPES_PER_USER, self.users - 1))
+            targets = set()
+            while len(targets) < count:
+                target = rng.choices(popularity, cum_weights=cum_weights)[0]
+                if target != swiper:
+                    targets.add(target)
+
+            for target in sorted(targets):
+                created_at = self._past(rng)
+                liked = rng.random() < self.like_share
+                yield self._user_id(swiper), self._user_id(target), (Actions.LIKE if liked else Actions.SKIP).name, created_at
+                if liked and rng.random() < 0.15:
+                    reply_at = created_at + timedelta(seconds=rng.uniform(60, 7 * 86400))
+                    yield self._user_id(target), self._user_id(swiper), Actions.LIKE.name, reply_at
+
+    def group_swipes(self) -> Iterator[tuple]:
+        rng = self._rng("group_swipes")
+        cum_weights = _zipf_cum_weights(self.bands, 0.8)
+        bands = list(range(self.bands))
+        for swiper in range(self.users):
+            count = _pareto_count(rng, self.swipes_mean / 10, 1.5, self.bands)
+            for band in _weighted_sample(rng, bands, cum_weights, count):
+                action = Actions.LIKE if rng.random() < self.like_share else Actions.SKIP
+                yield self._user_id(swiper), ID_OFFSET + band, action.name, self._past(rng)
+
+
+class _Counter:
+    """Считает строки, проходящие через генератор, — COPY сам их не возвращает."""
+
+    def __init__(self, rows: Iterable[tuple]):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+async def _copy(conn: asyncpg.Connection, table: str, columns: list[str], rows: Iterable[tuple]) -> None:
+    started = time.perf_counter()
+    counted = _Counter(rows)
+    await conn.copy_records_to_table(table, columns=columns, records=counted)
+    print(f"  {table}: {counted.count} строк за {time.perf_counter() - started:.1f} с")
+
+
+async def _copy_deduplicated(conn: asyncpg.Connection, table: str, columns: list[str], rows: Iterable[tuple]) -> None:
+    """COPY во временную таблицу и перенос с отбрасыванием повторных пар по уникальному индексу."""
+    staging = f"seed_{table}"
+    await conn.execute(f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+    await _copy(conn, staging, columns, rows)
+    column_list = ", ".join(columns)
+    status = await conn.execute(
+        f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} ON CONFLICT DO NOTHING"
+    )
+    print(f"  {table}: перенесено {status.split()[-1]} строк без повторов")
+
+
+async def main(args: argparse.Namespace) -> None:
+    generator = SeedGenerator(args.users, args.bands_ratio, args.swipes_mean, args.like_share, args.seed)
+    conn = await asyncpg.connect(DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"))
+    started = time.perf_counter()
+    try:
+        has_accounts = await conn.fetchval("SELECT to_regclass('accounts') IS NOT NULL")
+
+        if args.truncate:
+            tables = TABLES + (["accounts"] if has_accounts else [])
+            await conn.execute(f"TRUNCATE {', '.join(tables)} CASCADE")
+            print("Таблицы очищены")
+        elif await conn.fetchval("SELECT EXISTS (SELECT 1 FROM users WHERE id >= $1)", ID_OFFSET):
+            raise SystemExit("Синтетические пользователи уже есть — запустите с --truncate")
+
+        print(f"Пользователей: {generator.users}, групп: {generator.bands}, seed={args.seed}")
+        if has_accounts:
+            await _copy(conn, "accounts", ["id", "login", "password_hash"], generator.accounts())
+        await _copy(conn, "users", [
+            "id", "name", "city", "age", "contacts", "theoretical_knowledge_level",
+            "has_performance_experience", "about_me", "is_visible",
+        ], generator.users_rows())
+        await _copy(conn, "instruments", ["user_id", "name", "proficiency_level"], generator.instruments())
+        await _copy(conn, "user_genres", ["user_id", "name"], generator.user_genres())
+        await _copy(conn, "group_profiles", [
+            "id", "name", "city", "formation_date", "description", "is_visible", "seriousness_level", "created_at",
+        ], generator.group_profiles())
+        await _copy(conn, "group_members", ["group_id", "user_id", "role"], generator.group_members())
+        await _copy(conn, "group_genres", ["group_id", "name"], generator.group_genres())
+
+        print("Массивы жанров и инструментов в анкетах...")
+        for sql in NAME_ARRAYS_SQL:
+            await conn.execute(sql)
+
+        print("Города из справочника...")
+        for sql in CITY_IDS_SQL:
+            await conn.execute(sql)
+
+        async with conn.transaction():
+            await _copy_deduplicated(conn, "user_likes_user", [
+                "swiper_user_id", "target_user_id", "action", "created_at",
+            ], generator.user_swipes())
+            await _copy_deduplicated(conn, "user_likes_group", [
+                "swiper_user_id", "target_group_id", "action", "created_at",
+            ], generator.group_swipes())
+
+        print("Мэтчи и входящие лайки из свайпов...")
+        await conn.execute(MATCHES_SQL)
+        await conn.execute(LIKE_INBOX_SQL)
+
+        # Следующая группа, созданная ботом, не должна столкнуться с синтетическими id
+        await conn.execute(
+            "SELECT setval(pg_get_serial_sequence('group_profiles', 'id'), "
+            "(SELECT COALESCE(MAX(id), 1) FROM group_profiles))"
+        )
+        await conn.execute("ANALYZE")
+    finally:
+        await conn.close()
+
+    print(f"Готово за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000, help="сколько музыкантов создать")
+    parser.add_argument("--bands-ratio", type=float, default=0.05, help="групп на одного музыканта")
+    parser.add_argument("--swipes-mean", type=float, default=50, help="среднее число свайпов на музыканта")
+    parser.add_argument("--like-share", type=float, default=0.3, help="доля лайков среди свайпов")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора — одинаковое зерно дает одинаковые данные")
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы бота перед заполнением")
+
+    asyncio.run(main(parser.parse_args()))
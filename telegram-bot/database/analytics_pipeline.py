@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics.analytics.counters import analytics_events_written, analytics_events_dropped
+from .session import run_detached
+
+logger = logging.getLogger(__name__)
+
+# Максимум событий в очереди; сверх этого новые события отбрасываются
+ANALYTICS_QUEUE_SIZE = int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000"))
+# Сколько событий пишем одной пачкой
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))
+# Сколько ждем добора пачки, прежде чем записать то, что есть
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))
+# Синхронный режим (для тестов и отладки): событие пишется сразу в track
+ANALYTICS_SYNC = os.getenv("ANALYTICS_SYNC", "0") == "1"
+
+EventWriter = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class AnalyticsPipeline:
+    """
+    Неблокирующая запись аналитики: хендлеры кладут события в очередь,
+    фоновый потребитель пишет их в analytics_events пачками.
+    Очередь ограничена — при переполнении события отбрасываются и считаются в метрике.
+    """
+
+    def __init__(
+            self,
+            writer: EventWriter,
+            max_queue: int = ANALYTICS_QUEUE_SIZE,
+            batch_size: int = ANALYTICS_BATCH_SIZE,
+            flush_interval: float = ANALYTICS_FLUSH_INTERVAL,
+            sync: bool = ANALYTICS_SYNC):
+        self._writer = writer
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self.sync = sync
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def track(self, event: Dict[str, Any]) -> None:
+        if self.sync:
+            await self._write([event])
+            return
+
+        if self._task is None:
+            self.start()
+
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            analytics_events_dropped.labels(reason="queue_full").inc()
+
+    def start(self) -> None:
+        if self._task is None:
+            # Очередь создаем внутри работающего цикла событий
+            self._queue = asyncio.Queue(maxsize=self._max_queue)
+            self._stopping = False
+            self._task = run_detached(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает потребителя и дописывает все события из очереди."""
+        if self._task is None:
+            return
+
+        # Не отменяем потребителя, чтобы не потерять собранную им пачку
+        self._stopping = True
+        await self._task
+        self._task = None
+
+        while not self._queue.empty():
+            await self._write(self._drain(self._batch_size))
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), self._flush_interval)]
+            except asyncio.TimeoutError:
+                continue
+
+            # Добираем пачку: все, что уже есть в очереди, но не дольше flush_interval
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._flush_interval
+            while len(batch) < self._batch_size:
+                batch.extend(self._drain(self._batch_size - len(batch)))
+                timeout = deadline - loop.time()
+                if len(batch) >= self._batch_size or timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write(batch)
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        events = []
+        while len(events) < limit and not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await self._writer(batch)
+            analytics_events_written.inc(len(batch))
+        except Exception:
+            analytics_events_dropped.labels(reason="write_error").inc(len(batch))
+            logger.exception("Ошибка записи аналитики (%d событий)", len(batch))
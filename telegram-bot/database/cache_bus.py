@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from .session import run_detached
+
+logger = logging.getLogger(__name__)
+
+# Рассылать изменения кэшей в памяти другим репликам через Redis pub/sub.
+# По умолчанию включено вместе с общим FSM (FSM_STORAGE=redis), то есть когда реплик может быть несколько
+CACHE_BUS_ENABLED = os.getenv("CACHE_BUS", "1" if os.getenv("FSM_STORAGE", "memory") == "redis" else "0") == "1"
+# Адрес Redis — тот же, что у FSM
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Канал pub/sub; несколько ботов в одном Redis разводятся разными каналами
+CACHE_BUS_CHANNEL = os.getenv("CACHE_BUS_CHANNEL", "cache-bus")
+# Пауза (сек) перед переподключением после обрыва подписки
+CACHE_BUS_RECONNECT_DELAY = float(os.getenv("CACHE_BUS_RECONNECT_DELAY", "5"))
+
+
+class CacheBus:
+    """
+    Согласует кэши в памяти процесса между репликами бота.
+    Каждое изменение кэша (инвалидация статуса, новый свайп в индексе просмотренных)
+    применяется локально и публикуется в Redis; остальные реплики применяют его у себя.
+
+    pub/sub не гарантирует доставку: после переподключения подписки кэши целиком сбрасываются,
+    а то, что потерялось без обрыва, ограничено временем жизни записей.
+    Без Redis (одна реплика) изменения применяются только локально.
+    """
+
+    def __init__(self, enabled: bool = CACHE_BUS_ENABLED, channel: str = CACHE_BUS_CHANNEL):
+        self._enabled = enabled
+        self._channel = channel
+        # Свои сообщения возвращаются подписчику — их пропускаем, они уже применены
+        self._origin = uuid.uuid4().hex
+        self._handlers: Dict[str, Tuple[Callable[..., None], Callable[[], None]]] = {}
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, apply: Callable[..., None], reset: Callable[[], None]) -> None:
+        """apply(*args) применяет одно изменение, reset() сбрасывает кэш, если изменения могли потеряться."""
+        self._handlers[name] = (apply, reset)
+
+    def publish(self, name: str, *args) -> None:
+        """Применяет изменение локально и рассылает его остальным репликам в фоне."""
+        apply, _ = self._handlers[name]
+        apply(*args)
+
+        if self._redis is not None:
+            message = json.dumps({"origin": self._origin, "name": name, "args": args})
+            run_detached(self._send(message))
+
+    def start(self) -> None:
+        if not self._enabled or self._task is not None:
+            return
+
+        # redis нужен только в режиме нескольких реплик
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(REDIS_URL)
+        self._task = run_detached(self._run())
+        logger.info("Изменения кэшей рассылаются через Redis, канал %s", self._channel)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _send(self, message: str) -> None:
+        try:
+            await self._redis.publish(self._channel, message)
+        except Exception:
+            logger.exception("Не удалось разослать изменение кэша")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self._channel)
+                    # Пока подписки не было, изменения других реплик могли пройти мимо
+                    self._reset_all()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Подписка на изменения кэшей оборвалась, переподключение через %s с",
+                                 CACHE_BUS_RECONNECT_DELAY)
+                await asyncio.sleep(CACHE_BUS_RECONNECT_DELAY)
+
+    def _dispatch(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+            if message["origin"] == self._origin:
+                return
+            apply, _ = self._handlers[message["name"]]
+            apply(*message["args"])
+        except Exception:
+            logger.exception("Не удалось применить изменение кэша: %r", data)
+
+    def _reset_all(self) -> None:
+        for _, reset in self._handlers.values():
+            reset()
+
+
+cache_bus = CacheBus()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Iterable, List, Optional, Set
+
+from .session import run_detached
+
+logger = logging.getLogger(__name__)
+
+# Сколько id кладем в колоду за одну сборку
+DECK_SIZE = int(os.getenv("CANDIDATE_DECK_SIZE", "200"))
+# Когда в колоде остается меньше — в фоне добираем следующую порцию
+DECK_LOW_WATERMARK = int(os.getenv("CANDIDATE_DECK_LOW_WATERMARK", "20"))
+# Через сколько секунд колода считается устаревшей и собирается заново
+DECK_TTL_SECONDS = float(os.getenv("CANDIDATE_DECK_TTL", "600"))
+# Как часто можно пересобирать пустую колоду (анкеты закончились)
+DECK_EMPTY_RETRY_SECONDS = float(os.getenv("CANDIDATE_DECK_EMPTY_RETRY", "30"))
+# Сколько колод держим в памяти одновременно (по одной на свайпера)
+DECK_MAX_ENTRIES = int(os.getenv("CANDIDATE_DECK_MAX_ENTRIES", "10000"))
+
+# Сколько последних выданных id не возвращать в колоду при пересборке:
+# SKIP по текущей анкете записывается только при следующем нажатии
+RECENTLY_ISSUED_SIZE = 5
+
+CandidateLoader = Callable[[int, Optional[dict], Set[int], int], Awaitable[List[int]]]
+
+
+def filters_fingerprint(filters: Optional[dict]) -> str:
+    """Стабильный ключ набора фильтров: порядок выбора и пустые значения не важны."""
+    if not filters:
+        return ""
+
+    normalized = {}
+    for key, value in filters.items():
+        if value in (None, "", [], "all"):
+            continue
+        normalized[key] = sorted(value) if isinstance(value, list) else value
+
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+class _Deck:
+    """Перемешанная очередь id кандидатов для одного свайпера и одного набора фильтров."""
+
+    def __init__(self, filters_key: str, ids: Iterable[int]):
+        self.filters_key = filters_key
+        self.ids: Deque[int] = deque(ids)
+        self.built_at = time.monotonic()
+        self.recently_issued: Deque[int] = deque(maxlen=RECENTLY_ISSUED_SIZE)
+        self.refill: Optional[asyncio.Task] = None
+        # Последняя догрузка ничего не нашла — больше не дергаем БД до пересборки
+        self.drained = False
+
+    def is_expired(self, now: float) -> bool:
+        if not self.ids:
+            return now - self.built_at > DECK_EMPTY_RETRY_SECONDS
+        return now - self.built_at > DECK_TTL_SECONDS
+
+    def known_ids(self) -> Set[int]:
+        return set(self.ids) | set(self.recently_issued)
+
+
+class CandidateDeck:
+    """
+    Колода кандидатов для ленты: один раз выбирает пачку подходящих id,
+    а на каждый свайп просто снимает верхний id из памяти.
+    """
+
+    def __init__(
+            self,
+            loader: CandidateLoader,
+            size: int = DECK_SIZE,
+            low_watermark: int = DECK_LOW_WATERMARK,
+            max_entries: int = DECK_MAX_ENTRIES):
+        self._loader = loader
+        self._size = size
+        self._low_watermark = low_watermark
+        self._max_entries = max_entries
+        self._decks: "OrderedDict[int, _Deck]" = OrderedDict()
+
+    async def pop(self, swiper_id: int, filters: Optional[dict] = None) -> Optional[int]:
+        """Возвращает id следующего кандидата или None, если анкеты закончились."""
+        filters_key = filters_fingerprint(filters)
+        deck = self._decks.get(swiper_id)
+
+        if deck is None or deck.filters_key != filters_key or deck.is_expired(time.monotonic()):
+            # Фильтры поменялись или колода протухла — собираем заново
+            deck = await self._build(swiper_id, filters, filters_key, exclude=self._recent(deck))
+        elif not deck.ids and deck.refill is not None:
+            # Колода опустела раньше, чем успела догрузиться — ждем догрузку
+            await asyncio.shield(deck.refill)
+
+        self._decks.move_to_end(swiper_id)
+
+        if not deck.ids:
+            return None
+
+        target_id = deck.ids.popleft()
+        deck.recently_issued.append(target_id)
+
+        if len(deck.ids) < self._low_watermark and deck.refill is None and not deck.drained:
+            deck.refill = run_detached(self._refill(swiper_id, filters, deck))
+
+        return target_id
+
+    def invalidate(self, swiper_id: int) -> None:
+        """Сбрасывает колоду свайпера, следующая выдача соберет ее заново."""
+        self._decks.pop(swiper_id, None)
+
+    @staticmethod
+    def _recent(deck: Optional[_Deck]) -> Set[int]:
+        return set(deck.recently_issued) if deck else set()
+
+    async def _build(self, swiper_id: int, filters: Optional[dict], filters_key: str, exclude: Set[int]) -> _Deck:
+        ids = await self._loader(swiper_id, filters, exclude, self._size)
+        deck = _Deck(filters_key, ids)
+        deck.recently_issued.extend(exclude)
+        deck.drained = len(ids) < self._size
+
+        self._decks[swiper_id] = deck
+        while len(self._decks) > self._max_entries:
+            self._decks.popitem(last=False)
+
+        logger.info("Собрана колода для свайпера ID=%s: %d кандидатов", swiper_id, len(ids))
+        return deck
+
+    async def _refill(self, swiper_id: int, filters: Optional[dict], deck: _Deck) -> None:
+        try:
+            ids = await self._loader(swiper_id, filters, deck.known_ids(), self._size)
+            known = deck.known_ids()
+            deck.ids.extend(target_id for target_id in ids if target_id not in known)
+            deck.drained = len(ids) < self._size
+            logger.info("Колода свайпера ID=%s догружена на %d кандидатов", swiper_id, len(ids))
+        except Exception:
+            logger.exception("Ошибка догрузки колоды для свайпера ID=%s", swiper_id)
+        finally:
+            deck.refill = None
@@ -0,0 +1,54 @@
+import os
+from typing import Any, Dict
+
+from .models import User, GroupProfile
+from .ttl_cache import TTLCache
+
+# Сколько карточек держим в кэше (отдельно для музыкантов и для групп)
+CARD_CACHE_SIZE = int(os.getenv("CARD_CACHE_SIZE", "5000"))
+# Страховка от изменений в обход queries.py (например, из Go-бэкенда): карточка живет не дольше
+CARD_CACHE_TTL = float(os.getenv("CARD_CACHE_TTL", "600"))
+
+# (id, версия анкеты) -> карточка
+user_cards = TTLCache(ttl=CARD_CACHE_TTL, max_entries=CARD_CACHE_SIZE)
+band_cards = TTLCache(ttl=CARD_CACHE_TTL, max_entries=CARD_CACHE_SIZE)
+
+
+def user_card(user: User) -> Dict[str, Any]:
+    """
+    Компактное представление анкеты музыканта для показа в ленте.
+    Только простые типы — словарь хранится в данных FSM.
+    """
+    return {
+        "id": user.id,
+        "version": user.version,
+        "name": user.name,
+        "age": user.age,
+        "city": user.city,
+        "about_me": user.about_me,
+        "theory_level": user.theoretical_knowledge_level,
+        "experience": getattr(user.has_performance_experience, 'value', None),
+        "external_link": user.external_link,
+        "contacts": user.contacts,
+        "photo": user.photo_path,
+        "audio": user.audio_path,
+        "genres": [genre.name for genre in user.genres or []],
+        "instruments": [[instrument.name, instrument.proficiency_level] for instrument in user.instruments or []],
+    }
+
+
+def band_card(band: GroupProfile) -> Dict[str, Any]:
+    """Компактное представление анкеты группы для показа в ленте."""
+    level_raw = band.seriousness_level
+    level = level_raw.value if hasattr(level_raw, 'value') else level_raw
+
+    return {
+        "id": band.id,
+        "version": band.version,
+        "name": band.name,
+        "formation_date": band.formation_date,
+        "city": band.city,
+        "description": band.description,
+        "seriousness_level": level,
+        "genres": [genre.name for genre in band.genres or []],
+    }
@@ -0,0 +1,176 @@
+import difflib
+import logging
+import math
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import City, CityAlias
+
+logger = logging.getLogger(__name__)
+
+# Насколько написание должно быть похоже на известный город, чтобы считаться опечаткой (0..1)
+CITY_TYPO_CUTOFF = float(os.getenv("CITY_TYPO_CUTOFF", "0.85"))
+# Ширина шага расстояния в км: внутри шага анкеты идут в случайном порядке, ближние шаги — раньше
+DISTANCE_STEP_KM = float(os.getenv("DISTANCE_STEP_KM", "25"))
+
+EARTH_RADIUS_KM = 6371.0
+
+_CITY_PREFIX = re.compile(r"^(г\.|г |город )")
+_SEPARATORS = re.compile(r"[\s\-]+")
+
+
+def normalize_city(city: Optional[str]) -> str:
+    """Ключ написания города: без регистра, «ё», префикса «г.» и лишних пробелов и дефисов."""
+    key = (city or "").strip().casefold().replace("ё", "е")
+    key = _CITY_PREFIX.sub("", key).strip()
+    return _SEPARATORS.sub(" ", key)
+
+
+def split_cities(city: Optional[str]) -> List[str]:
+    """Поле city анкеты музыканта — один или несколько городов через запятую."""
+    return [part.strip() for part in (city or "").split(",") if part.strip()]
+
+
+def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Расстояние по поверхности Земли между точками (широта, долгота) в градусах."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class CityRegistry:
+    """
+    Справочник городов в памяти процесса: ключ написания -> id города из таблицы cities.
+    Написание сопоставляется с городом один раз при записи анкеты (resolve),
+    а фильтры ленты только ищут готовые id (lookup) — без ILIKE по тексту.
+    Расстояния между городами с координатами считаются один раз при загрузке,
+    поэтому радиус и сортировка ленты по близости не обращаются к БД.
+    Анкетам, записанным в обход бота (Go-бэкенд), id городов проставляет триггер в БД
+    (миграция a7e4c2d9f316) — без распознавания опечаток; добавленные им города
+    попадают в память при синхронизации индекса фильтров.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._aliases: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        # city_id -> {city_id -> км}, только для городов с координатами
+        self._distances: Dict[int, Dict[int, float]] = {}
+
+    async def load(self, session: AsyncSession) -> None:
+        rows = (await session.execute(select(City.id, City.name, City.latitude, City.longitude))).all()
+        self._names = {row.id: row.name for row in rows}
+        self._aliases = dict((await session.execute(select(CityAlias.alias, CityAlias.city_id))).all())
+
+        points = {row.id: (row.latitude, row.longitude) for row in rows if row.latitude is not None and row.longitude is not None}
+        self._distances = {
+            a: {b: haversine_km(point_a, point_b) for b, point_b in points.items()}
+            for a, point_a in points.items()
+        }
+        self.loaded = True
+        logger.info(
+            "Справочник городов загружен: %d городов, %d написаний, %d с координатами",
+            len(self._names), len(self._aliases), len(self._distances)
+        )
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        if not self.loaded:
+            await self.load(session)
+
+    def _require_loaded(self) -> None:
+        # Пустой справочник превратил бы фильтр по городам в WHERE false — лучше упасть явно
+        if not self.loaded:
+            raise RuntimeError("Справочник городов не загружен: сначала вызовите city_registry.ensure_loaded(session)")
+
+    def name(self, city_id: int) -> Optional[str]:
+        return self._names.get(city_id)
+
+    def _closest(self, key: str) -> Optional[int]:
+        match = difflib.get_close_matches(key, self._aliases.keys(), n=1, cutoff=CITY_TYPO_CUTOFF)
+        return self._aliases[match[0]] if match else None
+
+    def lookup(self, city: str) -> Optional[int]:
+        """id города по написанию или похожему написанию; неизвестный город — None."""
+        self._require_loaded()
+        key = normalize_city(city)
+        if not key:
+            return None
+        return self._aliases.get(key) or self._closest(key)
+
+    def lookup_ids(self, cities: Iterable[str]) -> List[int]:
+        return list(dict.fromkeys(
+            city_id for city_id in (self.lookup(city) for city in cities) if city_id is not None
+        ))
+
+    def distances_from(self, origin_ids: Iterable[int]) -> Dict[int, float]:
+        """
+        Расстояние в км от ближайшего из городов origin_ids до каждого города с координатами.
+        Сами города origin_ids всегда на расстоянии 0, даже если их координаты неизвестны.
+        """
+        self._require_loaded()
+        origin_ids = list(origin_ids)
+        result: Dict[int, float] = {}
+        for origin_id in origin_ids:
+            for city_id, km in self._distances.get(origin_id, {}).items():
+                if km < result.get(city_id, math.inf):
+                    result[city_id] = km
+        for origin_id in origin_ids:
+            result[origin_id] = 0.0
+        return result
+
+    def ids_within(self, origin_ids: Iterable[int], radius_km: float) -> List[int]:
+        """id городов не дальше radius_km от любого из городов origin_ids."""
+        return [city_id for city_id, km in self.distances_from(origin_ids).items() if km <= radius_km]
+
+    def distance_buckets(self, origin_ids: Iterable[int]) -> List[List[int]]:
+        """
+        id городов, разбитые по шагам расстояния DISTANCE_STEP_KM от origin_ids, от ближних к дальним.
+        Города без координат ни в один шаг не попадают — их анкеты идут после всех.
+        """
+        buckets: Dict[int, List[int]] = {}
+        for city_id, km in self.distances_from(origin_ids).items():
+            buckets.setdefault(int(km // DISTANCE_STEP_KM), []).append(city_id)
+        return [buckets[step] for step in sorted(buckets)]
+
+    async def resolve(self, session: AsyncSession, city: str) -> Optional[int]:
+        """
+        id города для записи в анкету. Опечатка в известном городе запоминается как его написание,
+        новый город добавляется в справочник. Вставки идемпотентны — другие реплики бота могли
+        добавить тот же город раньше.
+        """
+        key = normalize_city(city)
+        if not key:
+            return None
+        await self.ensure_loaded(session)
+        if key in self._aliases:
+            return self._aliases[key]
+
+        city_id = self._closest(key)
+        if city_id is None:
+            name = city.strip()
+            await session.execute(insert(City).values(name=name).on_conflict_do_nothing(index_elements=[City.name]))
+            city_id = await session.scalar(select(City.id).where(City.name == name))
+            self._names[city_id] = name
+            logger.info("В справочник добавлен город %r (ID=%s)", name, city_id)
+        else:
+            logger.info("Написание %r сопоставлено с городом %r", city, self._names.get(city_id))
+
+        await session.execute(
+            insert(CityAlias).values(alias=key, city_id=city_id).on_conflict_do_nothing(index_elements=[CityAlias.alias])
+        )
+        # Написание могла раньше закрепить другая реплика — верим таблице
+        city_id = await session.scalar(select(CityAlias.city_id).where(CityAlias.alias == key))
+        self._aliases[key] = city_id
+        return city_id
+
+    async def resolve_many(self, session: AsyncSession, cities: Iterable[str]) -> List[int]:
+        ids = [await self.resolve(session, city) for city in cities]
+        return list(dict.fromkeys(city_id for city_id in ids if city_id is not None))
+
+
+city_registry = CityRegistry()
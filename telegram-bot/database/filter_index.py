@@ -0,0 +1,241 @@
+import logging
+import random
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .city_registry import city_registry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexedProfile:
+    """Поля анкеты музыканта, по которым работают фильтры ленты."""
+    id: int
+    is_visible: bool = True
+    city_ids: Tuple[int, ...] = ()
+    age: Optional[int] = None
+    theory_level: Optional[int] = None
+    experience: Optional[str] = None
+    genres: Tuple[str, ...] = ()
+    # Инструмент -> уровень владения (нужен для сортировки при фильтре по инструментам)
+    instruments: Dict[str, int] = field(default_factory=dict)
+
+
+class ProfileFilterIndex:
+    """
+    Инвертированный индекс анкет музыкантов в памяти процесса.
+    Жанры, инструменты, города и опыт — списки id (posting lists),
+    возраст и уровень теории — отсортированные массивы пар (значение, id).
+    Подбор кандидатов сводится к пересечению множеств.
+
+    Индекс живет в памяти одного процесса: правки из этого процесса попадают в него сразу
+    после коммита, а правки других реплик и Go-бэкенда — при периодической синхронизации
+    по users.updated_at (queries.sync_filter_index). synced_at — до какого момента изменения уже учтены.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.synced_at: Optional[datetime] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._profiles: Dict[int, IndexedProfile] = {}
+        self._visible: Set[int] = set()
+        self._by_genre: Dict[str, Set[int]] = {}
+        self._by_instrument: Dict[str, Set[int]] = {}
+        self._by_city: Dict[int, Set[int]] = {}
+        self._by_experience: Dict[str, Set[int]] = {}
+        self._ages: List[Tuple[int, int]] = []
+        self._theory_levels: List[Tuple[int, int]] = []
+
+    def load(self, profiles: Iterable[IndexedProfile], synced_at: Optional[datetime] = None) -> None:
+        """Полностью перестраивает индекс. Отсортированные массивы сортируются один раз, а не вставкой на каждую анкету."""
+        self._reset()
+        for profile in profiles:
+            self._add(profile, keep_sorted=False)
+        self._ages.sort()
+        self._theory_levels.sort()
+        self.synced_at = synced_at
+        self.loaded = True
+        logger.info("Индекс фильтров загружен: %d анкет", len(self._profiles))
+
+    def sync(self, changed: Iterable[IndexedProfile], existing_ids: Set[int], synced_at: datetime) -> None:
+        """Применяет изменения, сделанные вне процесса: перечитанные анкеты и удаленные пользователи."""
+        for profile in changed:
+            self.upsert(profile)
+        for user_id in self._profiles.keys() - existing_ids:
+            self.remove(user_id)
+        self.synced_at = synced_at
+
+    def upsert(self, profile: IndexedProfile) -> None:
+        self.remove(profile.id)
+        self._add(profile)
+
+    def remove(self, user_id: int) -> None:
+        profile = self._profiles.pop(user_id, None)
+        if profile is None:
+            return
+
+        self._visible.discard(user_id)
+        for genre in profile.genres:
+            self._discard(self._by_genre, genre, user_id)
+        for instrument in profile.instruments:
+            self._discard(self._by_instrument, instrument, user_id)
+        for city_id in profile.city_ids:
+            self._discard(self._by_city, city_id, user_id)
+        if profile.experience:
+            self._discard(self._by_experience, profile.experience, user_id)
+        if profile.age is not None:
+            self._remove_sorted(self._ages, (profile.age, user_id))
+        if profile.theory_level is not None:
+            self._remove_sorted(self._theory_levels, (profile.theory_level, user_id))
+
+    def get_age(self, user_id: int) -> Optional[int]:
+        profile = self._profiles.get(user_id)
+        return profile.age if profile else None
+
+    def get_city_ids(self, user_id: int) -> Tuple[int, ...]:
+        profile = self._profiles.get(user_id)
+        return profile.city_ids if profile else ()
+
+    def select(
+            self,
+            swiper_id: int,
+            filters: Optional[dict],
+            exclude_ids: Iterable[int],
+            limit: int) -> List[int]:
+        """
+        Возвращает до limit id подходящих анкет: сначала из ближних к свайперу городов,
+        внутри одного шага расстояния — в случайном порядке.
+        Семантика совпадает с SQL-фильтрами в queries._profile_filter_conditions.
+        """
+        candidates = set(self._visible)
+        candidates.discard(swiper_id)
+        candidates.difference_update(exclude_ids)
+        origin_ids = self.get_city_ids(swiper_id)
+
+        instruments = None
+        if filters:
+            # --- ГОРОДА: по id из справочника, неизвестный город ничего не находит ---
+            if cities := filters.get('cities'):
+                candidates &= self._union(self._by_city, city_registry.lookup_ids(cities))
+
+            # --- РАДИУС: города не дальше radius_km от городов свайпера ---
+            radius_km = filters.get('radius_km')
+            if isinstance(radius_km, int) and origin_ids:
+                candidates &= self._union(self._by_city, city_registry.ids_within(origin_ids, radius_km))
+
+            if genres := filters.get('genres'):
+                candidates &= self._union(self._by_genre, genres)
+
+            if instruments := filters.get('instruments'):
+                candidates &= self._union(self._by_instrument, instruments)
+
+            if experience := filters.get('experience'):
+                candidates &= self._union(self._by_experience, experience)
+
+            age_mode = filters.get('age_mode')
+            swiper_age = self.get_age(swiper_id)
+            if age_mode and age_mode != 'all' and swiper_age is not None:
+                if age_mode == 'peers':
+                    candidates &= self._range(self._ages, swiper_age - 2, swiper_age + 2)
+                elif age_mode == 'older':
+                    candidates &= self._range(self._ages, swiper_age + 1, None)
+                elif age_mode == 'younger':
+                    candidates &= self._range(self._ages, None, swiper_age - 1)
+                # Неизвестный режим не фильтрует — как и в SQL
+
+            min_level = filters.get('min_level')
+            if isinstance(min_level, int):
+                candidates &= self._range(self._theory_levels, min_level, None)
+
+        buckets = city_registry.distance_buckets(origin_ids)
+        if not instruments:
+            return self._nearest_first(candidates, buckets, limit)
+
+        # При фильтре по инструментам сначала те, кто лучше владеет выбранным инструментом, затем ближние
+        def best_level(user_id: int) -> int:
+            levels = self._profiles[user_id].instruments
+            return max((levels[name] or 0) for name in instruments if name in levels)
+
+        city_steps = {city_id: step for step, city_ids in enumerate(buckets) for city_id in city_ids}
+
+        def distance_step(user_id: int) -> int:
+            return min((city_steps.get(city_id, len(buckets)) for city_id in self._profiles[user_id].city_ids),
+                       default=len(buckets))
+
+        ordered = sorted(
+            candidates, key=lambda user_id: (-best_level(user_id), distance_step(user_id), random.random())
+        )
+        return ordered[:limit]
+
+    def _nearest_first(self, candidates: Set[int], buckets: List[List[int]], limit: int) -> List[int]:
+        """Случайная выборка по шагам расстояния: пока ближний шаг не исчерпан, дальние не берем."""
+        result = []
+        for city_ids in buckets:
+            if len(result) >= limit:
+                break
+            near = self._union(self._by_city, city_ids) & candidates
+            candidates -= near
+            result += random.sample(list(near), min(limit - len(result), len(near)))
+
+        # Анкеты из городов без координат — после всех
+        if len(result) < limit:
+            result += random.sample(list(candidates), min(limit - len(result), len(candidates)))
+        return result
+
+    def _add(self, profile: IndexedProfile, keep_sorted: bool = True) -> None:
+        self._profiles[profile.id] = profile
+        if profile.is_visible:
+            self._visible.add(profile.id)
+        for genre in profile.genres:
+            self._by_genre.setdefault(genre, set()).add(profile.id)
+        for instrument in profile.instruments:
+            self._by_instrument.setdefault(instrument, set()).add(profile.id)
+        for city_id in profile.city_ids:
+            self._by_city.setdefault(city_id, set()).add(profile.id)
+        if profile.experience:
+            self._by_experience.setdefault(profile.experience, set()).add(profile.id)
+        if profile.age is not None:
+            self._insert(self._ages, (profile.age, profile.id), keep_sorted)
+        if profile.theory_level is not None:
+            self._insert(self._theory_levels, (profile.theory_level, profile.id), keep_sorted)
+
+    @staticmethod
+    def _insert(sorted_pairs: List[Tuple[int, int]], item: Tuple[int, int], keep_sorted: bool) -> None:
+        if keep_sorted:
+            insort(sorted_pairs, item)
+        else:
+            sorted_pairs.append(item)
+
+    @staticmethod
+    def _union(postings: Dict, keys: Iterable) -> Set[int]:
+        result = set()
+        for key in keys:
+            result |= postings.get(key, set())
+        return result
+
+    @staticmethod
+    def _range(sorted_pairs: List[Tuple[int, int]], low: Optional[int], high: Optional[int]) -> Set[int]:
+        """id, у которых значение в [low, high]; None — граница не задана."""
+        start = 0 if low is None else bisect_left(sorted_pairs, (low, float("-inf")))
+        end = len(sorted_pairs) if high is None else bisect_right(sorted_pairs, (high, float("inf")))
+        return {user_id for _, user_id in sorted_pairs[start:end]}
+
+    @staticmethod
+    def _discard(postings: Dict, key, user_id: int) -> None:
+        ids = postings.get(key)
+        if ids is None:
+            return
+        ids.discard(user_id)
+        if not ids:
+            del postings[key]
+
+    @staticmethod
+    def _remove_sorted(sorted_pairs: List[Tuple[int, int]], item: Tuple[int, int]) -> None:
+        position = bisect_left(sorted_pairs, item)
+        if position < len(sorted_pairs) and sorted_pairs[position] == item:
+            del sorted_pairs[position]
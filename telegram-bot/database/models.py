@@ -1,6 +1,7 @@
 from sqlalchemy import (
-    BigInteger, Integer, String, ForeignKey, Enum as SQLEnum, ARRAY, Text, JSON, DateTime, Boolean
+    BigInteger, Integer, Float, String, ForeignKey, Enum as SQLEnum, Text, JSON, DateTime, Boolean, Index, func, text
 )
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
@@ -13,10 +14,22 @@ class Base(DeclarativeBase):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Лента анкет: только видимые анкеты, фильтр по возрасту
+        Index("ix_users_visible_age", "age", postgresql_where=text("is_visible")),
+        # Фильтры ленты по жанрам и инструментам: пересечение массивов (&&)
+        Index("ix_users_genre_names", "genre_names", postgresql_using="gin"),
+        Index("ix_users_instrument_names", "instrument_names", postgresql_using="gin"),
+        Index("ix_users_city_ids", "city_ids", postgresql_using="gin"),
+        # Синхронизация индекса фильтров: анкеты, измененные после прошлого прохода
+        Index("ix_users_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
 
     city: Mapped[str] = mapped_column(String, nullable=True)
+    # Города из city (их может быть несколько через запятую) по справочнику cities
+    city_ids: Mapped[List[int]] = mapped_column(ARRAY(Integer), default=list, server_default="{}", nullable=False)
 
     contacts: Mapped[str] = mapped_column(String, nullable=True)
 
@@ -33,6 +46,19 @@ class User(Base):
 
     is_visible: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
+    # Растет при каждом изменении анкеты — ключ кэша карточек
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+    # Время последнего изменения строки — по нему реплики подтягивают чужие правки в индекс фильтров
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    # Копии названий из user_genres и instruments для фильтров без подзапросов;
+    # обновляются вместе с дочерними таблицами в database.queries, а при правках в обход бота
+    # (Go-бэкенд) — триггерами на дочерних таблицах (миграция 8d3a5f7c2e91)
+    genre_names: Mapped[List[str]] = mapped_column(ARRAY(Text), default=list, server_default="{}", nullable=False)
+    instrument_names: Mapped[List[str]] = mapped_column(ARRAY(Text), default=list, server_default="{}", nullable=False)
+
     instruments: Mapped[List["Instrument"]] = relationship(
         back_populates="user",
         cascade="all, delete-orphan",
@@ -47,6 +73,9 @@ class User(Base):
 
 class Instrument(Base):
     __tablename__ = "instruments"
+    __table_args__ = (
+        Index("ix_instruments_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -57,6 +86,10 @@ class Instrument(Base):
 
 class UserGenre(Base):
     __tablename__ = "user_genres"
+    __table_args__ = (
+        # Фильтр по жанрам: EXISTS (... WHERE name IN (...) AND user_id = users.id)
+        Index("ix_user_genres_name_user_id", "name", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -66,6 +99,10 @@ class UserGenre(Base):
 
 class GroupGenre(Base):
     __tablename__ = "group_genres"
+    __table_args__ = (
+        Index("ix_group_genres_group_id", "group_id"),
+        Index("ix_group_genres_name_group_id", "name", "group_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("group_profiles.id", ondelete="CASCADE"), nullable=False)
@@ -75,11 +112,19 @@ class GroupGenre(Base):
 
 class GroupProfile(Base):
     __tablename__ = "group_profiles"
+    __table_args__ = (
+        # Лента групп: только видимые группы
+        Index("ix_group_profiles_visible", "id", postgresql_where=text("is_visible")),
+        Index("ix_group_profiles_genre_names", "genre_names", postgresql_using="gin"),
+        Index("ix_group_profiles_city_id", "city_id"),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
 
     name: Mapped[str] = mapped_column(String, nullable=False)
     city: Mapped[str] = mapped_column(String, nullable=True)
+    # Город из city по справочнику cities
+    city_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     formation_date: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     platforms: Mapped[Optional[List[str]]] = mapped_column(ARRAY(String), nullable=True)
@@ -87,6 +132,12 @@ class GroupProfile(Base):
 
     is_visible: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
+    # Растет при каждом изменении анкеты — ключ кэша карточек
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+
+    # Копия названий из group_genres для фильтров без подзапросов; поддерживается и триггером на group_genres
+    genre_names: Mapped[List[str]] = mapped_column(ARRAY(Text), default=list, server_default="{}", nullable=False)
+
     seriousness_level: Mapped[Optional[SeriousnessLevel]] = mapped_column(
         SQLEnum(SeriousnessLevel, name='seriousness_level'), nullable=True
     )
@@ -114,8 +165,31 @@ class GroupProfile(Base):
         lazy="joined"
     )
 
+class City(Base):
+    """Справочник городов: каноническое название, id для фильтров ленты и координаты для расстояний."""
+    __tablename__ = "cities"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
+    # Координаты известны только для заведенных вручную городов; новые города их не получают
+    latitude: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    longitude: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+class CityAlias(Base):
+    """Известные написания городов (регистр, «ё», опечатки) — ключ из city_registry.normalize_city."""
+    __tablename__ = "city_aliases"
+    __table_args__ = (
+        Index("ix_city_aliases_city_id", "city_id"),
+    )
+
+    alias: Mapped[str] = mapped_column(Text, primary_key=True)
+    city_id: Mapped[int] = mapped_column(Integer, ForeignKey("cities.id", ondelete="CASCADE"), nullable=False)
+
 class GroupMember(Base):
     __tablename__ = "group_members"
+    __table_args__ = (
+        Index("ix_group_members_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     group_id: Mapped[int] = mapped_column(
@@ -133,6 +207,13 @@ class GroupMember(Base):
 
 class UserLikesUser(Base):
     __tablename__ = "user_likes_user"
+    __table_args__ = (
+        # Один свайп на пару; это же индекс по свайперу (просмотренные анкеты)
+        Index("idx_unique_swipe", "swiper_user_id", "target_user_id", unique=True),
+        # Кто меня лайкнул / мэтчи: WHERE target_user_id = ? AND action = 'LIKE'
+        Index("ix_user_likes_user_target_action", "target_user_id", "action",
+              postgresql_include=["swiper_user_id"]),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -160,8 +241,60 @@ class UserLikesUser(Base):
     target: Mapped["User"] = relationship(foreign_keys=[target_user_id])
 
 
+class Match(Base):
+    """Взаимный лайк: по строке на каждого участника пары, чтобы список мэтчей читался по одному индексу."""
+    __tablename__ = "matches"
+    __table_args__ = (
+        # Список мэтчей: WHERE user_id = ? AND (created_at, matched_user_id) < (?, ?) ORDER BY ... DESC
+        Index("ix_matches_user_created", "user_id", "created_at", "matched_user_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    matched_user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Время второго лайка пары
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
+class LikeInbox(Base):
+    """Входящий лайк, на который получатель еще не ответил своим свайпом."""
+    __tablename__ = "like_inbox"
+    __table_args__ = (
+        # Очередь лайков: WHERE user_id = ? AND (created_at, liker_id) > (?, ?) ORDER BY created_at, liker_id
+        Index("ix_like_inbox_user_created", "user_id", "created_at", "liker_id"),
+    )
+
+    # Кого лайкнули
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Кто лайкнул
+    liker_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
 class UserLikesGroup(Base):
     __tablename__ = "user_likes_group"
+    __table_args__ = (
+        Index("ux_user_likes_group_swiper_target", "swiper_user_id", "target_group_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -194,4 +327,6 @@ class AnalyticsEvent(Base):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     user_id: Mapped[int] = mapped_column(BigInteger)
     event_name: Mapped[str] = mapped_column(Text)
+    # Событие без параметров — SQL NULL, а не JSON null
+    params: Mapped[Optional[dict]] = mapped_column(JSONB(none_as_null=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
\ No newline at end of file
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from .session import run_detached
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Фоновая задача: раз в interval секунд вызывает job. Ошибка одного прохода не останавливает следующие."""
+
+    def __init__(self, job: Callable[[], Awaitable[None]], interval: float, name: str):
+        self._job = job
+        self._interval = interval
+        self._name = name
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None and self._interval > 0:
+            self._task = run_detached(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self._job()
+            except Exception:
+                logger.exception("Ошибка фоновой задачи «%s»", self._name)
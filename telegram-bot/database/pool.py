@@ -0,0 +1,30 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from metrics.db.counters import db_pool_checkout_timeouts
+from metrics.db.gauges import db_pool_size, db_pool_checked_out, db_pool_checked_in, db_pool_overflow
+from metrics.db.histograms import db_pool_checkout_wait
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений asyncpg, который пишет время ожидания соединения в Prometheus."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            db_pool_checkout_timeouts.inc()
+            raise
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started)
+
+
+def bind_pool_metrics(pool: InstrumentedQueuePool) -> None:
+    """Гейджи состояния пула читаются при каждом запросе /metrics."""
+    db_pool_size.set_function(pool.size)
+    db_pool_checked_out.set_function(pool.checkedout)
+    db_pool_checked_in.set_function(pool.checkedin)
+    db_pool_overflow.set_function(pool.overflow)
@@ -1,26 +1,308 @@
+import functools
 import logging
-from datetime import datetime, timezone
+import os
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
 from venv import logger
 
-from sqlalchemy import select, update, delete, insert, func, exists, and_, or_
+from sqlalchemy import select, update, delete, insert, func, exists, and_, all_, literal, tuple_, false, case, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.dialects.postgresql import Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import aliased, joinedload, selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from handlers.enums.seriousness_level import SeriousnessLevel
 from .enums import PerformanceExperience, Actions
 from .models import User, Instrument, GroupMember, GroupProfile, UserGenre, GroupGenre, UserLikesUser, UserLikesGroup, \
-    AnalyticsEvent
-from .session import AsyncSessionLocal
+    AnalyticsEvent, Match, LikeInbox
+from .analytics_pipeline import AnalyticsPipeline
+from .candidate_deck import CandidateDeck
+from .cache_bus import cache_bus
+from .cards import user_card, band_card, user_cards, band_cards
+from .city_registry import city_registry, split_cities
+from .filter_index import IndexedProfile, ProfileFilterIndex
+from .periodic import PeriodicTask
+from .registration_status import RegistrationStatus, registration_statuses
+from .seen_index import SeenIndex
+from .swipe_buffer import Swipe, SwipeWriteBuffer
+from .ttl_cache import TTLCache
+from .query_metrics import timed_query
+from .session import AsyncSessionLocal, after_commit, run_detached, session_scope
+
+# Сколько секунд показываем закэшированное число непрочитанных лайков
+LIKE_INBOX_COUNT_TTL = float(os.getenv("LIKE_INBOX_COUNT_TTL", "60"))
+
+# Как часто (сек) индекс фильтров подтягивает изменения других реплик; 0 — не синхронизировать
+FILTER_INDEX_SYNC_INTERVAL = float(os.getenv("FILTER_INDEX_SYNC_INTERVAL", "30"))
+# Запас (сек) к метке синхронизации: транзакция могла поставить updated_at раньше, а закоммититься позже
+FILTER_INDEX_SYNC_OVERLAP = float(os.getenv("FILTER_INDEX_SYNC_OVERLAP", "60"))
+
+# user_id -> число лайков во входящих
+like_inbox_counts = TTLCache(ttl=LIKE_INBOX_COUNT_TTL)
+
+
+@timed_query
+async def _write_swipes(batch: list[Swipe]) -> None:
+    """Пишет пачку свайпов одним многострочным INSERT на таблицу в одной транзакции."""
+    user_swipes = [swipe for swipe in batch if not swipe.is_group]
+    user_rows = [
+        {
+            "swiper_user_id": swipe.swiper_id,
+            "target_user_id": swipe.target_id,
+            "action": swipe.action.value,
+            "created_at": swipe.created_at,
+        }
+        for swipe in user_swipes
+    ]
+    group_rows = [
+        {
+            "swiper_user_id": swipe.swiper_id,
+            "target_group_id": swipe.target_id,
+            "action": swipe.action.value,
+            "created_at": swipe.created_at,
+        }
+        for swipe in batch if swipe.is_group
+    ]
 
-async def check_user(user_id: int) -> bool:
     async with AsyncSessionLocal() as session:
-        result = await session.execute(select(User).where(User.id == user_id))
-        return result.unique().scalar_one_or_none() is not None
+        async with session.begin():
+            if user_rows:
+                await session.execute(pg_insert(UserLikesUser).values(user_rows).on_conflict_do_nothing())
+                await _write_swipe_effects(session, user_swipes)
+            if group_rows:
+                await session.execute(pg_insert(UserLikesGroup).values(group_rows).on_conflict_do_nothing())
+
+    # Входящие лайки поменялись у получателей лайков и у тех, кто ответил на лайк
+    for swipe in user_swipes:
+        cache_bus.publish("like_inbox_count", swipe.swiper_id)
+        if swipe.action == Actions.LIKE:
+            cache_bus.publish("like_inbox_count", swipe.target_id)
+
+
+@timed_query
+async def _write_swipe_effects(session: AsyncSession, swipes: list[Swipe]) -> None:
+    """
+    Обновляет мэтчи и входящие лайки по свайпам пачки.
+    Вызывается в транзакции записи свайпов — производные таблицы меняются вместе со свайпами.
+    """
+    # Оба направления каждой пары: что записано в БД (свайп мог не записаться, если уже был)
+    pairs = {(swipe.swiper_id, swipe.target_id) for swipe in swipes}
+    pairs |= {(target_id, swiper_id) for swiper_id, target_id in pairs}
+    result = await session.execute(
+        select(UserLikesUser.swiper_user_id, UserLikesUser.target_user_id, UserLikesUser.action)
+        .where(tuple_(UserLikesUser.swiper_user_id, UserLikesUser.target_user_id).in_(list(pairs)))
+    )
+    stored = {(swiper_id, target_id): action for swiper_id, target_id, action in result.tuples().all()}
+
+    matches = {}
+    inbox = []
+    for swipe in swipes:
+        pair, reverse = (swipe.swiper_id, swipe.target_id), (swipe.target_id, swipe.swiper_id)
+        if stored.get(pair) != Actions.LIKE:
+            continue
+
+        if stored.get(reverse) == Actions.LIKE:
+            # Второй лайк пары — мэтч, по строке на каждого участника
+            for user_id, matched_user_id in (pair, reverse):
+                matches.setdefault((user_id, matched_user_id), {
+                    "user_id": user_id, "matched_user_id": matched_user_id, "created_at": swipe.created_at,
+                })
+        elif reverse not in stored:
+            # Получатель еще не видел свайпера — лайк попадает к нему во входящие
+            inbox.append({"user_id": swipe.target_id, "liker_id": swipe.swiper_id, "created_at": swipe.created_at})
+
+    if matches:
+        await session.execute(pg_insert(Match).values(list(matches.values())).on_conflict_do_nothing())
+    if inbox:
+        await session.execute(pg_insert(LikeInbox).values(inbox).on_conflict_do_nothing())
+
+    # Любой свайп — ответ на входящий лайк от этой анкеты, если он был
+    await session.execute(
+        delete(LikeInbox).where(
+            tuple_(LikeInbox.user_id, LikeInbox.liker_id).in_([(swipe.swiper_id, swipe.target_id) for swipe in swipes])
+        )
+    )
+
+
+swipe_buffer = SwipeWriteBuffer(writer=_write_swipes)
+
+
+@timed_query
+async def _load_seen_users(swiper_id: int) -> list[int]:
+    """Все анкеты музыкантов, по которым свайпер уже сделал действие (включая еще не записанные)."""
+    async with session_scope() as session:
+        result = await session.execute(
+            select(UserLikesUser.target_user_id).where(UserLikesUser.swiper_user_id == swiper_id)
+        )
+        return list(result.scalars().all()) + list(swipe_buffer.pending_targets(swiper_id))
+
+
+@timed_query
+async def _load_seen_groups(swiper_id: int) -> list[int]:
+    """Все группы, по которым свайпер уже сделал действие (включая еще не записанные)."""
+    async with session_scope() as session:
+        result = await session.execute(
+            select(UserLikesGroup.target_group_id).where(UserLikesGroup.swiper_user_id == swiper_id)
+        )
+        return list(result.scalars().all()) + list(swipe_buffer.pending_targets(swiper_id, is_group=True))
+
+
+seen_users = SeenIndex(loader=_load_seen_users)
+seen_groups = SeenIndex(loader=_load_seen_groups)
+
+# Кэши в памяти процесса; при нескольких репликах их изменения расходятся по cache_bus
+cache_bus.register("like_inbox_count", like_inbox_counts.invalidate, like_inbox_counts.clear)
+cache_bus.register("registration_status", registration_statuses.invalidate, registration_statuses.clear)
+cache_bus.register("seen_user", seen_users.add, seen_users.clear)
+cache_bus.register("seen_group", seen_groups.add, seen_groups.clear)
+
 
-async def get_user(user_id: int) -> User | None:
+def _not_seen(column, seen_ids):
+    """Условие column <> ALL(:seen) — один параметр-массив вместо подзапроса по таблице свайпов."""
+    return column != all_(literal(list(seen_ids), ARRAY(BigInteger)))
+
+
+profile_index = ProfileFilterIndex()
+
+
+@timed_query
+async def _load_indexed_profiles(
+        session: AsyncSession,
+        user_ids: list[int] | None = None,
+        changed_since: datetime | None = None) -> list[IndexedProfile]:
+    """Читает поля для индекса фильтров: два плоских запроса вместо join с размножением строк."""
+    users_stmt = select(
+        User.id, User.is_visible, User.city_ids, User.age,
+        User.theoretical_knowledge_level, User.has_performance_experience, User.genre_names
+    )
+    instruments_stmt = select(Instrument.user_id, Instrument.name, Instrument.proficiency_level)
+
+    if user_ids is not None:
+        users_stmt = users_stmt.where(User.id.in_(user_ids))
+        instruments_stmt = instruments_stmt.where(Instrument.user_id.in_(user_ids))
+    if changed_since is not None:
+        users_stmt = users_stmt.where(User.updated_at > changed_since)
+        instruments_stmt = instruments_stmt.where(
+            Instrument.user_id.in_(select(User.id).where(User.updated_at > changed_since))
+        )
+
+    profiles = {
+        row.id: IndexedProfile(
+            id=row.id,
+            is_visible=row.is_visible,
+            city_ids=tuple(row.city_ids),
+            age=row.age,
+            theory_level=row.theoretical_knowledge_level,
+            experience=getattr(row.has_performance_experience, 'value', None),
+            genres=tuple(row.genre_names),
+        )
+        for row in await session.execute(users_stmt)
+    }
+
+    for user_id, name, level in await session.execute(instruments_stmt):
+        if user_id in profiles:
+            profiles[user_id].instruments[name] = level
+
+    return list(profiles.values())
+
+
+@timed_query
+async def load_filter_index() -> None:
+    """Загружает индекс фильтров ленты при старте бота."""
     async with AsyncSessionLocal() as session:
+        # Справочник нужен индексу и SQL-фильтрам, чтобы переводить города из фильтров в id
+        await city_registry.load(session)
+        synced_at = await session.scalar(select(func.now()))
+        profile_index.load(await _load_indexed_profiles(session), synced_at)
+
+
+@timed_query
+async def sync_filter_index() -> None:
+    """
+    Подтягивает в индекс анкеты, измененные другими репликами и Go-бэкендом после прошлой синхронизации,
+    и убирает удаленные. Справочник городов перечитывается целиком — он маленький.
+    """
+    if not profile_index.loaded:
+        return
+
+    async with AsyncSessionLocal() as session:
+        await city_registry.load(session)
+        synced_at = await session.scalar(select(func.now()))
+        changed_since = profile_index.synced_at - timedelta(seconds=FILTER_INDEX_SYNC_OVERLAP)
+        changed = await _load_indexed_profiles(session, changed_since=changed_since)
+        existing_ids = set((await session.scalars(select(User.id))).all())
+
+    profile_index.sync(changed, existing_ids, synced_at)
+
+
+filter_index_sync = PeriodicTask(sync_filter_index, FILTER_INDEX_SYNC_INTERVAL, "синхронизация индекса фильтров")
+
+
+def _refresh_profile_index(session: AsyncSession, user_id: int) -> None:
+    """После коммита изменения анкеты перечитывает ее в индекс фильтров — в фоне, своей сессией."""
+    if profile_index.loaded:
+        after_commit(lambda: run_detached(_reload_indexed_profile(user_id)), session)
+
+
+@timed_query
+async def _reload_indexed_profile(user_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        profiles = await _load_indexed_profiles(session, [user_id])
+
+    if profiles:
+        profile_index.upsert(profiles[0])
+    else:
+        profile_index.remove(user_id)
+
+
+@timed_query
+async def _bump_user_version(session: AsyncSession, user_id: int) -> None:
+    """Новая версия анкеты музыканта — закэшированные карточки с прежней версией больше не используются."""
+    await session.execute(update(User).where(User.id == user_id).values(version=User.version + 1))
+
+
+@timed_query
+async def check_user(user_id: int, session: AsyncSession | None = None) -> bool:
+    async with session_scope(session) as session:
+        return bool(await session.scalar(select(exists().where(User.id == user_id))))
+
+
+@timed_query
+async def get_registration_status(user_id: int, session: AsyncSession | None = None) -> RegistrationStatus:
+    """
+    Зарегистрирован ли пользователь и id его группы — для /start и главного меню.
+    При промахе кэша — один запрос по первичному ключу и индексу участников групп, без загрузки анкеты.
+    """
+    status = registration_statuses.get(user_id)
+    if status is not None:
+        return status
+
+    async with session_scope(session) as session:
+        row = (await session.execute(
+            select(
+                exists().where(User.id == user_id),
+                select(GroupMember.group_id).where(GroupMember.user_id == user_id).limit(1).scalar_subquery(),
+            )
+        )).one()
+
+        status = RegistrationStatus(registered=bool(row[0]), band_id=row[1])
+        # Статус, прочитанный в транзакции с еще не закоммиченной регистрацией, кэшируем только после коммита
+        after_commit(functools.partial(registration_statuses.set, user_id, status), session)
+
+    return status
+
+
+def invalidate_registration_status(user_id: int, session: AsyncSession | None = None) -> None:
+    """
+    Вызывать после создания пользователя или группы — иначе меню покажет старый статус до истечения TTL.
+    Сброс выполняется после коммита транзакции (явной или апдейта), чтобы кэш не заполнился прежним статусом.
+    """
+    after_commit(lambda: cache_bus.publish("registration_status", user_id), session)
+
+
+@timed_query
+async def get_user(user_id: int, session: AsyncSession | None = None) -> User | None:
+    async with session_scope(session) as session:
         stmt = (
             select(User)
             .where(User.id == user_id)
@@ -31,107 +313,121 @@ async def get_user(user_id: int) -> User | None:
         return user
 
 
-async def update_user(user_id: int, **kwargs) -> None:
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user(user_id: int, session: AsyncSession | None = None, **kwargs) -> None:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(**kwargs)
+            .values(**kwargs, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
+        _refresh_profile_index(session, user_id)
 
 
-async def update_instrument_level(instrument_id: int, new_level: int) -> None:
+@timed_query
+async def update_instrument_level(instrument_id: int, new_level: int, session: AsyncSession | None = None) -> None:
     from .models import Instrument
 
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         stmt = (
             update(Instrument)
             .where(Instrument.id == instrument_id)
             .values(proficiency_level=new_level)
+            .returning(Instrument.user_id)
         )
-        await session.execute(stmt)
-        await session.commit()
+        user_id = (await session.execute(stmt)).scalar_one_or_none()
+        if user_id is not None:
+            await _bump_user_version(session, user_id)
+            _refresh_profile_index(session, user_id)
 
 
+
+@timed_query
 async def update_user_experience(
         user_id: int,
-        experience_type: PerformanceExperience) -> None:
-    async with AsyncSessionLocal() as session:
+        experience_type: PerformanceExperience,
+        session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(has_performance_experience=experience_type)
+            .values(has_performance_experience=experience_type, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
+        _refresh_profile_index(session, user_id)
 
 
-async def update_user_theory_level(user_id: int, theory_level: int) -> None:
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_theory_level(user_id: int, theory_level: int, session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
         # Формируем запрос на обновление
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(theoretical_knowledge_level=theory_level)
+            .values(theoretical_knowledge_level=theory_level, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
+        _refresh_profile_index(session, user_id)
 
-async def save_user_audio(user_id: int, file_id: str) -> None:
-    async with AsyncSessionLocal() as session:
+
+@timed_query
+async def save_user_audio(user_id: int, file_id: str, session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(audio_path=file_id)
+            .values(audio_path=file_id, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
-async def save_user_link(user_id: int, url: str) -> None:
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def save_user_link(user_id: int, url: str, session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(external_link=url)
+            .values(external_link=url, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
-async def save_user_profile_photo(user_id: int, file_id: str) -> None:
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def save_user_profile_photo(user_id: int, file_id: str, session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(photo_path=file_id)
+            .values(photo_path=file_id, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
-async def update_user_name(user_id: int, name: str) -> None:
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_name(user_id: int, name: str, session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(name=name)
+            .values(name=name, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
 
-async def update_user_city(user_id: int, city: str) -> None:
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_city(user_id: int, city: str, session: AsyncSession | None = None) -> None:
+    async with session_scope(session) as session:
+        city_ids = await city_registry.resolve_many(session, split_cities(city))
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(city=city)
+            .values(city=city, city_ids=city_ids, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
+        _refresh_profile_index(session, user_id)
 
-async def update_user_instruments(user_id: int, instruments: List[Instrument]):
-    async with AsyncSessionLocal() as session:
+
+@timed_query
+async def update_user_instruments(user_id: int, instruments: List[Instrument], session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         # Получаем пользователя
         user = await session.get(User, user_id)
         if not user:
@@ -139,21 +435,25 @@ async def update_user_instruments(user_id: int, instruments: List[Instrument]):
 
         # Обновляем relationship
         user.instruments = instruments  # Это заменяет текущие инструменты
+        user.instrument_names = list(dict.fromkeys(inst.name for inst in instruments))
+        user.version = User.version + 1
 
         session.add(user)
-        await session.commit()
 
-async def create_user(user_id: int):
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def create_user(user_id: int, session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         existing_user = await session.get(User, user_id)
         if existing_user:
             return existing_user
         user = User(id=user_id)
         session.add(user)
-        await session.commit()
+        invalidate_registration_status(user_id, session)
+        _refresh_profile_index(session, user_id)
 
-async def update_user_genres(user_id, genres_names: List[str]):
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_genres(user_id, genres_names: List[str], session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         await session.execute(
             delete(UserGenre).where(UserGenre.user_id == user_id)
         )
@@ -163,11 +463,17 @@ async def update_user_genres(user_id, genres_names: List[str]):
         ]
 
         session.add_all(new_genres)
-        await session.commit()
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(genre_names=list(dict.fromkeys(genres_names)), version=User.version + 1)
+        )
+        _refresh_profile_index(session, user_id)
 
 
-async def update_user_instruments(user_id: int, instrument_names: list):
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_instruments(user_id: int, instrument_names: list, session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         # Загружаем пользователя с инструментами
         user_stmt = select(User).where(User.id == user_id).options(selectinload(User.instruments))
         user = (await session.execute(user_stmt)).unique().scalar_one_or_none()
@@ -193,11 +499,14 @@ async def update_user_instruments(user_id: int, instrument_names: list):
             ))
 
         user.instruments.extend(new_instruments)
-        await session.commit()
+        user.instrument_names = list(dict.fromkeys(instrument_names))
+        user.version = User.version + 1
+        _refresh_profile_index(session, user_id)
 
 
-async def update_user_instruments_for_registration(user_id: int, instruments: List[Instrument]):
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_instruments_for_registration(user_id: int, instruments: List[Instrument], session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         # Получаем пользователя
         user = await session.get(User, user_id)
         if not user:
@@ -205,31 +514,35 @@ async def update_user_instruments_for_registration(user_id: int, instruments: Li
 
         # Обновляем relationship
         user.instruments = instruments  # Это заменяет текущие инструменты
+        user.instrument_names = list(dict.fromkeys(inst.name for inst in instruments))
+        user.version = User.version + 1
 
         session.add(user)
-        await session.commit()
+        _refresh_profile_index(session, user_id)
 
 
-async def update_user_about_me(user_id: int, about_me_text: str):
-    async with AsyncSessionLocal() as session:
+@timed_query
+async def update_user_about_me(user_id: int, about_me_text: str, session: AsyncSession | None = None):
+    async with session_scope(session) as session:
         user = await session.get(User, user_id)
         if user:
             user.about_me = about_me_text
-            await session.commit()
+            user.version = User.version + 1
 
-async def update_user_contacts(user_id: int, contacts_text: str) -> None:
+@timed_query
+async def update_user_contacts(user_id: int, contacts_text: str, session: AsyncSession | None = None) -> None:
     """Обновляет контактные данные пользователя."""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         stmt = (
             update(User)
             .where(User.id == user_id)
-            .values(contacts=contacts_text)
+            .values(contacts=contacts_text, version=User.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
 
-async def create_group(group_data: Dict[str, Any]) -> Optional[int]:
+@timed_query
+async def create_group(group_data: Dict[str, Any], session: AsyncSession | None = None) -> Optional[int]:
     """
     Создает новую запись GroupProfile и добавляет пользователя как первого участника.
     """
@@ -242,12 +555,14 @@ async def create_group(group_data: Dict[str, Any]) -> Optional[int]:
         "city": group_data.get("city"),
         "description": group_data.get("description"),
         "seriousness_level": group_data.get("seriousness_level"),
+        "genre_names": list(dict.fromkeys(genres_to_save)),
     }
 
     try:
-        async with AsyncSessionLocal() as session:
-            async with session.begin():
+        async with session_scope(session) as session:
+            async with session.begin_nested():
                 # Создание профиля группы
+                group_profile_data["city_id"] = await city_registry.resolve(session, group_data.get("city") or "")
                 stmt = insert(GroupProfile).values(**group_profile_data).returning(GroupProfile.id)
                 result = await session.execute(stmt)
                 group_id = result.scalar_one()
@@ -266,23 +581,26 @@ async def create_group(group_data: Dict[str, Any]) -> Optional[int]:
                 }
                 await session.execute(insert(GroupMember).values(**member_data))
 
-            return group_id
+            invalidate_registration_status(user_id, session)
+        return group_id
     except Exception as e:
         logging.error(f"Ошибка при создании группы. Данные: {group_data}. Ошибка: {e}", exc_info=True)
         return None
 
 
+@timed_query
 async def _get_group_id_by_user(user_id: int, session: AsyncSession) -> Optional[int]:
     """Возвращает ID группы (group_id), связанного с данным пользователем."""
     stmt = select(GroupMember.group_id).where(GroupMember.user_id == user_id)
     result = await session.execute(stmt)
     return result.scalars().first()
 
-async def update_band_year(user_id: int, new_year: str):
+@timed_query
+async def update_band_year(user_id: int, new_year: str, session: AsyncSession | None = None):
     """Обновляет год основания (formation_date: Integer) группы"""
 
     new_year_int = int(new_year)
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
         if not group_id:
             return
@@ -290,14 +608,14 @@ async def update_band_year(user_id: int, new_year: str):
         stmt = (
             update(GroupProfile)
             .where(GroupProfile.id == group_id)
-            .values(formation_date=new_year_int)
+            .values(formation_date=new_year_int, version=GroupProfile.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
-async def update_band_name(user_id: int, new_name: str):
+@timed_query
+async def update_band_name(user_id: int, new_name: str, session: AsyncSession | None = None):
     """Обновляет название группы."""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
         if not group_id:
             return
@@ -305,15 +623,15 @@ async def update_band_name(user_id: int, new_name: str):
         stmt = (
             update(GroupProfile)
             .where(GroupProfile.id == group_id)
-            .values(name=new_name)
+            .values(name=new_name, version=GroupProfile.version + 1)
         )
         await session.execute(stmt)
-        await session.commit()
 
 
-async def update_band_genres(user_id: int, genre_names: List[str]):
+@timed_query
+async def update_band_genres(user_id: int, genre_names: List[str], session: AsyncSession | None = None):
     """Обновляет список жанров группы."""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
         if not group_id:
             return
@@ -327,20 +645,25 @@ async def update_band_genres(user_id: int, genre_names: List[str]):
         ]
 
         session.add_all(new_genres)
-        await session.commit()
+        await session.execute(
+            update(GroupProfile)
+            .where(GroupProfile.id == group_id)
+            .values(genre_names=list(dict.fromkeys(genre_names)), version=GroupProfile.version + 1)
+        )
 
-async def check_exist_band(user_id: int) -> bool:
+@timed_query
+async def check_exist_band(user_id: int, session: AsyncSession | None = None) -> bool:
     """Проверяет наличие группы"""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(GroupMember).where(GroupMember.user_id == user_id))
-        return result.unique().scalar_one_or_none() is not None
+    async with session_scope(session) as session:
+        return bool(await session.scalar(select(exists().where(GroupMember.user_id == user_id))))
 
 
-async def get_band_data_by_user_id(user_id: int) -> Dict[str, Any]:
+@timed_query
+async def get_band_data_by_user_id(user_id: int, session: AsyncSession | None = None) -> Dict[str, Any]:
     """
     Получает полный профиль группы по ID пользователя.
     """
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
 
         if not group_id:
@@ -357,12 +680,11 @@ async def get_band_data_by_user_id(user_id: int) -> Dict[str, Any]:
         result = await session.execute(stmt)
         band_profile = result.unique().scalar_one_or_none()
 
-    if not band_profile:
-        return {}
+        if not band_profile:
+            return {}
 
-    genres_stmt = select(GroupGenre.name).where(GroupGenre.group_id == group_id)
-    genres_result = await session.execute(genres_stmt)
-    band_genres = genres_result.scalars().all()
+        # Жанры уже загружены вместе с группой (lazy="joined")
+        band_genres = [genre.name for genre in band_profile.genres]
 
     level_display = "Не указан"
     if band_profile.seriousness_level:
@@ -384,151 +706,233 @@ async def get_band_data_by_user_id(user_id: int) -> Dict[str, Any]:
 
     return band_data
 
-async def update_band_city(user_id: int, new_city: str) -> bool:
+@timed_query
+async def update_band_city(user_id: int, new_city: str, session: AsyncSession | None = None) -> bool:
     """Обновляет город группы."""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
         if not group_id: return False
 
-        stmt = update(GroupProfile).where(GroupProfile.id == group_id).values(city=new_city)
+        city_id = await city_registry.resolve(session, new_city)
+        stmt = update(GroupProfile).where(GroupProfile.id == group_id).values(
+            city=new_city, city_id=city_id, version=GroupProfile.version + 1
+        )
         await session.execute(stmt)
-        await session.commit()
         return True
 
-async def update_band_description(user_id: int, new_description: str | None) -> bool:
+@timed_query
+async def update_band_description(user_id: int, new_description: str | None, session: AsyncSession | None = None) -> bool:
     """Обновляет описание группы."""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
         if not group_id: return False
 
-        stmt = update(GroupProfile).where(GroupProfile.id == group_id).values(description=new_description)
+        stmt = update(GroupProfile).where(GroupProfile.id == group_id).values(description=new_description, version=GroupProfile.version + 1)
         await session.execute(stmt)
-        await session.commit()
         return True
 
-async def update_band_seriousness_level(user_id: int, new_level: str) -> bool:
+@timed_query
+async def update_band_seriousness_level(user_id: int, new_level: str, session: AsyncSession | None = None) -> bool:
     """Обновляет уровень серьезности группы."""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         group_id = await _get_group_id_by_user(user_id, session)
         if not group_id: return False
 
-        stmt = update(GroupProfile).where(GroupProfile.id == group_id).values(seriousness_level=new_level)
+        stmt = update(GroupProfile).where(GroupProfile.id == group_id).values(seriousness_level=new_level, version=GroupProfile.version + 1)
         await session.execute(stmt)
-        await session.commit()
         return True
 
 
-async def get_random_profile(swiper_id: int, filters: dict = None) -> User | None:
-    async with AsyncSessionLocal() as session:
-        # 1. Сначала получаем профиль самого пользователя, чтобы узнать его возраст
-        # Используем session.get для быстрого получения по PK
-        swiper_user = await session.get(User, swiper_id)
+def _distance_step(matches_cities, origin_ids):
+    """
+    Шаг расстояния анкеты от городов свайпера для ORDER BY: CASE по спискам id городов
+    из city_registry.distance_buckets. Расстояния уже посчитаны в памяти, БД только сравнивает id.
+    """
+    buckets = city_registry.distance_buckets(origin_ids)
+    if not buckets:
+        return None
+    return case(*[(matches_cities(city_ids), step) for step, city_ids in enumerate(buckets)], else_=len(buckets))
 
-        swiper_age = swiper_user.age if swiper_user else None
 
-        # 2. Базовые условия
-        conditions = [
-            User.id != swiper_id,
-            User.is_visible == True
-        ]
+async def _get_swiper_city_ids(session: AsyncSession, swiper_id: int) -> list[int]:
+    """Города свайпера — из индекса фильтров, если он загружен, иначе из БД."""
+    if profile_index.loaded:
+        return list(profile_index.get_city_ids(swiper_id))
+    return await session.scalar(select(User.city_ids).where(User.id == swiper_id)) or []
 
-        # 3. Исключение уже просмотренных
-        viewed_subquery = (
-            select(UserLikesUser.target_user_id)
-            .where(UserLikesUser.swiper_user_id == swiper_id)
-        )
-        conditions.append(User.id.notin_(viewed_subquery))
-
-        # 4. Применение фильтров
-        instrument_sort_present = False
-
-        if filters:
-            # --- ФИЛЬТР ПО ГОРОДАМ ---
-            if cities := filters.get('cities'):
-                city_conditions = []
-                for city_name in cities:
-                    clean_name = city_name.strip()
-                    if clean_name:
-                        city_conditions.append(User.city.ilike(f"%{clean_name}%"))
-                if city_conditions:
-                    conditions.append(or_(*city_conditions))
-
-            # --- ФИЛЬТР ПО ЖАНРАМ ---
-            if genres := filters.get('genres'):
-                genres_exists = (
-                    select(UserGenre)
-                    .where(UserGenre.user_id == User.id, UserGenre.name.in_(genres))
-                )
-                conditions.append(exists(genres_exists))
-
-            # --- ФИЛЬТР ПО ИНСТРУМЕНТАМ ---
-            if instruments := filters.get('instruments'):
-                instrument_sort_present = True
-                conditions.append(Instrument.name.in_(instruments))
-
-            # --- ФИЛЬТР ПО ОПЫТУ (исправлено название поля) ---
-            if experience := filters.get('experience'):
-                conditions.append(User.has_performance_experience.in_(experience))
-
-            # --- ФИЛЬТР ПО ВОЗРАСТУ (НОВОЕ) ---
-            age_mode = filters.get('age_mode')
-
-            # Применяем фильтр только если он выбран И у нас есть возраст ищущего
-            if age_mode and age_mode != 'all' and swiper_age is not None:
-                # Обязательно фильтруем тех, у кого возраст вообще не указан,
-                # иначе сравнения < > могут вести себя некорректно или пропускать NULL
-                conditions.append(User.age.isnot(None))
-
-                if age_mode == 'peers':
-                    # Ровесники: диапазон +- 5 лет (можно настроить)
-                    conditions.append(User.age.between(swiper_age - 2, swiper_age + 2))
-
-                elif age_mode == 'older':
-                    # Старше: строго больше
-                    conditions.append(User.age > swiper_age)
-
-                elif age_mode == 'younger':
-                    # Младше: строго меньше
-                    conditions.append(User.age < swiper_age)
-
-            min_level = filters.get('min_level')
-
-            # Проверяем, что уровень задан и он является числом (не 'Все')
-            if isinstance(min_level, int):
-                # Сравниваем с theoretical_knowledge_level
-                conditions.append(User.theoretical_knowledge_level >= min_level)
-
-            # Если age_mode выбран, но у самого юзера нет возраста —
-            # мы просто ничего не добавляем в conditions.
-            # Получается, фильтр игнорируется, и он видит всех.
-
-        # 5. Формирование запроса
-        stmt = select(User).where(and_(*conditions))
-
-        # 6. Сортировка
-        if instrument_sort_present:
-            stmt = stmt.join(Instrument)
-            stmt = stmt.group_by(User.id)
-            stmt = stmt.order_by(
-                func.max(Instrument.proficiency_level).desc(),
-                func.random()
-            )
-        else:
-            stmt = stmt.order_by(func.random())
 
-        stmt = stmt.limit(1)
+def _profile_filter_conditions(
+        swiper_id: int,
+        swiper_age: int | None,
+        swiper_city_ids: list[int],
+        seen_ids,
+        filters: dict | None) -> tuple[list, bool]:
+    """
+    Собирает условия выборки анкет музыкантов по фильтрам.
+    Возвращает условия и признак того, что нужна сортировка по уровню владения инструментом.
+    """
+    # 1. Базовые условия
+    conditions = [
+        User.id != swiper_id,
+        User.is_visible == True
+    ]
+
+    # 2. Исключение уже просмотренных (по индексу просмотренных, без скана свайпов)
+    if seen_ids:
+        conditions.append(_not_seen(User.id, seen_ids))
+
+    # 3. Применение фильтров
+    instrument_sort_present = False
+
+    if filters:
+        # --- ФИЛЬТР ПО ГОРОДАМ ---
+        # Город из фильтра переводится в id по справочнику; неизвестный город ничего не находит
+        if cities := filters.get('cities'):
+            city_ids = city_registry.lookup_ids(cities)
+            conditions.append(User.city_ids.overlap(city_ids) if city_ids else false())
+
+        # --- ФИЛЬТР ПО РАДИУСУ (от городов свайпера; без его города не применяется) ---
+        radius_km = filters.get('radius_km')
+        if isinstance(radius_km, int) and swiper_city_ids:
+            conditions.append(User.city_ids.overlap(city_registry.ids_within(swiper_city_ids, radius_km)))
+
+        # --- ФИЛЬТР ПО ЖАНРАМ ---
+        if genres := filters.get('genres'):
+            conditions.append(User.genre_names.overlap(list(genres)))
+
+        # --- ФИЛЬТР ПО ИНСТРУМЕНТАМ ---
+        if instruments := filters.get('instruments'):
+            instrument_sort_present = True
+            conditions.append(User.instrument_names.overlap(list(instruments)))
+
+        # --- ФИЛЬТР ПО ОПЫТУ (исправлено название поля) ---
+        if experience := filters.get('experience'):
+            conditions.append(User.has_performance_experience.in_(experience))
+
+        # --- ФИЛЬТР ПО ВОЗРАСТУ (НОВОЕ) ---
+        age_mode = filters.get('age_mode')
+
+        # Применяем фильтр только если он выбран И у нас есть возраст ищущего
+        # (неизвестный режим не фильтрует — так же, как индекс фильтров).
+        # Анкеты без возраста отсекают сами сравнения: с NULL они не выполняются
+        if age_mode and age_mode != 'all' and swiper_age is not None:
+            if age_mode == 'peers':
+                # Ровесники: диапазон +- 5 лет (можно настроить)
+                conditions.append(User.age.between(swiper_age - 2, swiper_age + 2))
+
+            elif age_mode == 'older':
+                # Старше: строго больше
+                conditions.append(User.age > swiper_age)
+
+            elif age_mode == 'younger':
+                # Младше: строго меньше
+                conditions.append(User.age < swiper_age)
+
+        min_level = filters.get('min_level')
+
+        # Проверяем, что уровень задан и он является числом (не 'Все')
+        if isinstance(min_level, int):
+            # Сравниваем с theoretical_knowledge_level
+            conditions.append(User.theoretical_knowledge_level >= min_level)
+
+        # Если age_mode выбран, но у самого юзера нет возраста —
+        # мы просто ничего не добавляем в conditions.
+        # Получается, фильтр игнорируется, и он видит всех.
+
+    return conditions, instrument_sort_present
+
+
+@timed_query
+async def get_profile_candidate_ids(
+        swiper_id: int,
+        filters: dict | None,
+        exclude_ids: set[int],
+        limit: int,
+        session: AsyncSession | None = None) -> list[int]:
+    """
+    Выбирает пачку id подходящих анкет для колоды кандидатов: ближние города раньше, внутри — случайно.
+    Если индекс фильтров загружен — выборка идет по нему, иначе одним SQL-запросом,
+    где сортировка random() выполняется один раз на всю пачку, а не на каждый свайп.
+    """
+    seen_ids = await seen_users.get(swiper_id)
+
+    # Основной путь — пересечение множеств в индексе фильтров, без запроса в БД
+    if profile_index.loaded:
+        return profile_index.select(swiper_id, filters, set(seen_ids) | exclude_ids, limit)
+
+    async with session_scope(session) as session:
+        # Фильтры по городам и сортировка по расстоянию берут id из справочника
+        await city_registry.ensure_loaded(session)
+        swiper = (await session.execute(select(User.age, User.city_ids).where(User.id == swiper_id))).first()
+        swiper_age, swiper_city_ids = swiper if swiper else (None, [])
+        stmt = _profile_candidates_stmt(swiper_id, swiper_age, swiper_city_ids, seen_ids, filters, exclude_ids, limit)
+
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+
+def _profile_candidates_stmt(
+        swiper_id: int,
+        swiper_age: int | None,
+        swiper_city_ids: list[int],
+        seen_ids,
+        filters: dict | None,
+        exclude_ids: set[int],
+        limit: int):
+    """SQL-выборка пачки id кандидатов (запасной путь, когда индекс фильтров не загружен)."""
+    conditions, instrument_sort_present = _profile_filter_conditions(
+        swiper_id, swiper_age, swiper_city_ids, seen_ids, filters
+    )
+    if exclude_ids:
+        conditions.append(User.id.notin_(exclude_ids))
+
+    stmt = select(User.id).where(and_(*conditions))
+
+    order_by = []
+    if instrument_sort_present:
+        # Сначала те, кто лучше владеет одним из выбранных инструментов
+        best_level = (
+            select(func.max(Instrument.proficiency_level))
+            .where(Instrument.user_id == User.id, Instrument.name.in_(filters['instruments']))
+            .scalar_subquery()
+        )
+        order_by.append(best_level.desc().nulls_last())
+
+    # Затем ближние к свайперу города
+    distance_step = _distance_step(User.city_ids.overlap, swiper_city_ids)
+    if distance_step is not None:
+        order_by.append(distance_step)
+
+    return stmt.order_by(*order_by, func.random()).limit(limit)
+
+
+profile_deck = CandidateDeck(loader=get_profile_candidate_ids)
+
+
+@timed_query
+async def get_random_profile(swiper_id: int, filters: dict = None, session: AsyncSession | None = None) -> User | None:
+    """Следующая анкета для свайпера: id берется из колоды, анкета грузится по первичному ключу."""
+    while (target_id := await profile_deck.pop(swiper_id, filters)) is not None:
+        # Анкету могли уже оценить в другом разделе (например, в лайках)
+        if await seen_users.contains(swiper_id, target_id):
+            continue
+
+        # Отдельное имя: session остается переданной сессией на следующих итерациях
+        async with session_scope(session) as db:
+            user = await db.get(User, target_id)
 
-        # 7. Выполнение
-        db_result = await session.execute(stmt)
-        result = db_result.unique().scalar_one_or_none()
+        # Анкету могли скрыть, пока она лежала в колоде
+        if user and user.is_visible:
+            return user
 
-        return result
+    return None
 
 #stop
 
-async def get_random_group() -> GroupProfile | None:
+@timed_query
+async def get_random_group(session: AsyncSession | None = None) -> GroupProfile | None:
     """Получает рандомную группу, исключая текущую группу пользователя, если такая есть"""
-    async with AsyncSessionLocal() as session:
+    async with session_scope(session) as session:
         stmt = select(GroupProfile)
 
         stmt = stmt.order_by(func.random()).limit(1)
@@ -537,43 +941,33 @@ async def get_random_group() -> GroupProfile | None:
         return result.unique().scalar_one_or_none()
 
 async def save_user_interaction(swiper_id: int, target_id: int, action: Actions) -> None:
-    """Сохраняет действие пользователя swiper_id на анкету target_id."""
-    async with AsyncSessionLocal() as session:
-        stmt = insert(UserLikesUser).values(
-            swiper_user_id=swiper_id,
-            target_user_id=target_id,
-            action=action.value,  # Сохраняем строковое значение Enum
-            created_at=datetime.now(timezone.utc)
-        )
-        await session.execute(stmt)
-        await session.commit()
+    """
+    Сохраняет действие пользователя swiper_id на анкету target_id.
+    Запись отложенная: свайп попадает в буфер и пишется в БД пачкой.
+    """
+    swipe_buffer.add(Swipe(swiper_id, target_id, action, datetime.now(timezone.utc)))
+    cache_bus.publish("seen_user", swiper_id, target_id)
 
 async def save_group_interaction(swiper_id: int, target_group_id: int, action: Actions) -> None:
-    """Сохраняет действие пользователя swiper_id на группу target_group_id."""
-    async with AsyncSessionLocal() as session:
-        stmt = insert(UserLikesGroup).values(
-            swiper_user_id=swiper_id,
-            target_group_id=target_group_id,
-            action=action.value,
-            created_at=datetime.now(timezone.utc)
-        )
-        await session.execute(stmt)
-        await session.commit()
+    """
+    Сохраняет действие пользователя swiper_id на группу target_group_id.
+    Запись отложенная: свайп попадает в буфер и пишется в БД пачкой.
+    """
+    swipe_buffer.add(Swipe(swiper_id, target_group_id, action, datetime.now(timezone.utc), is_group=True))
+    cache_bus.publish("seen_group", swiper_id, target_group_id)
 
 
-async def get_profile_which_not_action(swiper_id: int):
+@timed_query
+async def get_profile_which_not_action(swiper_id: int, session: AsyncSession | None = None):
     """Выводит нового пользователя исключая тех кого видел наш пользователь"""
-    async with AsyncSessionLocal() as session:
+    seen_ids = await seen_users.get(swiper_id)
+
+    async with session_scope(session) as session:
         stmt = (
             select(User)
             .where(User.id != swiper_id)
             .where(User.is_visible)
-            .where(
-                ~exists().where(
-                    (UserLikesUser.target_user_id == User.id) &
-                    (UserLikesUser.swiper_user_id == swiper_id)
-                )
-            )
+            .where(_not_seen(User.id, seen_ids))
             .order_by(func.random())
             .limit(1)
         )
@@ -583,149 +977,373 @@ async def get_profile_which_not_action(swiper_id: int):
         return user
 
 
-async def get_band_which_not_action(swiper_id: int, filters: dict = None):
-    async with AsyncSessionLocal() as session:
-        # 1. Базовые условия (Группа видима + Юзер не участник)
-        conditions = [
-            GroupProfile.is_visible == True,
-            ~exists().where(
-                (GroupMember.user_id == swiper_id) &
-                (GroupMember.group_id == GroupProfile.id)
-            )
-        ]
-
-        # 2. Исключаем просмотренные
-        viewed_subquery = (
-            select(UserLikesGroup.target_group_id)
-            .where(UserLikesGroup.swiper_user_id == swiper_id)
-        )
-        conditions.append(GroupProfile.id.notin_(viewed_subquery))
-
-        # 3. Применяем фильтры
-        if filters:
-            # --- ФИЛЬТР ПО ГОРОДАМ ---
-            if cities := filters.get('cities'):
-                city_conditions = [GroupProfile.city.ilike(f"%{c.strip()}%") for c in cities if c.strip()]
-                if city_conditions:
-                    conditions.append(or_(*city_conditions))
-
-            # --- ФИЛЬТР ПО ЖАНРАМ ---
-            if genres := filters.get('genres'):
-                genres_exists = (
-                    select(GroupGenre)
-                    .where(GroupGenre.group_id == GroupProfile.id, GroupGenre.name.in_(genres))
-                )
-                conditions.append(exists(genres_exists))
-
-            # --- ФИЛЬТР ПО УРОВНЮ СЕРЬЕЗНОСТИ (ИСПРАВЛЕНО) ---
-            # Используем новый ключ с короткими именами
-            selected_names = filters.get('seriousness_level_names')
-
-            if selected_names and isinstance(selected_names, list):
-                # Конвертируем КОРОТКИЕ ИМЕНА в ДЛИННЫЕ ЗНАЧЕНИЯ для БД
-                target_values = []
-                for name in selected_names:
-                    try:
-                        # Напр: 'HOBBY' -> 'Хобби (редкие репетиции)'
-                        target_values.append(SeriousnessLevel[name.upper()].value)
-                    except (KeyError, ValueError):
-                        continue
-
-                if target_values:
-                    # Это условие оставит только те группы, уровень которых ЕСТЬ в списке.
-                    # Анкеты с NULL или пустым уровнем автоматически НЕ попадут в результат.
-                    conditions.append(GroupProfile.seriousness_level.in_(target_values))
-
-        # 4. Сборка и выполнение
+def _band_filter_conditions(swiper_id: int, swiper_city_ids: list[int], seen_ids, filters: dict | None) -> list:
+    """Собирает условия выборки анкет групп по фильтрам."""
+    # 1. Базовые условия (Группа видима + Юзер не участник)
+    conditions = [
+        GroupProfile.is_visible == True,
+        ~exists().where(
+            (GroupMember.user_id == swiper_id) &
+            (GroupMember.group_id == GroupProfile.id)
+        )
+    ]
+
+    # 2. Исключаем просмотренные
+    if seen_ids:
+        conditions.append(_not_seen(GroupProfile.id, seen_ids))
+
+    # 3. Применяем фильтры
+    if filters:
+        # --- ФИЛЬТР ПО ГОРОДАМ ---
+        if cities := filters.get('cities'):
+            city_ids = city_registry.lookup_ids(cities)
+            conditions.append(GroupProfile.city_id.in_(city_ids) if city_ids else false())
+
+        # --- ФИЛЬТР ПО РАДИУСУ (от городов свайпера; без его города не применяется) ---
+        radius_km = filters.get('radius_km')
+        if isinstance(radius_km, int) and swiper_city_ids:
+            conditions.append(GroupProfile.city_id.in_(city_registry.ids_within(swiper_city_ids, radius_km)))
+
+        # --- ФИЛЬТР ПО ЖАНРАМ ---
+        if genres := filters.get('genres'):
+            conditions.append(GroupProfile.genre_names.overlap(list(genres)))
+
+        # --- ФИЛЬТР ПО УРОВНЮ СЕРЬЕЗНОСТИ (ИСПРАВЛЕНО) ---
+        # Используем новый ключ с короткими именами
+        selected_names = filters.get('seriousness_level_names')
+
+        if selected_names and isinstance(selected_names, list):
+            # Конвертируем КОРОТКИЕ ИМЕНА в ДЛИННЫЕ ЗНАЧЕНИЯ для БД
+            target_values = []
+            for name in selected_names:
+                try:
+                    # Напр: 'HOBBY' -> 'Хобби (редкие репетиции)'
+                    target_values.append(SeriousnessLevel[name.upper()].value)
+                except (KeyError, ValueError):
+                    continue
+
+            if target_values:
+                # Это условие оставит только те группы, уровень которых ЕСТЬ в списке.
+                # Анкеты с NULL или пустым уровнем автоматически НЕ попадут в результат.
+                conditions.append(GroupProfile.seriousness_level.in_(target_values))
+
+    return conditions
+
+
+@timed_query
+async def get_band_which_not_action(swiper_id: int, filters: dict = None, session: AsyncSession | None = None):
+    seen_ids = await seen_groups.get(swiper_id)
+
+    async with session_scope(session) as session:
+        await city_registry.ensure_loaded(session)
+        swiper_city_ids = await _get_swiper_city_ids(session, swiper_id)
+        distance_step = _distance_step(GroupProfile.city_id.in_, swiper_city_ids)
         stmt = (
             select(GroupProfile)
-            .where(and_(*conditions))
-            .order_by(func.random())
+            .where(and_(*_band_filter_conditions(swiper_id, swiper_city_ids, seen_ids, filters)))
+            .order_by(*([distance_step] if distance_step is not None else []), func.random())
             .limit(1)
         )
 
         result = await session.execute(stmt)
-        return result.scalars().first()
-        user = result.scalars().first()
-        return user
+        return result.unique().scalars().first()
+
+
+@timed_query
+async def get_profile_cards(
+        swiper_id: int,
+        filters: dict | None,
+        limit: int,
+        exclude_ids: set[int] | None = None,
+        session: AsyncSession | None = None) -> list[dict]:
+    """
+    Следующие limit анкет музыкантов из колоды свайпера в виде компактных карточек.
+    Анкеты, которых нет в кэше карточек, грузятся одним запросом вместе с жанрами и инструментами.
+    """
+    target_ids = []
+    while len(target_ids) < limit and (target_id := await profile_deck.pop(swiper_id, filters)) is not None:
+        if target_id in (exclude_ids or ()):
+            continue
+        if not await seen_users.contains(swiper_id, target_id):
+            target_ids.append(target_id)
+
+    if not target_ids:
+        return []
+
+    async with session_scope(session) as session:
+        cards = await _load_user_cards(session, target_ids, visible_only=True)
+
+    # Сохраняем порядок колоды
+    return [cards[target_id] for target_id in target_ids if target_id in cards]
+
+
+@timed_query
+async def get_guest_profile_cards(
+        guest_id: int,
+        limit: int,
+        exclude_ids: set[int] | None = None,
+        session: AsyncSession | None = None) -> list[dict]:
+    """
+    Лента музыкантов для гостя. Гость не свайпает, поэтому лента у него бесконечная:
+    когда колода закончилась, сразу собираем новую, не дожидаясь DECK_EMPTY_RETRY_SECONDS.
+    """
+    cards = await get_profile_cards(guest_id, None, limit, exclude_ids, session)
+    if not cards:
+        profile_deck.invalidate(guest_id)
+        cards = await get_profile_cards(guest_id, None, limit, exclude_ids, session)
+    return cards
+
+
+@timed_query
+async def get_user_card(user_id: int, session: AsyncSession | None = None) -> dict | None:
+    """Карточка анкеты музыканта (в том числе скрытой) — из кэша, если версия анкеты не менялась."""
+    async with session_scope(session) as session:
+        cards = await _load_user_cards(session, [user_id])
+    return cards.get(user_id)
+
+
+@timed_query
+async def _load_user_cards(session: AsyncSession, user_ids: list[int], visible_only: bool = False) -> dict[int, dict]:
+    """
+    Карточки музыкантов по id. Сначала читаем только версии анкет,
+    полностью (с жанрами и инструментами) грузим лишь те, которых нет в кэше.
+    """
+    stmt = select(User.id, User.version).where(User.id.in_(user_ids))
+    if visible_only:
+        stmt = stmt.where(User.is_visible == True)
+
+    cards = {}
+    missing = []
+    for user_id, version in (await session.execute(stmt)).tuples().all():
+        card = user_cards.get((user_id, version))
+        if card is None:
+            missing.append(user_id)
+        else:
+            cards[user_id] = card
+
+    if missing:
+        result = await session.execute(select(User).where(User.id.in_(missing)))
+        for user in result.unique().scalars().all():
+            card = user_card(user)
+            # Версию могла поднять незакоммиченная правка — в кэш только после коммита
+            after_commit(functools.partial(user_cards.set, (user.id, user.version), card), session)
+            cards[user.id] = card
+
+    return cards
+
+
+@timed_query
+async def _load_band_cards(session: AsyncSession, versions: list[tuple[int, int]]) -> list[dict]:
+    """Карточки групп по парам (id, версия) в том же порядке; из БД грузим только промахи кэша."""
+    cards = {group_id: band_cards.get((group_id, version)) for group_id, version in versions}
+
+    missing = [group_id for group_id, card in cards.items() if card is None]
+    if missing:
+        result = await session.execute(select(GroupProfile).where(GroupProfile.id.in_(missing)))
+        for band in result.unique().scalars().all():
+            card = band_card(band)
+            after_commit(functools.partial(band_cards.set, (band.id, band.version), card), session)
+            cards[band.id] = card
+
+    return [cards[group_id] for group_id, _ in versions if cards.get(group_id) is not None]
+
+
+@timed_query
+async def get_band_cards(
+        swiper_id: int,
+        filters: dict | None,
+        limit: int,
+        exclude_ids: set[int] | None = None,
+        session: AsyncSession | None = None) -> list[dict]:
+    """
+    Следующие limit анкет групп для свайпера в виде компактных карточек (с кэшем по версии анкеты).
+    Группы из ближних к свайперу городов идут раньше, внутри одного шага расстояния — случайно.
+    """
+    seen_ids = await seen_groups.get(swiper_id)
+
+    async with session_scope(session) as session:
+        await city_registry.ensure_loaded(session)
+        swiper_city_ids = await _get_swiper_city_ids(session, swiper_id)
+        conditions = _band_filter_conditions(swiper_id, swiper_city_ids, seen_ids, filters)
+        if exclude_ids:
+            # Карточки, которые уже лежат в буфере, но по которым еще нет свайпа
+            conditions.append(GroupProfile.id.notin_(exclude_ids))
+
+        distance_step = _distance_step(GroupProfile.city_id.in_, swiper_city_ids)
+        stmt = (
+            select(GroupProfile.id, GroupProfile.version)
+            .where(and_(*conditions))
+            .order_by(*([distance_step] if distance_step is not None else []), func.random())
+            .limit(limit)
+        )
+
+        versions = (await session.execute(stmt)).tuples().all()
+        return await _load_band_cards(session, versions)
+
 
-async def get_users_who_liked_me(my_user_id: int) -> User | None:
+@timed_query
+async def get_random_group_cards(limit: int, exclude_ids: set[int] | None = None, session: AsyncSession | None = None) -> list[dict]:
+    """Случайные группы для гостя (без фильтров и исключений) в виде компактных карточек."""
+    async with session_scope(session) as session:
+        stmt = select(GroupProfile.id, GroupProfile.version)
+        if exclude_ids:
+            stmt = stmt.where(GroupProfile.id.notin_(exclude_ids))
+
+        stmt = stmt.order_by(func.random()).limit(limit)
+
+        versions = (await session.execute(stmt)).tuples().all()
+        return await _load_band_cards(session, versions)
+
+@timed_query
+async def get_users_who_liked_me(my_user_id: int, session: AsyncSession | None = None) -> User | None:
     """
     Пользователь, который лайкнул меня,
     и по которому я ещё не делал LIKE / SKIP.
     """
-    async with AsyncSessionLocal() as session:
-        MyAction = aliased(UserLikesUser)
+    # Кого я уже оценил — по индексу просмотренных, он учитывает и еще не записанные свайпы
+    my_seen_ids = await seen_users.get(my_user_id)
+
+    async with session_scope(session) as session:
+        result = await session.execute(_users_who_liked_me_stmt(my_user_id, my_seen_ids))
+        return result.scalars().first()
+
+
+def _users_who_liked_me_stmt(my_user_id: int, my_seen_ids):
+    return (
+        select(User)
+        .join(
+            UserLikesUser,
+            User.id == UserLikesUser.swiper_user_id
+        )
+        .where(
+            UserLikesUser.target_user_id == my_user_id,
+            UserLikesUser.action == Actions.LIKE,
+            _not_seen(User.id, my_seen_ids)
+        )
+        .options(
+            joinedload(User.instruments),
+            joinedload(User.genres)
+        )
+    )
 
+
+@timed_query
+async def get_like_inbox(
+        my_user_id: int,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+        session: AsyncSession | None = None) -> list[tuple[dict, datetime]]:
+    """
+    Следующие limit входящих лайков от старых к новым: пары (карточка лайкнувшего, время лайка).
+    after — курсор (время лайка, id лайкнувшего) последнего уже выданного лайка.
+    """
+    # Отвеченные лайки удаляются из входящих при записи свайпа, а еще не записанные отсекаем по индексу просмотренных
+    my_seen_ids = await seen_users.get(my_user_id)
+
+    async with session_scope(session) as session:
         stmt = (
-            select(User)
-            .join(
-                UserLikesUser,
-                User.id == UserLikesUser.swiper_user_id
-            )
+            select(LikeInbox.liker_id, LikeInbox.created_at)
             .where(
-                UserLikesUser.target_user_id == my_user_id,
-                UserLikesUser.action == Actions.LIKE,
-
-                ~exists(
-                    select(1)
-                    .where(
-                        MyAction.swiper_user_id == my_user_id,
-                        MyAction.target_user_id == User.id
-                    )
-                )
-            )
-            .options(
-                joinedload(User.instruments),
-                joinedload(User.genres)
+                LikeInbox.user_id == my_user_id,
+                _not_seen(LikeInbox.liker_id, my_seen_ids)
             )
         )
+        if after is not None:
+            stmt = stmt.where(tuple_(LikeInbox.created_at, LikeInbox.liker_id) > _cursor(after))
+        stmt = stmt.order_by(LikeInbox.created_at.asc(), LikeInbox.liker_id.asc()).limit(limit)
 
-        result = await session.execute(stmt)
-        return result.scalars().first()
+        likes = (await session.execute(stmt)).tuples().all()
+        cards = await _load_user_cards(session, [liker_id for liker_id, _ in likes])
+
+    return [(cards[liker_id], liked_at) for liker_id, liked_at in likes if liker_id in cards]
+
+
+@timed_query
+async def count_unread_likes(my_user_id: int, session: AsyncSession | None = None) -> int:
+    """Число входящих лайков для кнопки «❤️ Лайки»; кэшируется до следующей записи свайпов."""
+    count = like_inbox_counts.get(my_user_id)
+    if count is not None:
+        return count
+
+    async with session_scope(session) as session:
+        count = await session.scalar(
+            select(func.count()).select_from(LikeInbox).where(LikeInbox.user_id == my_user_id)
+        )
+
+    like_inbox_counts.set(my_user_id, count)
+    return count
 
 
+@timed_query
 async def get_my_matches(
     my_user_id: int,
     limit: int = 10,
-    offset: int = 0
-) -> list[User]:
-    async with AsyncSessionLocal() as session:
+    older_than: tuple[datetime, int] | None = None,
+    newer_than: tuple[datetime, int] | None = None,
+    session: AsyncSession | None = None
+) -> list:
+    """
+    Мэтчи пользователя от новых к старым: строки (user_id, name, created_at).
+    Страницы листаются по курсору (created_at, user_id) крайней строки соседней страницы:
+    older_than — следующая страница, newer_than — предыдущая.
+    """
+    async with session_scope(session) as session:
+        result = await session.execute(_my_matches_stmt(my_user_id, limit, older_than, newer_than))
+        rows = result.all()
+
+    if newer_than is not None:
+        # Предыдущую страницу выбирали по возрастанию — возвращаем в общем порядке
+        rows.reverse()
+    return rows
+
+
+def _my_matches_stmt(
+        my_user_id: int,
+        limit: int,
+        older_than: tuple[datetime, int] | None = None,
+        newer_than: tuple[datetime, int] | None = None):
+    """Диапазонное чтение индекса ix_matches_user_created — без OFFSET и без таблицы свайпов."""
+    stmt = (
+        select(Match.matched_user_id.label("user_id"), User.name, Match.created_at)
+        .join(User, User.id == Match.matched_user_id)
+        .where(Match.user_id == my_user_id)
+    )
+
+    key = tuple_(Match.created_at, Match.matched_user_id)
+    if newer_than is not None:
         stmt = (
-            select(User)
-            .join(UserLikesUser, User.id == UserLikesUser.swiper_user_id)
-            .where(
-                UserLikesUser.target_user_id == my_user_id,
-                UserLikesUser.action == Actions.LIKE
-            )
-            .options(
-                joinedload(User.instruments),
-                joinedload(User.genres)
-            )
-            .limit(limit)
-            .offset(offset)
+            stmt.where(key > _cursor(newer_than))
+            .order_by(Match.created_at.asc(), Match.matched_user_id.asc())
         )
+    else:
+        if older_than is not None:
+            stmt = stmt.where(key < _cursor(older_than))
+        stmt = stmt.order_by(Match.created_at.desc(), Match.matched_user_id.desc())
 
-        result = await session.execute(stmt)
-        return result.unique().scalars().all()
+    return stmt.limit(limit)
 
 
+def _cursor(cursor: tuple[datetime, int]):
+    created_at, user_id = cursor
+    return tuple_(literal(created_at, DateTime(timezone=True)), literal(user_id, BigInteger))
 
-async def track_event(user_id: int, event_name: str) -> None:
-    """Сохраняет аналитическое событие в БД."""
+
+@timed_query
+async def _write_analytics_events(events: list[dict]) -> None:
+    """Пишет пачку аналитических событий одним INSERT."""
     async with AsyncSessionLocal() as session:
-        try:
-            stmt = insert(AnalyticsEvent).values(
-                user_id=user_id,
-                event_name=event_name,
-                created_at=datetime.now(timezone.utc)
-            )
+        await session.execute(insert(AnalyticsEvent).values(events))
+        await session.commit()
+
 
-            await session.execute(stmt)
-            await session.commit()
+analytics_pipeline = AnalyticsPipeline(writer=_write_analytics_events)
 
-            logging.info("Event saved to DB")
 
-        except Exception as e:
-            await session.rollback()
-            logging.error(f"DB analytics error: {e}")
\ No newline at end of file
+async def track_event(user_id: int, event_name: str, params: dict | None = None) -> None:
+    """Ставит аналитическое событие в очередь на запись в БД (не ждет записи)."""
+    await analytics_pipeline.track({
+        "user_id": user_id,
+        "event_name": event_name,
+        "params": params,
+        "created_at": datetime.now(timezone.utc),
+    })
@@ -0,0 +1,134 @@
+import contextvars
+import functools
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metrics.db.counters import db_slow_queries
+from metrics.db.histograms import db_query_duration
+
+logger = logging.getLogger(__name__)
+
+# Порог медленного запроса в миллисекундах — такие запросы пишутся в лог
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Доля медленных SELECT, для которых в лог добавляется EXPLAIN (ANALYZE, BUFFERS); 0 — выключено.
+# ANALYZE выполняет запрос повторно, поэтому на проде держать небольшим
+DB_EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_EXPLAIN_SAMPLE_RATE", "0"))
+# Сколько символов SQL оставлять в записи лога
+DB_SLOW_QUERY_SQL_LIMIT = 2000
+
+# Функция из database.queries, которая сейчас выполняет запросы (метка для метрик и лога)
+current_query: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_query", default=None)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def timed_query(func: F) -> F:
+    """
+    Помечает выражения, выполненные внутри функции, ее именем.
+    При вложенных вызовах метка остается у внешней функции — той, что вызвал хендлер.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if current_query.get() is not None:
+            return await func(*args, **kwargs)
+
+        token = current_query.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_query.reset(token)
+
+    return wrapper
+
+
+def _params_shape(parameters: Any, executemany: bool) -> str:
+    """Форма параметров без значений: в логи не должны попадать данные пользователей."""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} строк по {len(rows[0]) if rows else 0} параметров"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(
+            f"{type(value).__name__}[{len(value)}]" if isinstance(value, (list, tuple)) else type(value).__name__
+            for value in parameters
+        ) + ")"
+    return type(parameters).__name__
+
+
+def _explain(conn, statement: str, parameters: Any) -> str:
+    """
+    EXPLAIN (ANALYZE, BUFFERS) на отдельном курсоре DBAPI того же соединения (в обход событий движка).
+    Точка сохранения не дает ошибке EXPLAIN оборвать транзакцию вызывающего кода.
+    """
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        finally:
+            cursor.close()
+    except Exception as e:
+        # План — только подсказка в логе, запрос вызывающего кода уже выполнен
+        return f"EXPLAIN не удался: {e}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+
+    query = current_query.get() or "other"
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_query_duration.labels(query=query, operation=operation).observe(duration)
+
+    if duration * 1000 < DB_SLOW_QUERY_MS:
+        return
+
+    db_slow_queries.labels(query=query).inc()
+    plan = ""
+    if (
+        operation == "SELECT"
+        and not executemany
+        and "FOR UPDATE" not in statement.upper()
+        and random.random() < DB_EXPLAIN_SAMPLE_RATE
+    ):
+        plan = "\n" + _explain(conn, statement, parameters)
+
+    logger.warning(
+        "Медленный запрос %s: %.1f мс, параметры %s\n%s%s",
+        query,
+        duration * 1000,
+        _params_shape(parameters, executemany),
+        statement[:DB_SLOW_QUERY_SQL_LIMIT],
+        plan,
+    )
+
+
+def _handle_error(context) -> None:
+    # Выражение упало — время начала больше не нужно
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает замер времени выражений к синхронному движку (для AsyncEngine — engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
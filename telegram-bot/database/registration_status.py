@@ -0,0 +1,25 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from .ttl_cache import TTLCache
+
+# Сколько секунд помним статус регистрации пользователя
+REGISTRATION_STATUS_TTL = float(os.getenv("REGISTRATION_STATUS_TTL", "300"))
+# Сколько статусов держим в памяти
+REGISTRATION_STATUS_CACHE_SIZE = int(os.getenv("REGISTRATION_STATUS_CACHE_SIZE", "20000"))
+
+
+@dataclass(frozen=True)
+class RegistrationStatus:
+    """Что нужно /start и главному меню: зарегистрирован ли пользователь и есть ли у него группа."""
+    registered: bool
+    band_id: Optional[int] = None
+
+    @property
+    def has_band(self) -> bool:
+        return self.band_id is not None
+
+
+# user_id -> RegistrationStatus
+registration_statuses = TTLCache(ttl=REGISTRATION_STATUS_TTL, max_entries=REGISTRATION_STATUS_CACHE_SIZE)
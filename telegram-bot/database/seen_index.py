@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List
+
+from .session import run_detached
+
+logger = logging.getLogger(__name__)
+
+# Сколько свайперов держим в памяти; вытесненные подгрузятся из БД заново
+SEEN_INDEX_MAX_ENTRIES = int(os.getenv("SEEN_INDEX_MAX_ENTRIES", "50000"))
+
+SeenLoader = Callable[[int], Awaitable[Iterable[int]]]
+
+
+class SeenIndex:
+    """
+    Компактное множество «уже просмотренных» анкет для каждого свайпера.
+    Хранится отсортированным массивом int64 (8 байт на свайп), лениво
+    подгружается из таблицы свайпов и пополняется при каждом новом свайпе.
+
+    Рассчитан на тысячи свайпов на человека: новый свайп вставляется в массив
+    за O(n) со сдвигом хвоста, что при таких размерах дешевле хэш-множества по памяти
+    и не заметно по времени. Если у свайперов станут сотни тысяч записей, массив
+    придется заменить структурой с логарифмической вставкой.
+    """
+
+    def __init__(self, loader: SeenLoader, max_entries: int = SEEN_INDEX_MAX_ENTRIES):
+        self._loader = loader
+        self._max_entries = max_entries
+        self._seen: "OrderedDict[int, array]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Task] = {}
+        # Свайпы, записанные пока шла подгрузка: загрузчик мог их уже не увидеть
+        self._pending: Dict[int, List[int]] = {}
+
+    async def get(self, swiper_id: int) -> array:
+        """Отсортированный массив id, по которым свайпер уже сделал действие."""
+        seen = self._seen.get(swiper_id)
+        if seen is not None:
+            self._seen.move_to_end(swiper_id)
+            return seen
+
+        task = self._loading.get(swiper_id)
+        if task is None:
+            task = run_detached(self._load(swiper_id))
+            self._loading[swiper_id] = task
+        return await asyncio.shield(task)
+
+    async def contains(self, swiper_id: int, target_id: int) -> bool:
+        seen = await self.get(swiper_id)
+        position = bisect_left(seen, target_id)
+        return position < len(seen) and seen[position] == target_id
+
+    def add(self, swiper_id: int, target_id: int) -> None:
+        """Отмечает анкету просмотренной. Если свайпер еще не загружен — подтянется из БД."""
+        if swiper_id in self._loading:
+            self._pending.setdefault(swiper_id, []).append(target_id)
+            return
+
+        seen = self._seen.get(swiper_id)
+        if seen is None:
+            return
+
+        position = bisect_left(seen, target_id)
+        if position == len(seen) or seen[position] != target_id:
+            insort(seen, target_id)
+
+    def clear(self) -> None:
+        """Забывает всех свайперов — подгрузятся из БД при следующем обращении."""
+        self._seen.clear()
+
+    async def _load(self, swiper_id: int) -> array:
+        try:
+            seen = array("q", sorted(set(await self._loader(swiper_id))))
+            for target_id in self._pending.pop(swiper_id, []):
+                position = bisect_left(seen, target_id)
+                if position == len(seen) or seen[position] != target_id:
+                    insort(seen, target_id)
+
+            self._seen[swiper_id] = seen
+            while len(self._seen) > self._max_entries:
+                self._seen.popitem(last=False)
+
+            logger.info("Загружен индекс просмотренных для свайпера ID=%s: %d анкет", swiper_id, len(seen))
+            return seen
+        finally:
+            self._loading.pop(swiper_id, None)
+            self._pending.pop(swiper_id, None)
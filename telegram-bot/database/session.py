@@ -1,21 +1,253 @@
+import asyncio
+import contextvars
+import logging
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Coroutine, Optional, Union
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from .pool import InstrumentedQueuePool, bind_pool_metrics
+from .query_metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = (
     f"postgresql+asyncpg://"
     f"{os.getenv('DB_USER', 'postgres')}:"
     f"{os.getenv('DB_PASSWORD', 'parol123')}@"
-    f"{os.getenv('DB_HOST', 'db')}:5432/"
+    f"{os.getenv('DB_HOST', 'db')}:"
+    f"{os.getenv('DB_PORT', '5432')}/"
     f"{os.getenv('DB_NAME', 'music_app')}"
 )
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Постоянные соединения в пуле
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+# Сколько соединений можно открыть сверх pool_size при пиковой нагрузке
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Сколько секунд ждем свободное соединение, прежде чем упасть с ошибкой
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Через сколько секунд соединение пересоздается (-1 — никогда)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Проверять соединение перед выдачей из пула
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Подключение через PgBouncer в режиме transaction: подготовленные выражения не переживают транзакцию
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+# Конфиг alembic, по которому init_db сверяет ревизию БД с head миграций
+ALEMBIC_INI = os.getenv(
+    "ALEMBIC_INI", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+)
+
+
+def _connect_args() -> dict:
+    if not DB_PGBOUNCER:
+        return {}
+
+    return {
+        # Отключаем кэши подготовленных выражений asyncpg и SQLAlchemy
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        # Уникальные имена, чтобы не пересекаться с чужими выражениями на том же серверном соединении
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
+bind_pool_metrics(engine.pool)
+instrument_engine(engine.sync_engine)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# Сессия текущего апдейта (ставит DbSessionMiddleware)
+current_session: contextvars.ContextVar[Optional[AsyncSession]] = contextvars.ContextVar(
+    "current_session", default=None
+)
+
+
+# Ключи Session.info: были ли записи в текущей транзакции и что выполнить после ее коммита
+_HAS_WRITES = "has_writes"
+_AFTER_COMMIT = "after_commit"
+# Ключ Connection.info: запрос упал, и PostgreSQL прервал транзакцию (до отката или отката SAVEPOINT)
+_FAILED = "transaction_failed"
+
+
+def track_failed_transactions(sync_engine: Engine) -> None:
+    """Помечает соединение, на котором упал запрос: такую транзакцию можно только откатить."""
+    def mark_failed(context) -> None:
+        if context.connection is not None:
+            context.connection.info[_FAILED] = True
+
+    def clear_failed(connection, *args) -> None:
+        connection.info.pop(_FAILED, None)
+
+    event.listen(sync_engine, "handle_error", mark_failed)
+    for name in ("begin", "commit", "rollback", "rollback_savepoint"):
+        event.listen(sync_engine, name, clear_failed)
+
+
+track_failed_transactions(engine.sync_engine)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_HAS_WRITES] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_writes(session: Session, flush_context) -> None:
+    session.info[_HAS_WRITES] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    # Освобождение SAVEPOINT — еще не коммит транзакции
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_HAS_WRITES, None)
+    for _, callback in session.info.pop(_AFTER_COMMIT, []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Ошибка в действии после коммита")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_after_commit(session: Session, previous_transaction: SessionTransaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_HAS_WRITES, None)
+        session.info.pop(_AFTER_COMMIT, None)
+        return
+
+    # Откат SAVEPOINT: действия, запланированные внутри него, не нужны
+    callbacks = session.info.get(_AFTER_COMMIT)
+    if callbacks:
+        callbacks[:] = [
+            (savepoint, callback) for savepoint, callback in callbacks
+            if not _inside(savepoint, previous_transaction)
+        ]
+
+
+def _inside(transaction: Optional[SessionTransaction], savepoint: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is savepoint:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _sync_session(session: Union[AsyncSession, Session]) -> Session:
+    return session.sync_session if isinstance(session, AsyncSession) else session
+
+
+def after_commit(callback: Callable[[], None], session: Union[AsyncSession, Session, None] = None) -> None:
+    """
+    Выполняет callback, когда изменения текущей транзакции станут видны всем:
+    сбросы кэшей и индексов в памяти не должны опережать коммит, а при откате не нужны вовсе
+    (в том числе при откате SAVEPOINT, внутри которого callback запланирован).
+    Если в транзакции сессии (явной или сессии апдейта) еще ничего не записано — выполняет сразу.
+    """
+    session = session or current_session.get()
+    has_writes = session is not None and (
+        session.info.get(_HAS_WRITES) or session.new or session.dirty or session.deleted
+    )
+    if not has_writes:
+        callback()
+        return
+    savepoint = _sync_session(session).get_nested_transaction()
+    session.info.setdefault(_AFTER_COMMIT, []).append((savepoint, callback))
+
+
+async def finish_transaction(session: AsyncSession) -> None:
+    """
+    Завершает транзакцию сессии апдейта: коммитит, а если в ней упал запрос, который поймал хендлер, —
+    откатывает (PostgreSQL все равно не закоммитит прерванную транзакцию).
+    """
+    if not session.in_transaction():
+        return
+    connection = await session.connection()
+    if connection.info.get(_FAILED):
+        logger.warning("Транзакция апдейта откатывается: в ней упал запрос к БД")
+        await session.rollback()
+    else:
+        await session.commit()
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для функции запроса.
+    Если передана явная сессия или есть сессия апдейта — работаем в ней, коммит сделает ее владелец.
+    После ошибки БД транзакция прервана: владелец ее откатит (см. finish_transaction),
+    а хендлер, которому после пойманной ошибки еще нужна БД, оборачивает запрос в savepoint().
+    Иначе открываем свою сессию и коммитим на выходе.
+    """
+    shared = session or current_session.get()
+    if shared is not None:
+        yield shared
+        return
+
+    async with AsyncSessionLocal() as own:
+        yield own
+        await own.commit()
+
+
+@asynccontextmanager
+async def savepoint(session: Optional[AsyncSession] = None) -> AsyncIterator[None]:
+    """
+    SAVEPOINT вокруг запросов, ошибку которых хендлер ловит и продолжает работать с БД:
+    откатываются только они, а остальная транзакция апдейта остается исправной.
+    Внутри не стоит обращаться к Telegram — до выхода из SAVEPOINT транзакция не коммитится.
+    """
+    session = session or current_session.get()
+    if session is None:
+        yield
+        return
+
+    async with session.begin_nested():
+        yield
+
+
+def run_detached(coro: Coroutine) -> asyncio.Task:
+    """Запускает фоновую задачу вне сессии текущего апдейта — она переживет апдейт."""
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+
+def _schema_revisions(connection) -> tuple:
+    """Ревизия alembic, на которой стоит БД, и head миграций из alembic/versions."""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    current = MigrationContext.configure(connection).get_current_revision()
+    return current, ScriptDirectory.from_config(config).get_current_head()
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        from .models import Base
-        await conn.run_sync(Base.metadata.create_all)
+    # Схему создают только миграции (alembic upgrade head в Dockerfile): create_all не добавит
+    # колонки, триггеры и справочники, и бот молча работал бы со старой схемой
+    async with engine.connect() as conn:
+        current, head = await conn.run_sync(_schema_revisions)
+    if current != head:
+        raise RuntimeError(
+            f"Схема БД на ревизии {current or 'без миграций'}, а код ожидает {head}: "
+            f"выполните alembic upgrade head"
+        )
 
     async with AsyncSessionLocal() as session:
         from database.test_seed import seed_initial_data
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Set
+
+from .enums import Actions
+from .session import run_detached
+
+logger = logging.getLogger(__name__)
+
+# Как часто сбрасываем накопленные свайпы в БД
+SWIPE_FLUSH_INTERVAL = float(os.getenv("SWIPE_FLUSH_INTERVAL", "0.3"))
+# Сколько свайпов накапливаем до досрочного сброса
+SWIPE_FLUSH_BATCH = int(os.getenv("SWIPE_FLUSH_BATCH", "200"))
+# Сколько раз повторяем сброс пачки целиком, прежде чем писать ее построчно
+SWIPE_FLUSH_RETRIES = 3
+
+
+@dataclass(frozen=True)
+class Swipe:
+    """Действие пользователя с анкетой музыканта (is_group=False) или группы (is_group=True)."""
+    swiper_id: int
+    target_id: int
+    action: Actions
+    created_at: datetime
+    is_group: bool = False
+
+
+SwipeWriter = Callable[[List[Swipe]], Awaitable[None]]
+
+
+class SwipeWriteBuffer:
+    """
+    Буфер отложенной записи свайпов: действия копятся в памяти
+    и пишутся в БД пачкой раз в SWIPE_FLUSH_INTERVAL секунд или по SWIPE_FLUSH_BATCH записей.
+    Пока свайп не записан, он виден через pending_targets (чтение своих записей).
+    """
+
+    def __init__(
+            self,
+            writer: SwipeWriter,
+            flush_interval: float = SWIPE_FLUSH_INTERVAL,
+            max_batch: int = SWIPE_FLUSH_BATCH):
+        self._writer = writer
+        self._flush_interval = flush_interval
+        self._max_batch = max_batch
+        self._pending: List[Swipe] = []
+        # Пачка, которая прямо сейчас пишется в БД
+        self._in_flight: List[Swipe] = []
+        self._failed_attempts = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def add(self, swipe: Swipe) -> None:
+        self._pending.append(swipe)
+
+        if self._task is None:
+            self.start()
+        if len(self._pending) >= self._max_batch:
+            self._wakeup.set()
+
+    def pending_targets(self, swiper_id: int, is_group: bool = False) -> Set[int]:
+        """id анкет, по которым у свайпера есть еще не записанные действия."""
+        return {
+            swipe.target_id for swipe in self._in_flight + self._pending
+            if swipe.swiper_id == swiper_id and swipe.is_group == is_group
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = run_detached(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновый сброс и записывает все, что осталось в буфере."""
+        if self._task is not None:
+            # Не отменяем задачу, чтобы не оборвать запись пачки на середине
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, []
+            self._in_flight = batch
+            try:
+                await self._writer(batch)
+                self._failed_attempts = 0
+                logger.info("Записано свайпов в БД: %d", len(batch))
+            except Exception:
+                self._failed_attempts += 1
+                logger.exception("Ошибка записи пачки свайпов (%d шт.)", len(batch))
+
+                if self._failed_attempts < SWIPE_FLUSH_RETRIES:
+                    # Возвращаем пачку в начало буфера, повторим при следующем сбросе
+                    self._pending = batch + self._pending
+                else:
+                    # Скорее всего в пачке битая строка — пишем по одной и отбрасываем ошибочные
+                    self._failed_attempts = 0
+                    await self._write_one_by_one(batch)
+            finally:
+                self._in_flight = []
+
+    async def _write_one_by_one(self, batch: List[Swipe]) -> None:
+        for swipe in batch:
+            try:
+                await self._writer([swipe])
+            except Exception:
+                logger.exception("Свайп отброшен: swiper ID=%s -> target ID=%s", swipe.swiper_id, swipe.target_id)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
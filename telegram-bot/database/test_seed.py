@@ -3,6 +3,7 @@ import random
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from .city_registry import city_registry
 from .models import User, Instrument, GroupProfile, GroupMember, UserGenre, GroupGenre
 from .enums import PerformanceExperience, FinancialStatus
 from handlers.enums.cities import City
@@ -65,6 +66,7 @@ async def seed_initial_data(session: AsyncSession):
         founder = User(
             id=user_id_counter,
             city=founder_city,
+            city_ids=[await city_registry.resolve(session, founder_city)],
             name=f"Founder_{user_id_counter}",
             age=random.randint(18, 45),
             theoretical_knowledge_level=random.randint(1, 5) if random.random() > 0.3 else None,
@@ -74,9 +76,11 @@ async def seed_initial_data(session: AsyncSession):
         )
         for genre_name in founder_genre_names:
             founder.genres.append(UserGenre(name=genre_name))
+        founder.genre_names = founder_genre_names
         session.add(founder)
 
         # Инструменты для основателя
+        founder_instrument_names = []
         for _ in range(random.randint(1, 2)):
             instr = Instrument(
                 user_id=user_id_counter,
@@ -84,6 +88,8 @@ async def seed_initial_data(session: AsyncSession):
                 proficiency_level=random.randint(1, 5)
             )
             session.add(instr)
+            founder_instrument_names.append(instr.name)
+        founder.instrument_names = list(dict.fromkeys(founder_instrument_names))
 
         group_city = random.choice(ALL_CITIES)
         group_genre_names = random.sample(ALL_GENRES, k=random.randint(1, 3))
@@ -91,6 +97,7 @@ async def seed_initial_data(session: AsyncSession):
             id=group_id_counter,
             name=f"Group_{group_id_counter}",
             city=group_city,
+            city_id=await city_registry.resolve(session, group_city),
             formation_date=random.randint(2015, 2025) if random.random() > 0.3 else None,
             financial_status=random.choice(FIN_STATUSES) if random.random() > 0.4 else None,
             description=f"Группа из {group_city}" if random.random() > 0.5 else None,
@@ -98,6 +105,7 @@ async def seed_initial_data(session: AsyncSession):
         )
         for genre_name in group_genre_names:
             group.genres.append(GroupGenre(name=genre_name))
+        group.genre_names = group_genre_names
         session.add(group)
 
         members = [founder]
@@ -115,6 +123,7 @@ async def seed_initial_data(session: AsyncSession):
             member = User(
                 id=member_id,
                 city=member_city,
+                city_ids=[await city_registry.resolve(session, member_city)],
                 name=f"Member_{member_id}",
                 age=random.randint(16, 60) if random.random() > 0.2 else None,
                 theoretical_knowledge_level=random.randint(1, 5) if random.random() > 0.3 else None,
@@ -124,9 +133,11 @@ async def seed_initial_data(session: AsyncSession):
             )
             for genre_name in member_genre_names:
                 member.genres.append(UserGenre(name=genre_name))
+            member.genre_names = member_genre_names
             session.add(member)
 
             # 🔥 ОБЯЗАТЕЛЬНО: добавляем инструмент каждому участнику
+            member_instrument_names = []
             for _ in range(random.randint(1, 2)):
                 instr = Instrument(
                     user_id=member_id,
@@ -134,6 +145,8 @@ async def seed_initial_data(session: AsyncSession):
                     proficiency_level=random.randint(1, 5)
                 )
                 session.add(instr)
+                member_instrument_names.append(instr.name)
+            member.instrument_names = list(dict.fromkeys(member_instrument_names))
 
             members.append(member)
 
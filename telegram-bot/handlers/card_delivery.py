@@ -0,0 +1,102 @@
+import html
+import logging
+import re
+
+from aiogram import Router, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from database.queries import get_registration_status, get_user_card
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+# Ограничение Telegram на подпись к фото (символы после разбора HTML)
+CAPTION_LIMIT = 1024
+
+_TAG = re.compile(r"<[^>]+>")
+
+# Сообщение, с которым показывается reply-клавиатура режима перед первой карточкой
+KEYBOARD_HINT = "👇 Кнопки для просмотра анкет — внизу"
+
+
+class DemoCB(CallbackData, prefix="demo"):
+    user_id: int
+
+
+def _visible_length(text: str) -> int:
+    """Длина текста так, как ее считает Telegram: без HTML-тегов, в UTF-16."""
+    visible = html.unescape(_TAG.sub("", text))
+    return len(visible.encode("utf-16-le")) // 2
+
+
+def demo_keyboard(card: dict) -> types.InlineKeyboardMarkup | None:
+    if not card["audio"]:
+        return None
+
+    kb = InlineKeyboardBuilder()
+    kb.button(text="🎧 Демо", callback_data=DemoCB(user_id=card["id"]).pack())
+    return kb.as_markup()
+
+
+async def _send(message: types.Message, photo: str | None, text: str, markup) -> None:
+    if photo:
+        try:
+            if _visible_length(text) <= CAPTION_LIMIT:
+                await message.answer_photo(photo=photo, caption=text, reply_markup=markup)
+                return
+            # Текст не влезает в подпись — фото отдельно, текст с кнопками следом
+            await message.answer_photo(photo=photo)
+        except TelegramBadRequest as e:
+            logger.error("Ошибка отправки фото в чат %s: %s", message.chat.id, e)
+
+    await message.answer(text=text, reply_markup=markup)
+
+
+async def send_user_card(
+        message: types.Message,
+        state: FSMContext,
+        card: dict,
+        text: str,
+        reply_markup: types.ReplyKeyboardMarkup,
+        keyboard_key: str,
+) -> None:
+    """
+    Карточка анкеты одним сообщением: фото с текстом в подписи, демо-трек — по кнопке «🎧 Демо».
+
+    У сообщения может быть либо reply-клавиатура, либо inline-кнопки. Поэтому при входе в режим
+    reply-клавиатура уходит коротким сообщением перед первой карточкой (в FSM помним, какая
+    клавиатура уже показана), а у всех карточек, включая первую, — кнопка демо.
+    """
+    data = await state.get_data()
+    if data.get("reply_keyboard") != keyboard_key:
+        await message.answer(text=KEYBOARD_HINT, reply_markup=reply_markup)
+        await state.update_data(reply_keyboard=keyboard_key)
+
+    await _send(message, card["photo"], text, demo_keyboard(card))
+
+
+async def reset_reply_keyboard(state: FSMContext) -> None:
+    """Вызывать при входе в режим просмотра: следующая карточка снова прикрепит reply-клавиатуру."""
+    await state.update_data(reply_keyboard=None)
+
+
+@router.callback_query(DemoCB.filter())
+async def send_demo(callback: types.CallbackQuery, callback_data: DemoCB):
+    user_id = callback.from_user.id
+
+    status = await get_registration_status(user_id)
+    if not status.registered:
+        await callback.answer("🔒 Демо-треки доступны после регистрации", show_alert=True)
+        return
+
+    card = await get_user_card(callback_data.user_id)
+    if not card or not card["audio"]:
+        await callback.answer("Демо-трек больше недоступен")
+        return
+
+    await callback.answer()
+    logger.info("Пользователь ID=%s запросил демо анкеты ID=%s", user_id, card["id"])
+    await callback.message.answer_audio(audio=card["audio"], caption="🎧 <b>Демо-трек:</b>")
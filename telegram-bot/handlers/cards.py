@@ -0,0 +1,209 @@
+import html
+from typing import Callable, Dict
+
+from database.cards import CARD_CACHE_SIZE, CARD_CACHE_TTL
+from database.ttl_cache import TTLCache
+
+# Варианты показа анкеты музыканта
+USER_GUEST = "guest"            # лента для незарегистрированных
+USER_REGISTERED = "registered"  # лента для зарегистрированных
+USER_MATCH = "match"            # лайки и мэтчи: с контактами
+USER_OWNER = "owner"            # своя анкета после редактирования
+
+# Варианты показа анкеты группы
+BAND_GUEST = "guest"
+BAND_REGISTERED = "registered"
+
+# (вид анкеты, id, версия, вариант) -> готовый текст карточки
+_rendered = TTLCache(ttl=CARD_CACHE_TTL, max_entries=CARD_CACHE_SIZE)
+
+
+def rating_to_stars(level: int | None) -> str:
+    return "⭐️" * (level or 0)
+
+
+def render_user_card(card: dict, variant: str) -> str:
+    """Текст анкеты музыканта; для одной версии анкеты рендерится один раз на вариант."""
+    return _render("user", card, variant, _USER_RENDERERS)
+
+
+def render_band_card(card: dict, variant: str) -> str:
+    """Текст анкеты группы; для одной версии анкеты рендерится один раз на вариант."""
+    return _render("band", card, variant, _BAND_RENDERERS)
+
+
+def _render(kind: str, card: dict, variant: str, renderers: Dict[str, Callable[[dict], str]]) -> str:
+    key = (kind, card["id"], card.get("version"), variant)
+    text = _rendered.get(key)
+    if text is None:
+        text = renderers[variant](card)
+        _rendered.set(key, text)
+    return text
+
+
+def _user_genres(card: dict) -> str:
+    return ", ".join(card["genres"]) if card["genres"] else "Не указано"
+
+
+def _user_instruments(card: dict, indent: str) -> str:
+    if not card["instruments"]:
+        return "Не указаны"
+
+    return "\n".join(
+        f"{indent}• <b>{name}</b>: {rating_to_stars(level)}"
+        for name, level in card["instruments"]
+    )
+
+
+def _user_guest(card: dict) -> str:
+    return (
+        f"👤 <b>Имя:</b> {card['name'] or 'Не указано'}\n"
+        f"🏙 <b>Город:</b> {card['city'] or 'Не указано'}\n"
+        f"🎼 <b>Жанры:</b> {_user_genres(card)}\n"
+        f"🎹 <b>Инструменты:</b> \n{_user_instruments(card, '  ')}\n"
+        "🔒 <i>Хотите видеть больше информации об артистах?</i>\n"
+        "<b>Тогда пройдите регистрацию!</b>\n"
+        "Больше информации по кнопке «Подробнее»."
+    )
+
+
+def _user_registered(card: dict) -> str:
+    about_me_display = card["about_me"] if card["about_me"] else "Не указано"
+    external_link = card["external_link"]
+
+    # Если есть ссылка, делаем её кликабельной, иначе оставляем текст
+    if external_link:
+        link_html = f"<a href='{external_link}'>{external_link}</a>"
+    else:
+        link_html = "Не указана"
+
+    return (
+        f"👤 <b>Имя:</b> {card['name'] or 'Не указано'}\n"
+        f"🎂 <b>Возраст:</b> {card['age'] or 'Не указано'}\n"
+        f"🏙 <b>Город:</b> {card['city'] or 'Не указано'}\n\n"
+        f"📝 <b>О себе:</b>\n"
+        f"<i>{about_me_display}</i>\n\n"
+        f"🧠 <b>Уровень теоретических знаний:</b> {rating_to_stars(card['theory_level'])}\n"
+        f"🎤 <b>Опыт выступлений:</b> {card['experience'] or 'Не указано'}\n\n"
+        f"🔗 <b>Внешняя ссылка:</b> {link_html}\n\n"
+        f"🎼 <b>Любимые жанры:</b> {_user_genres(card)}\n\n"
+        f"🎹 <b>Инструменты:</b>\n"
+        f"{_user_instruments(card, '  ')}\n\n"
+    )
+
+
+def _user_match(card: dict) -> str:
+    return (
+        f"👤 <b>Имя:</b> {card['name'] or 'Не указано'}\n"
+        f"🎂 <b>Возраст:</b> {card['age'] or 'Не указано'}\n"
+        f"🏙 <b>Город:</b> {card['city'] or 'Не указано'}\n\n"
+        f"📝 <b>О себе:</b>\n<i>{card['about_me'] or 'Не указано'}</i>\n\n"
+        f"🧠 <b>Теория:</b> {rating_to_stars(card['theory_level'])}\n"
+        f"🎤 <b>Опыт выступлений:</b> {card['experience'] or 'Не указано'}\n\n"
+        f"📞 <b>Контакты:</b> {card['contacts'] or 'Не указано'}\n"
+        f"🔗 <b>Ссылка:</b> {card['external_link'] or 'Не указана'}\n\n"
+        f"🎼 <b>Жанры:</b> {_user_genres(card)}\n\n"
+        f"🎹 <b>Инструменты:</b>\n{_user_instruments(card, '')}"
+    )
+
+
+def _user_owner(card: dict) -> str:
+    name = html.escape(card["name"]) if card["name"] else "Не указано"
+    city = html.escape(card["city"]) if card["city"] else "Не указано"
+    age = card["age"] if card["age"] else "Не указано"
+    contacts = html.escape(card["contacts"]) if card["contacts"] else "Не указано"
+    experience_display = card["experience"] or "Не указано"
+
+    genre_names = [html.escape(genre) for genre in card["genres"]]
+    genres_display = ", ".join([f"#{g}" for g in genre_names]) if genre_names else "Не указано"
+
+    if card["instruments"]:
+        instruments_display = "\n".join(
+            f"  • <b>{html.escape(instrument)}</b>: {rating_to_stars(level)}"
+            for instrument, level in card["instruments"]
+        )
+    else:
+        instruments_display = "Не указаны"
+
+    about_me_display = html.escape(card["about_me"]) if card["about_me"] else "Не указано"
+
+    if card["external_link"]:
+        external_link_display = f"<a href='{card['external_link']}'>🔗 Ссылка на портфолио</a>"
+    else:
+        external_link_display = "Не указана"
+
+    return (
+        f"📝 <b>Ваша обновленная анкета</b>\n"
+        f"<i>Чтобы перейти в меню, напишите /start</i>\n\n"
+
+        f"👤 <b>Имя:</b> {name}\n"
+        f"🎂 <b>Возраст:</b> {age}\n"
+        f"🏙 <b>Город:</b> {city}\n\n"
+
+        f"💬 <b>О себе:</b>\n"
+        f"<i>{about_me_display}</i>\n\n"
+
+        f"🧠 <b>Музыкальная теория:</b> {rating_to_stars(card['theory_level'])}\n"
+        f"🎤 <b>Опыт выступлений:</b> {experience_display}\n\n"
+
+        f"{external_link_display}\n\n"
+        f"📞 <b>Контакты:</b> {contacts}\n\n"
+
+        f"🎶 <b>Жанры:</b>\n{genres_display}\n\n"
+
+        f"🎹 <b>Инструменты:</b>\n"
+        f"{instruments_display}\n"
+    )
+
+
+def _band_fields(card: dict) -> tuple[str, str, str, str]:
+    name = card["name"] if card["name"] is not None else "Не указано"
+    year = card["formation_date"] if card["formation_date"] is not None else "Не указано"
+    city = card["city"] if card["city"] is not None else "Не указано"
+    genres_display = ", ".join(card["genres"]) if card["genres"] else "Не указано"
+    return name, year, city, genres_display
+
+
+def _band_guest(card: dict) -> str:
+    name, year, city, genres_display = _band_fields(card)
+    return (
+        f"🎸 <b>Название:</b> {name} \n"
+        f"🏙 <b>Город:</b> {city} \n"
+        f"📅 <b>Год основания:</b> {year}\n"
+        f"🎼 <b>Жанры:</b> {genres_display}\n\n"
+        "🔒 <i>Хотите видеть больше информации о группах?</i>\n"
+        "<b>Тогда пройдите регистрацию!</b>\n"
+        "Больше информации по кнопке «Подробнее»."
+    )
+
+
+def _band_registered(card: dict) -> str:
+    name, year, city, genres_display = _band_fields(card)
+    description = card["description"] if card["description"] is not None else "Не указано"
+    level = card["seriousness_level"] or "Не указано"
+
+    return (
+        f"🎸 <b>Название:</b> {name}\n"
+        f"📅 <b>Год основания:</b> {year}\n"
+        f"🏙 <b>Город:</b> {city}\n"
+        f"📊 <b>Уровень:</b> {level}\n"
+        f"🎼 <b>Жанры:</b> <i>{genres_display}</i>\n"
+        f"\n"
+        f"📝 <b>О себе:</b>\n"
+        f"<i>{description}</i>\n"
+        f"\n"
+        "👇 <b>Выберите действие:</b>"
+    )
+
+
+_USER_RENDERERS = {
+    USER_GUEST: _user_guest,
+    USER_REGISTERED: _user_registered,
+    USER_MATCH: _user_match,
+    USER_OWNER: _user_owner,
+}
+
+_BAND_RENDERERS = {
+    BAND_GUEST: _band_guest,
+    BAND_REGISTERED: _band_registered,
+}
@@ -5,17 +5,19 @@ from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
 from database.enums import Actions
-from database.queries import get_users_who_liked_me, save_user_interaction, track_event
+from database.queries import get_like_inbox, save_user_interaction, track_event
+from handlers.card_delivery import send_user_card, reset_reply_keyboard
+from handlers.cards import render_user_card, USER_MATCH
 from handlers.start import start
 from states.states_likes import LikesStates
+from utils.cursor import encode_ts, decode_ts
 # from utils.analytics import track_event
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-
-def rating_to_stars(level: int | None) -> str:
-    return "⭐️" * (level or 0)
+# Сколько входящих лайков забираем из БД за раз
+LIKES_PAGE_SIZE = 10
 
 
 def keyboard():
@@ -30,12 +32,34 @@ def keyboard():
     return kb.as_markup(resize_keyboard=True)
 
 
+async def _next_liker(state: FSMContext, user_id: int) -> dict | None:
+    """
+    Следующая карточка из входящих лайков. В данных FSM держим страницу карточек
+    и курсор последнего выданного лайка — в БД идем раз на LIKES_PAGE_SIZE анкет.
+    """
+    data = await state.get_data()
+    queue = data.get("likes_queue") or []
+
+    if not queue:
+        cursor = data.get("likes_cursor")
+        after = (decode_ts(cursor[0]), cursor[1]) if cursor else None
+        page = await get_like_inbox(user_id, LIKES_PAGE_SIZE, after=after)
+        if page:
+            last_card, liked_at = page[-1]
+            queue = [card for card, _ in page]
+            await state.update_data(likes_cursor=[encode_ts(liked_at), last_card["id"]])
+
+    card = queue.pop(0) if queue else None
+    await state.update_data(likes_queue=queue)
+    return card
+
+
 async def render_profile(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     await track_event(user_id, "profile_card_shown", {"target_id": user_id})
     logger.info("Загружаем анкету для пользователя ID=%s", user_id)
 
-    user = await get_users_who_liked_me(my_user_id=user_id)
+    user = await _next_liker(state, user_id)
 
     if not user:
         await message.answer(
@@ -45,38 +69,10 @@ async def render_profile(message: types.Message, state: FSMContext):
         await state.clear()
         return
 
-    await state.update_data(current_target_id=user.id)
-
-    genres = ", ".join(g.name for g in user.genres) if user.genres else "Не указано"
-
-    instruments = (
-        "\n".join(
-            f"• <b>{i.name}</b>: {rating_to_stars(i.proficiency_level)}"
-            for i in user.instruments
-        )
-        if user.instruments else "Не указаны"
-    )
-
-    profile_text = (
-        f"👤 <b>Имя:</b> {user.name or 'Не указано'}\n"
-        f"🎂 <b>Возраст:</b> {user.age or 'Не указано'}\n"
-        f"🏙 <b>Город:</b> {user.city or 'Не указано'}\n\n"
-        f"📝 <b>О себе:</b>\n<i>{user.about_me or 'Не указано'}</i>\n\n"
-        f"🧠 <b>Теория:</b> {rating_to_stars(user.theoretical_knowledge_level)}\n"
-        f"🎤 <b>Опыт выступлений:</b> {getattr(user.has_performance_experience, 'value', 'Не указано')}\n\n"
-        f"📞 <b>Контакты:</b> {user.contacts or 'Не указано'}\n"
-        f"🔗 <b>Ссылка:</b> {user.external_link or 'Не указана'}\n\n"
-        f"🎼 <b>Жанры:</b> {genres}\n\n"
-        f"🎹 <b>Инструменты:</b>\n{instruments}"
-    )
-
-    if user.photo_path:
-        await message.answer_photo(user.photo_path)
-
-    if user.audio_path:
-        await message.answer_audio(user.audio_path)
+    await state.update_data(current_target_id=user["id"])
 
-    await message.answer(profile_text, reply_markup=keyboard())
+    profile_text = render_user_card(user, USER_MATCH)
+    await send_user_card(message, state, user, profile_text, keyboard(), "likes")
 
 
 @router.message(F.text.startswith("❤️ Лайки"))
@@ -85,6 +81,9 @@ async def show_likes(message: types.Message, state: FSMContext):
     await track_event(user_id, "likes_view_started")
     logger.info("Пользователь ID=%s вошёл в режим лайков", message.from_user.id)
     await state.set_state(LikesStates.see_profiles)
+    # Каждый вход в лайки читает входящие с начала очереди
+    await state.update_data(likes_queue=[], likes_cursor=None)
+    await reset_reply_keyboard(state)
     await render_profile(message, state)
 
 
@@ -1,11 +1,15 @@
 import logging
+from datetime import datetime
 
 from aiogram import Router, F, types
 from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
-from database.models import User
-from database.queries import get_my_matches, get_user, track_event
+from database.queries import get_my_matches, get_user_card, track_event
+from handlers.card_delivery import send_user_card, reset_reply_keyboard
+from handlers.cards import render_user_card, USER_MATCH
+from utils.cursor import encode_ts, decode_ts
 # from utils.analytics import track_event
 
 logger = logging.getLogger(__name__)
@@ -18,19 +22,23 @@ PAGE_SIZE = 5
 
 class MatchesCB(CallbackData, prefix="match"):
     action: str          # open | next | prev
-    user_id: int | None  # id мэтча
-    page: int
+    user_id: int | None  # id мэтча (open) или id из курсора страницы (next / prev)
+    ts: int | None = None  # время мэтча из курсора, микросекунды с начала эпохи
 
-def matches_keyboard(matches: list[User], page: int):
+
+def _cursor(callback_data: MatchesCB) -> tuple[datetime, int]:
+    return decode_ts(callback_data.ts), callback_data.user_id
+
+
+def matches_keyboard(matches: list, has_newer: bool, has_older: bool):
     kb = InlineKeyboardBuilder()
 
-    for user in matches:
+    for match in matches:
         kb.button(
-            text=f"{user.name} 🎵",
+            text=f"{match.name} 🎵",
             callback_data=MatchesCB(
                 action="open",
-                user_id=user.id,
-                page=page
+                user_id=match.user_id
             ).pack()
         )
 
@@ -38,23 +46,25 @@ def matches_keyboard(matches: list[User], page: int):
 
     nav = InlineKeyboardBuilder()
 
-    if page > 0:
+    if has_newer and matches:
+        first = matches[0]
         nav.button(
             text="⬅️",
             callback_data=MatchesCB(
                 action="prev",
-                user_id=None,
-                page=page - 1
+                user_id=first.user_id,
+                ts=encode_ts(first.created_at)
             ).pack()
         )
 
-    if len(matches) == PAGE_SIZE:
+    if has_older and matches:
+        last = matches[-1]
         nav.button(
             text="➡️",
             callback_data=MatchesCB(
                 action="next",
-                user_id=None,
-                page=page + 1
+                user_id=last.user_id,
+                ts=encode_ts(last.created_at)
             ).pack()
         )
 
@@ -64,15 +74,15 @@ def matches_keyboard(matches: list[User], page: int):
     return kb.as_markup()
 
 @router.message(F.text == "👥 Мои мэтчи")
-async def show_matches(message: types.Message):
+async def show_matches(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    page = 0
     await track_event(user_id, "matches_list_viewed")
+    await reset_reply_keyboard(state)
 
+    # Берем на одну строку больше, чтобы понять, есть ли следующая страница
     matches = await get_my_matches(
         my_user_id=user_id,
-        limit=PAGE_SIZE,
-        offset=page * PAGE_SIZE
+        limit=PAGE_SIZE + 1
     )
 
     if not matches:
@@ -80,26 +90,43 @@ async def show_matches(message: types.Message):
 
     await message.answer(
         text="❤️ <b>Ваши мэтчи</b>",
-        reply_markup=matches_keyboard(matches, page)
+        reply_markup=matches_keyboard(matches[:PAGE_SIZE], has_newer=False, has_older=len(matches) > PAGE_SIZE)
     )
 
 @router.callback_query(MatchesCB.filter())
 async def matches_callback(
     callback: types.CallbackQuery,
-    callback_data: MatchesCB
+    callback_data: MatchesCB,
+    state: FSMContext
 ):
     user_id = callback.from_user.id
-    page = callback_data.page
 
     if callback_data.action in ("next", "prev"):
-        matches = await get_my_matches(
-            my_user_id=user_id,
-            limit=PAGE_SIZE,
-            offset=page * PAGE_SIZE
-        )
+        if callback_data.ts is None or callback_data.user_id is None:
+            # Кнопка из старой версии списка — начинаем с первой страницы
+            matches = await get_my_matches(my_user_id=user_id, limit=PAGE_SIZE + 1)
+            has_newer, has_older = False, len(matches) > PAGE_SIZE
+            matches = matches[:PAGE_SIZE]
+        elif callback_data.action == "next":
+            matches = await get_my_matches(
+                my_user_id=user_id,
+                limit=PAGE_SIZE + 1,
+                older_than=_cursor(callback_data)
+            )
+            has_newer, has_older = True, len(matches) > PAGE_SIZE
+            matches = matches[:PAGE_SIZE]
+        else:
+            matches = await get_my_matches(
+                my_user_id=user_id,
+                limit=PAGE_SIZE + 1,
+                newer_than=_cursor(callback_data)
+            )
+            # Строки идут от новых к старым — лишняя оказывается первой
+            has_newer, has_older = len(matches) > PAGE_SIZE, True
+            matches = matches[-PAGE_SIZE:]
 
         await callback.message.edit_reply_markup(
-            reply_markup=matches_keyboard(matches, page)
+            reply_markup=matches_keyboard(matches, has_newer, has_older)
         )
         await callback.answer()
         return
@@ -107,15 +134,12 @@ async def matches_callback(
     if callback_data.action == "open":
         match_id = callback_data.user_id
         await track_event(user_id, "match_profile_opened", {"target_id": match_id})
-        user = await (get_user(match_id))
+        user = await get_user_card(match_id)
 
-        await render_profile(callback.message, user)
+        await render_profile(callback.message, state, user)
 
 
-def rating_to_stars(level: int | None) -> str:
-    return "⭐️" * (level or 0)
-
-async def render_profile(message: types.Message, user: User):
+async def render_profile(message: types.Message, state: FSMContext, user: dict | None):
     user_id = message.from_user.id
     logger.info("Загружаем анкету для пользователя ID=%s", user_id)
 
@@ -127,36 +151,8 @@ async def render_profile(message: types.Message, user: User):
         )
         return
 
-    genres = ", ".join(g.name for g in user.genres) if user.genres else "Не указано"
-
-    instruments = (
-        "\n".join(
-            f"• <b>{i.name}</b>: {rating_to_stars(i.proficiency_level)}"
-            for i in user.instruments
-        )
-        if user.instruments else "Не указаны"
-    )
-
-    profile_text = (
-        f"👤 <b>Имя:</b> {user.name or 'Не указано'}\n"
-        f"🎂 <b>Возраст:</b> {user.age or 'Не указано'}\n"
-        f"🏙 <b>Город:</b> {user.city or 'Не указано'}\n\n"
-        f"📝 <b>О себе:</b>\n<i>{user.about_me or 'Не указано'}</i>\n\n"
-        f"🧠 <b>Теория:</b> {rating_to_stars(user.theoretical_knowledge_level)}\n"
-        f"🎤 <b>Опыт выступлений:</b> {getattr(user.has_performance_experience, 'value', 'Не указано')}\n\n"
-        f"📞 <b>Контакты:</b> {user.contacts or 'Не указано'}\n"
-        f"🔗 <b>Ссылка:</b> {user.external_link or 'Не указана'}\n\n"
-        f"🎼 <b>Жанры:</b> {genres}\n\n"
-        f"🎹 <b>Инструменты:</b>\n{instruments}"
-    )
-
-    if user.photo_path:
-        await message.answer_photo(user.photo_path)
-
-    if user.audio_path:
-        await message.answer_audio(user.audio_path)
-
-    await message.answer(profile_text, reply_markup=keyboard())
+    profile_text = render_user_card(user, USER_MATCH)
+    await send_user_card(message, state, user, profile_text, keyboard(), "match")
 
 def keyboard():
     kb = ReplyKeyboardBuilder()
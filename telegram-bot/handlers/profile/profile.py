@@ -8,9 +8,11 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 
 from database.enums import PerformanceExperience
+from database.session import savepoint
 from database.queries import update_user, update_instrument_level, update_user_experience, update_user_theory_level, \
     save_user_profile_photo, save_user_audio, get_user, update_user_city, update_user_name, update_user_genres, \
-    update_user_instruments, update_user_about_me, update_user_contacts, track_event
+    update_user_instruments, update_user_about_me, update_user_contacts, track_event, get_user_card
+from handlers.cards import render_user_card, USER_OWNER
 from handlers.enums.genres import Genre
 from handlers.enums.instruments import Instruments
 from handlers.profile.profile_keyboards import get_instrument_selection_keyboard, get_experience_selection_keyboard, \
@@ -46,86 +48,29 @@ async def send_updated_profile(message: types.Message | types.CallbackQuery, use
         await bot.send_message(chat_id, f"✅ {success_message}")
 
     try:
-        user_obj = await get_user(user_id)
+        user_card = await get_user_card(user_id)
     except Exception as e:
         logger.error("Ошибка при получении данных пользователя %s в send_updated_profile: %s", user_id, e)
         await bot.send_message(chat_id, "⚠️ Произошла ошибка при доступе к профилю.")
         return
 
-    if not user_obj:
+    if not user_card:
         await bot.send_message(chat_id, "⚠️ Ваша анкета не найдена.")
         return
 
-    # Подготовка данных
-    name = html.escape(user_obj.name) if user_obj.name else "Не указано"
-    city = html.escape(user_obj.city) if user_obj.city else "Не указано"
-    age = user_obj.age if user_obj.age else "Не указано"
-    contacts = html.escape(user_obj.contacts) if user_obj.contacts else "Не указано"
-
-    knowledge_level = user_obj.theoretical_knowledge_level if user_obj.theoretical_knowledge_level is not None else 0
-    stars_knowledge = rating_to_stars(knowledge_level)
-
-    experience_display = getattr(user_obj.has_performance_experience, 'value', 'Не указано')
-
-    genres_list = user_obj.genres or []
-    genre_names = [html.escape(g.name) for g in genres_list]
-    genres_display = ", ".join([f"#{g}" for g in genre_names]) if genre_names else "Не указано"
-
-    instruments_lines = []
-    if user_obj.instruments:
-        for instrument in user_obj.instruments:
-            proficiency_level = instrument.proficiency_level if instrument.proficiency_level is not None else 0
-            stars_proficiency = rating_to_stars(proficiency_level)
-            instruments_lines.append(
-                f"  • <b>{html.escape(instrument.name)}</b>: {stars_proficiency}"
-            )
-        instruments_display = "\n".join(instruments_lines)
-    else:
-        instruments_display = "Не указаны"
-
-    about_me_display = html.escape(user_obj.about_me) if user_obj.about_me else "Не указано"
-
-    external_link_raw = user_obj.external_link
-    if external_link_raw:
-        external_link_display = f"<a href='{external_link_raw}'>🔗 Ссылка на портфолио</a>"
-    else:
-        external_link_display = "Не указана"
-
-    # Формирование красивого текста
-    profile_text = (
-        f"📝 <b>Ваша обновленная анкета</b>\n"
-        f"<i>Чтобы перейти в меню, напишите /start</i>\n\n"
-
-        f"👤 <b>Имя:</b> {name}\n"
-        f"🎂 <b>Возраст:</b> {age}\n"
-        f"🏙 <b>Город:</b> {city}\n\n"
-
-        f"💬 <b>О себе:</b>\n"
-        f"<i>{about_me_display}</i>\n\n"
-
-        f"🧠 <b>Музыкальная теория:</b> {stars_knowledge}\n"
-        f"🎤 <b>Опыт выступлений:</b> {experience_display}\n\n"
-
-        f"{external_link_display}\n\n"
-        f"📞 <b>Контакты:</b> {html.escape(contacts)}\n\n"
-
-        f"🎶 <b>Жанры:</b>\n{genres_display}\n\n"
-
-        f"🎹 <b>Инструменты:</b>\n"
-        f"{instruments_display}\n"
-    )
+    profile_text = render_user_card(user_card, USER_OWNER)
 
-    if user_obj.photo_path:
+    if user_card["photo"]:
         try:
-            await bot.send_photo(chat_id, photo=user_obj.photo_path, caption="📸 <b>Фото профиля</b>", parse_mode="HTML")
+            await bot.send_photo(chat_id, photo=user_card["photo"], caption="📸 <b>Фото профиля</b>", parse_mode="HTML")
             logger.info("Пользователю %s отправлено фото профиля", user_id)
         except Exception as e:
             logger.error("Ошибка отправки фото по file_id для %s: %s", user_id, e)
             await bot.send_message(chat_id, "⚠️ Фото профиля не удалось загрузить.")
 
-    if user_obj.audio_path:
+    if user_card["audio"]:
         try:
-            await bot.send_audio(chat_id, audio=user_obj.audio_path, caption="🎧 <b>Демо-трек</b>", parse_mode="HTML")
+            await bot.send_audio(chat_id, audio=user_card["audio"], caption="🎧 <b>Демо-трек</b>", parse_mode="HTML")
             logger.info("Пользователю %s демо-трек", user_id)
         except Exception as e:
             logger.error("Ошибка отправки аудио по file_id для %s: %s", user_id, e)
@@ -148,9 +93,9 @@ async def send_updated_profile(message: types.Message | types.CallbackQuery, use
         # Fallback (упрощенный текст)
         simple_text = (
             f"<b>Ваша анкета</b>\n\n"
-            f"Имя: {name}\n"
-            f"Город: {city}\n"
-            f"Инструменты: {len(user_obj.instruments) if user_obj.instruments else 0}"
+            f"Имя: {html.escape(user_card['name']) if user_card['name'] else 'Не указано'}\n"
+            f"Город: {html.escape(user_card['city']) if user_card['city'] else 'Не указано'}\n"
+            f"Инструменты: {len(user_card['instruments'])}"
         )
         await bot.send_message(chat_id, simple_text, reply_markup=keyboard, parse_mode="HTML")
 
@@ -168,7 +113,7 @@ async def _show_profile_logic(event: types.Message | types.CallbackQuery, state:
         message_source = event
 
     try:
-        user_obj = await get_user(user_id)
+        user_card = await get_user_card(user_id)
     except Exception as e:
         logger.error("Ошибка при получении данных пользователя %s: %s", user_id, e)
         await message_source.answer("⚠️ Произошла ошибка при доступе к профилю.")
@@ -176,7 +121,7 @@ async def _show_profile_logic(event: types.Message | types.CallbackQuery, state:
 
     await state.set_state(ProfileStates.select_param_to_fill)
 
-    if user_obj:
+    if user_card:
         await send_updated_profile(event, user_id)
     else:
         logger.warning("Анкета пользователя %s не найдена, предлагаем регистрацию", user_id)
@@ -384,7 +329,9 @@ async def process_experience_type(callback: types.CallbackQuery, state: FSMConte
         return
 
     try:
-        await update_user_experience(user_id, selected_experience)
+        # После ошибки анкету все равно перечитываем — откатываем только эту запись
+        async with savepoint():
+            await update_user_experience(user_id, selected_experience)
         logger.info("Пользователь %s обновил опыт выступлений на: %s", user_id, selected_experience.value)
     except Exception as e:
         logger.error("Ошибка сохранения опыта выступлений для %s: %s", user_id, e)
@@ -425,7 +372,8 @@ async def process_selected_theory_level(callback: types.CallbackQuery, state: FS
         return
 
     try:
-        await update_user_theory_level(user_id=user_id, theory_level=new_level)
+        async with savepoint():
+            await update_user_theory_level(user_id=user_id, theory_level=new_level)
         logger.info("Пользователь %s обновил уровень теории на %d", user_id, new_level)
     except Exception as e:
         logger.error("Ошибка сохранения уровня теории для %s: %s", user_id, e)
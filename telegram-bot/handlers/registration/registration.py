@@ -304,7 +304,8 @@ async def done_instruments(callback: types.CallbackQuery, state: FSMContext):
 
     try:
         await state.set_state(RegistrationStates.level_practice)
-        await state.update_data(instruments_list=instruments_list)
+        # В FSM только названия: данные сериализуются в JSON для хранилища
+        await state.update_data(instruments_list=all_user_inst)
         logger.info("FSM состояние обновлено на level_practice для пользователя %s", user_id)  # Исправлен формат
     except Exception:
         logger.exception("Ошибка при обновлении состояния FSM пользователя %s", user_id)  # Исправлен формат
@@ -507,6 +508,8 @@ async def save_contacts(message: types.Message, state: FSMContext):
 
     try:
         await update_user(user_id, contacts=contact_text)
+        # Регистрация завершена — меню должно сразу увидеть нового пользователя
+        invalidate_registration_status(user_id)
         await track_event(user_id, "registration_success")
         logger.info("Контакты пользователя %s сохранены: %s", user_id, contact_text)
     except Exception:
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from aiogram.fsm.context import FSMContext
+
+from database.candidate_deck import filters_fingerprint
+from database.session import run_detached
+from database.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Сколько карточек забираем из БД за раз
+PAGE_SIZE = int(os.getenv("CARD_BUFFER_PAGE_SIZE", "10"))
+# Когда в буфере остается меньше карточек — в фоне подгружаем следующую страницу
+PREFETCH_THRESHOLD = int(os.getenv("CARD_BUFFER_PREFETCH_THRESHOLD", "3"))
+# Сколько секунд подгруженная страница ждет следующего свайпа, прежде чем выбрасывается
+PREFETCH_TTL = float(os.getenv("CARD_BUFFER_PREFETCH_TTL", "300"))
+# Сколько лент одновременно держат подгрузку; самые давние вытесняются
+PREFETCH_CACHE_SIZE = int(os.getenv("CARD_BUFFER_PREFETCH_CACHE_SIZE", "10000"))
+
+# fetch(swiper_id, filters, limit, exclude_ids) -> карточки
+CardFetcher = Callable[[int, Optional[dict], int, set], Awaitable[List[dict]]]
+
+# (вид ленты, свайпер) -> (ключ фильтров, задача подгрузки или уже подгруженные карточки).
+# Живет в памяти процесса, тогда как сам буфер — в FSM (Redis): если следующий апдейт
+# попадет на другую реплику, она просто загрузит страницу сама, а эта запись истечет по TTL
+_prefetch = TTLCache(ttl=PREFETCH_TTL, max_entries=PREFETCH_CACHE_SIZE)
+
+
+async def next_card(
+        state: FSMContext,
+        kind: str,
+        swiper_id: int,
+        filters: Optional[dict],
+        fetch: CardFetcher) -> Optional[dict]:
+    """
+    Возвращает следующую карточку ленты из буфера в данных FSM.
+    В БД идем только когда буфер пуст или поменялись фильтры,
+    а при низком остатке заранее запускаем подгрузку следующей страницы.
+    """
+    data = await state.get_data()
+    buffer_key = f"{kind}_buffer"
+    buffer_filters_key = f"{kind}_buffer_filters"
+
+    filters_key = filters_fingerprint(filters)
+    buffer: List[dict] = data.get(buffer_key) or []
+    if data.get(buffer_filters_key) != filters_key:
+        buffer = []
+
+    key = (kind, swiper_id)
+    prefetched = _prefetch.get(key)
+    _prefetch.invalidate(key)
+    if prefetched is not None:
+        prefetch_filters_key, pending = prefetched
+        if not isinstance(pending, asyncio.Task):
+            if prefetch_filters_key == filters_key:
+                buffer = _merge(buffer, pending)
+        elif prefetch_filters_key != filters_key:
+            pending.cancel()
+        elif not buffer:
+            buffer = _merge(buffer, await _result(pending))
+        else:
+            # Еще грузится, а карточки в буфере есть — заберем в следующий раз
+            _prefetch.set(key, prefetched)
+
+    if not buffer:
+        buffer = await fetch(swiper_id, filters, PAGE_SIZE, set())
+
+    card = buffer.pop(0) if buffer else None
+
+    if card is not None and len(buffer) < PREFETCH_THRESHOLD and _prefetch.get(key) is None:
+        exclude_ids = {item["id"] for item in buffer} | {card["id"]}
+        task = run_detached(fetch(swiper_id, filters, PAGE_SIZE, exclude_ids))
+        _prefetch.set(key, (filters_key, task))
+        task.add_done_callback(lambda done: _prefetched(key, filters_key, done))
+
+    await state.update_data({buffer_key: buffer, buffer_filters_key: filters_key})
+    return card
+
+
+def _merge(buffer: List[dict], cards: List[dict]) -> List[dict]:
+    known = {item["id"] for item in buffer}
+    return buffer + [card for card in cards if card["id"] not in known]
+
+
+def _prefetched(key: Tuple[str, int], filters_key: str, task: asyncio.Task) -> None:
+    """Готовая задача в кэше заменяется своими карточками, упавшая — убирается."""
+    entry = _prefetch.get(key)
+    if entry is None or entry[1] is not task:
+        # Запись уже забрали, отменили или вытеснили
+        return
+
+    if task.cancelled():
+        _prefetch.invalidate(key)
+    elif task.exception() is not None:
+        logger.error("Ошибка фоновой подгрузки карточек", exc_info=task.exception())
+        _prefetch.invalidate(key)
+    else:
+        _prefetch.set(key, (filters_key, task.result()))
+
+
+async def _result(task: asyncio.Task) -> List[dict]:
+    try:
+        return await task
+    except asyncio.CancelledError:
+        return []
+    except Exception:
+        logger.exception("Ошибка фоновой подгрузки карточек")
+        return []
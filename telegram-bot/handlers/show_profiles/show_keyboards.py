@@ -10,6 +10,14 @@ from handlers.enums.genres import Genre
 from handlers.enums.instruments import Instruments
 from handlers.enums.seriousness_level import SeriousnessLevel
 
+# Варианты фильтра «не дальше N км» от городов из анкеты
+RADIUS_OPTIONS_KM = [30, 60, 100, 200]
+
+
+def radius_display(current_filters: Dict) -> str:
+    radius_km = current_filters.get('radius_km')
+    return f"До {radius_km} км" if radius_km else "Любой"
+
 
 # клавиатура для выбора, что хочет смотреть пользователь
 def choose_keyboard_for_show():
@@ -127,6 +135,12 @@ def get_filter_menu_keyboard(current_filters: Dict) -> types.InlineKeyboardMarku
         callback_data="set_filter_level"
     ))
 
+    # Расстояние
+    builder.row(types.InlineKeyboardButton(
+        text=f"📍 Расстояние: {radius_display(current_filters)}",
+        callback_data="set_filter_radius"
+    ))
+
     # 3. --- Кнопки управления ---
 
     builder.row(
@@ -296,6 +310,29 @@ def make_age_filter_keyboard(current_mode: str) -> types.InlineKeyboardMarkup:
 
     return builder.as_markup()
 
+def make_radius_filter_keyboard(current_radius: int | None, prefix: str, back_callback: str) -> types.InlineKeyboardMarkup:
+    """Клавиатура выбора радиуса поиска; prefix отличает фильтр музыкантов от фильтра групп."""
+    builder = InlineKeyboardBuilder()
+
+    for radius_km in RADIUS_OPTIONS_KM:
+        text = f"До {radius_km} км"
+        builder.row(types.InlineKeyboardButton(
+            text=f"✅ {text}" if radius_km == current_radius else text,
+            callback_data=f"{prefix}{radius_km}"
+        ))
+
+    builder.row(types.InlineKeyboardButton(
+        text="✅ Любое расстояние" if current_radius is None else "Любое расстояние (Сбросить)",
+        callback_data=f"{prefix}all"
+    ))
+
+    builder.row(types.InlineKeyboardButton(
+        text="Назад к фильтрам ⬅️",
+        callback_data=back_callback
+    ))
+
+    return builder.as_markup()
+
 def make_experience_filter_keyboard(selected_experiences: List[str]) -> types.InlineKeyboardMarkup:
     """Создает Inline-клавиатуру для выбора опыта выступлений-фильтров."""
     builder = InlineKeyboardBuilder()
@@ -410,6 +447,11 @@ def get_group_filter_menu_keyboard(current_filters: Dict) -> types.InlineKeyboar
         callback_data="set_group_filter_level"
     ))
 
+    builder.row(types.InlineKeyboardButton(
+        text=f"📍 Расстояние: {radius_display(current_filters)}",
+        callback_data="set_group_filter_radius"
+    ))
+
     # 3. Управление
     builder.row(
         types.InlineKeyboardButton(
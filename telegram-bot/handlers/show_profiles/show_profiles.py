@@ -6,13 +6,17 @@ from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import TelegramBadRequest
 
 # Импортируем все необходимые функции БД и клавиатуры, как в оригинале
-from database.queries import get_random_profile, get_random_group, save_user_interaction, save_group_interaction, \
-    get_profile_which_not_action, get_band_which_not_action
+from database.queries import save_user_interaction, save_group_interaction, get_profile_cards, get_band_cards, \
+    get_random_group_cards, get_guest_profile_cards
+from handlers.cards import render_user_card, render_band_card, USER_GUEST, USER_REGISTERED, BAND_GUEST, \
+    BAND_REGISTERED
+from handlers.card_delivery import send_user_card, reset_reply_keyboard
+from handlers.show_profiles.card_buffer import next_card
 from handlers.show_profiles.show_keyboards import choose_keyboard_for_show, \
     show_reply_keyboard_for_unregistered_users, show_reply_keyboard_for_registered_users, \
     make_instrument_filter_keyboard, make_city_filter_keyboard, make_genre_filter_keyboard, make_age_filter_keyboard, \
     make_experience_filter_keyboard, make_level_filter_keyboard, get_group_filter_menu_keyboard, \
-    make_seriousness_filter_keyboard
+    make_seriousness_filter_keyboard, make_radius_filter_keyboard
 from handlers.show_profiles.show_keyboards import get_filter_menu_keyboard
 from handlers.start import start
 from states.states_show_profiles import ShowProfiles
@@ -25,13 +29,6 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 
-# Вспомогательная функция для отображения рейтинга звездочками
-def rating_to_stars(level: int) -> str:
-    if level is None:
-        level = 0
-    return "⭐️" * level
-
-
 # --- ХЕНДЛЕРЫ ПРОСМОТРА ---
 
 # старт просмотр анкет, если пользователь не зарегистрирован
@@ -82,6 +79,7 @@ async def choose_user(callback: types.CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
 
     await state.update_data(user_id=user_id, current_target_id=None, current_target_type=None)
+    await reset_reply_keyboard(state)
 
     if choose == "bands":
         logger.info("Пользователь ID=%s выбрал просмотр групп", user_id)
@@ -129,10 +127,10 @@ async def show_bands(message: types.Message, state: FSMContext):
 
         if not registered:
             # Гости смотрят случайные группы без фильтров
-            band = await get_random_group()
+            band = await next_card(state, "guest_band", user_id, None, _fetch_guest_band_cards)
         else:
             # Зарегистрированные смотрят с учетом фильтров и исключений
-            band = await get_band_which_not_action(user_id, filters=group_filters)
+            band = await next_card(state, "band", user_id, group_filters, get_band_cards)
 
         # Если группа не найдена
         if not band:
@@ -158,57 +156,27 @@ async def show_bands(message: types.Message, state: FSMContext):
         return
 
     # Запоминаем текущую группу
-    await state.update_data(current_target_id=band.id, current_target_type="group")
+    await state.update_data(current_target_id=band["id"], current_target_type="group")
 
     # --- ФОРМИРОВАНИЕ ТЕКСТА АНКЕТЫ ---
-    name = band.name if band.name is not None else "Не указано"
-    year = band.formation_date if band.formation_date is not None else "Не указано"
-    city = band.city if band.city is not None else "Не указано"
+    if registered:
+        markup = show_reply_keyboard_for_registered_users()
+        profile_msg = render_band_card(band, BAND_REGISTERED)
+    else:
+        # Гостю показываем сокращенную анкету
+        markup = show_reply_keyboard_for_unregistered_users()
+        profile_msg = render_band_card(band, BAND_GUEST)
 
-    # Получение списка жанров
-    genres_list = band.genres if band.genres is not None else []
-    genre_names = [genre_entity.name for genre_entity in genres_list]
-    genres_display = ", ".join(genre_names) if genre_names else "Не указано"
+    await message.answer(text=profile_msg, reply_markup=markup)
 
-    # Вариант для ГОСТЯ
-    if not registered:
-        markup = show_reply_keyboard_for_unregistered_users()
-        profile_msg = (
-            f"🎸 <b>Название:</b> {name} \n"
-            f"🏙 <b>Город:</b> {city} \n"
-            f"📅 <b>Год основания:</b> {year}\n"
-            f"🎼 <b>Жанры:</b> {genres_display}\n\n"
-            "🔒 <i>Хотите видеть больше информации о группах?</i>\n"
-            "<b>Тогда пройдите регистрацию!</b>\n"
-            "Больше информации по кнопке «Подробнее»."
-        )
 
-    # Вариант для ЗАРЕГИСТРИРОВАННОГО
-    if registered:
-        markup = show_reply_keyboard_for_registered_users()
-        description = band.description if band.description is not None else "Не указано"
+async def _fetch_guest_band_cards(swiper_id: int, filters: dict | None, limit: int, exclude_ids: set) -> list[dict]:
+    return await get_random_group_cards(limit, exclude_ids)
 
-        # Отображение уровня (если это Enum, берем .value, если строка - оставляем)
-        level_raw = band.seriousness_level
-        if hasattr(level_raw, 'value'):
-            level = level_raw.value
-        else:
-            level = level_raw if level_raw else "Не указано"
-
-        profile_msg = (
-            f"🎸 <b>Название:</b> {name}\n"
-            f"📅 <b>Год основания:</b> {year}\n"
-            f"🏙 <b>Город:</b> {city}\n"
-            f"📊 <b>Уровень:</b> {level}\n"
-            f"🎼 <b>Жанры:</b> <i>{genres_display}</i>\n"
-            f"\n"
-            f"📝 <b>О себе:</b>\n"
-            f"<i>{description}</i>\n"
-            f"\n"
-            "👇 <b>Выберите действие:</b>"
-        )
 
-    await message.answer(text=profile_msg, reply_markup=markup)
+async def _fetch_guest_user_cards(swiper_id: int, filters: dict | None, limit: int, exclude_ids: set) -> list[dict]:
+    return await get_guest_profile_cards(swiper_id, limit, exclude_ids)
+
 
 # показывает анкеты пользователей
 @router.message(F.text.startswith("Следующая анкета"), ShowProfiles.show_profiles)
@@ -238,10 +206,10 @@ async def show_profiles(message: types.Message, state: FSMContext):
     try:
         if not registered:
             logger.info("Гость ID=%s: ищем рандомный профиль БЕЗ фильтров", user_id)
-            user = await get_random_profile(swiper_id=user_id, filters=None)
+            user = await next_card(state, "guest_user", user_id, None, _fetch_guest_user_cards)
         else:
             logger.info("Регистрация есть: ищем профиль С фильтрами: %s у пользователя ID=%s", filters, user_id)
-            user = await get_random_profile(swiper_id=user_id, filters=filters)
+            user = await next_card(state, "user", user_id, filters, get_profile_cards)
 
         if not user:
             if registered and filters:
@@ -261,79 +229,20 @@ async def show_profiles(message: types.Message, state: FSMContext):
         logger.exception("Ошибка у пользователя ID=%s при получении анкеты", user_id)
         return
 
-    await state.update_data(current_target_id=user.id, current_target_type="user")
-
-    genres_list = user.genres or []
-    genre_names = [genre_entity.name for genre_entity in genres_list]
-    genres_display = ", ".join(genre_names) if genre_names else "Не указано"
-
-    instruments_lines = []
-    if user.instruments:
-        for instrument in user.instruments:
-            proficiency_level = instrument.proficiency_level if instrument.proficiency_level is not None else 0
-            stars_proficiency = rating_to_stars(proficiency_level)
-            instruments_lines.append(
-                f"  • <b>{instrument.name}</b>: {stars_proficiency}"
-            )
-        instruments_display = "\n".join(instruments_lines)
-    else:
-        instruments_display = "Не указаны"
+    await state.update_data(current_target_id=user["id"], current_target_type="user")
 
     if not registered:
-        profile_msg = (
-            f"👤 <b>Имя:</b> {user.name or 'Не указано'}\n"
-            f"🏙 <b>Город:</b> {user.city or 'Не указано'}\n"
-            f"🎼 <b>Жанры:</b> {genres_display}\n"
-            f"🎹 <b>Инструменты:</b> \n{instruments_display}\n"
-            "🔒 <i>Хотите видеть больше информации об артистах?</i>\n"
-            "<b>Тогда пройдите регистрацию!</b>\n"
-            "Больше информации по кнопке «Подробнее»."
-        )
+        profile_msg = render_user_card(user, USER_GUEST)
         markup = show_reply_keyboard_for_unregistered_users()
 
     if registered:
         markup = show_reply_keyboard_for_registered_users()
+        profile_msg = render_user_card(user, USER_REGISTERED)
 
-        chat_id = message.chat.id if isinstance(message, types.Message) else message.message.chat.id
-        knowledge_level = user.theoretical_knowledge_level if user.theoretical_knowledge_level is not None else 0
-        stars_knowledge = rating_to_stars(knowledge_level)
-        experience_display = getattr(user.has_performance_experience, 'value', 'Не указано')
-        about_me_display = user.about_me if user.about_me else "Не указано"
-        external_link_display = user.external_link if user.external_link else "Не указана"
-
-        # Если есть ссылка, делаем её кликабельной, иначе оставляем текст
-        if external_link_display and external_link_display != "Не указана":
-            link_html = f"<a href='{external_link_display}'>{external_link_display}</a>"
-        else:
-            link_html = external_link_display
-
-        profile_msg = (
-            f"👤 <b>Имя:</b> {user.name or 'Не указано'}\n"
-            f"🎂 <b>Возраст:</b> {user.age or 'Не указано'}\n"
-            f"🏙 <b>Город:</b> {user.city or 'Не указано'}\n\n"
-            f"📝 <b>О себе:</b>\n"
-            f"<i>{about_me_display}</i>\n\n"
-            f"🧠 <b>Уровень теоретических знаний:</b> {stars_knowledge}\n"
-            f"🎤 <b>Опыт выступлений:</b> {experience_display or 'Не указано'}\n\n"
-            f"🔗 <b>Внешняя ссылка:</b> {link_html}\n\n"
-            f"🎼 <b>Любимые жанры:</b> {genres_display}\n\n"
-            f"🎹 <b>Инструменты:</b>\n"
-            f"{instruments_display}\n\n"
-        )
-
-        if user.photo_path:
-            try:
-                await message.send_photo(chat_id, photo=user.photo_path, caption="📸 <b>Фото профиля:</b>")
-                logger.info("Пользователю ID=%s отправлено фото профиля ID=%s", user_id, user.id)
-            except Exception as e:
-                logger.error("Ошибка отправки фото для пользователя ID=%s: %s", user_id, e)
-
-        if user.audio_path:
-            try:
-                await message.send_audio(chat_id, audio=user.audio_path, caption="🎧 <b>Демо-трек:</b>")
-                logger.info("Пользователю ID=%s отправлено аудио профиля ID=%s", user_id, user.id)
-            except Exception as e:
-                logger.error("Ошибка отправки аудио для пользователя ID=%s: %s", user_id, e)
+        # Фото и текст одним сообщением, демо-трек — по кнопке
+        await send_user_card(message, state, user, profile_msg, markup, "feed")
+        logger.info("Пользователю ID=%s отправлена анкета ID=%s", user_id, user["id"])
+        return
 
     await message.answer(text=profile_msg, reply_markup=markup)
 
@@ -822,6 +731,58 @@ async def back_from_age_filter(callback: types.CallbackQuery, state: FSMContext)
     await callback.answer()
 
 
+@router.callback_query(F.data == "set_filter_radius", ShowProfiles.filter_menu)
+async def start_set_radius_filter(callback: types.CallbackQuery, state: FSMContext):
+    user_id = callback.from_user.id
+    logger.info("Пользователь ID=%s перешел к настройке фильтра расстояния", user_id)
+    data = await state.get_data()
+    filters = data.get('filters', {})
+
+    await callback.message.edit_text(
+        "📍 <b>Расстояние</b>\n"
+        "Показывать музыкантов не дальше выбранного расстояния от городов из вашей анкеты. "
+        "Ближние анкеты показываются первыми при любом выборе.",
+        reply_markup=make_radius_filter_keyboard(filters.get('radius_km'), "radius_km_", "back_from_radius_filter")
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("radius_km_"), ShowProfiles.filter_menu)
+async def set_radius(callback: types.CallbackQuery, state: FSMContext):
+    user_id = callback.from_user.id
+    value = callback.data.split("radius_km_")[1]
+
+    data = await state.get_data()
+    filters = data.get('filters', {})
+
+    if value == 'all':
+        filters.pop('radius_km', None)
+        logger.info("Пользователь ID=%s сбросил фильтр расстояния", user_id)
+    else:
+        filters['radius_km'] = int(value)
+        logger.info("Пользователь ID=%s установил фильтр расстояния: %s км", user_id, value)
+
+    await state.update_data(filters=filters)
+
+    with suppress(TelegramBadRequest):
+        await callback.message.edit_reply_markup(
+            reply_markup=make_radius_filter_keyboard(filters.get('radius_km'), "radius_km_", "back_from_radius_filter")
+        )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "back_from_radius_filter", ShowProfiles.filter_menu)
+async def back_from_radius_filter(callback: types.CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    filters = data.get('filters', {})
+
+    await callback.message.edit_text(
+        "⚙️ <b>Настройка фильтров.</b> Ваши текущие параметры:",
+        reply_markup=get_filter_menu_keyboard(filters)
+    )
+    await callback.answer()
+
+
 @router.callback_query(F.data == "set_filter_experience", ShowProfiles.filter_menu)
 async def start_set_experience_filter(callback: types.CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
@@ -1104,6 +1065,56 @@ async def done_group_level(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+# Настройка расстояния для групп — та же клавиатура, но с другим префиксом и в group_filters
+@router.callback_query(F.data == "set_group_filter_radius", ShowProfiles.filter_menu)
+async def set_group_radius(callback: types.CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    filters = data.get('group_filters', {})
+
+    await callback.message.edit_text(
+        "📍 <b>Расстояние до группы</b>\n"
+        "Считается от городов из вашей анкеты. Ближние группы показываются первыми при любом выборе.",
+        reply_markup=make_radius_filter_keyboard(
+            filters.get('radius_km'), "group_radius_km_", "back_from_group_radius_filter"
+        )
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("group_radius_km_"), ShowProfiles.filter_menu)
+async def toggle_group_radius(callback: types.CallbackQuery, state: FSMContext):
+    value = callback.data.split("group_radius_km_")[1]
+
+    data = await state.get_data()
+    filters = data.get('group_filters', {})
+
+    if value == 'all':
+        filters.pop('radius_km', None)
+    else:
+        filters['radius_km'] = int(value)
+    await state.update_data(group_filters=filters)
+
+    with suppress(TelegramBadRequest):
+        await callback.message.edit_reply_markup(
+            reply_markup=make_radius_filter_keyboard(
+                filters.get('radius_km'), "group_radius_km_", "back_from_group_radius_filter"
+            )
+        )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "back_from_group_radius_filter", ShowProfiles.filter_menu)
+async def back_from_group_radius(callback: types.CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    filters = data.get('group_filters', {})
+
+    await callback.message.edit_text(
+        "⚙️ <b>Настройка фильтров групп.</b>",
+        reply_markup=get_group_filter_menu_keyboard(filters)
+    )
+    await callback.answer()
+
+
 # 5. Настройка Городов и Жанров (Повторное использование логики)
 # Мы можем переиспользовать существующие функции make_city_filter_keyboard,
 # но нужно сохранять данные именно в group_filters.
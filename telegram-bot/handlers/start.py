@@ -5,7 +5,10 @@ from aiogram.types import InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 import logging
 
-from database.queries import check_user, get_band_data_by_user_id, check_exist_band
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.queries import get_registration_status, count_unread_likes
+from database.session import savepoint
 from states.states_registration import RegistrationStates
 
 logger = logging.getLogger(__name__)
@@ -13,35 +16,40 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 @router.message(CommandStart())
-async def start(message: types.Message, state: FSMContext):
+async def start(message: types.Message, state: FSMContext, session: AsyncSession | None = None):
     await state.clear()
     user_id = message.from_user.id
     username = message.from_user.username or "no_username"
     logger.info("Пользователь ID=%s (@%s) вызвал /start", user_id, username)
 
     try:
-        exist = await check_user(user_id)
+        status = await get_registration_status(user_id, session=session)
     except Exception:
         logger.exception("Ошибка при проверке пользователя %s в БД", user_id)
         await message.answer("Произошла ошибка. Попробуйте позже.")
         return
 
-    if exist:
+    if status.registered:
         logger.info("Пользователь %s уже зарегистрирован", user_id)
 
-        # 1. Проверяем наличие группы
-        band_exists = False
+        # 1. Наличие группы берем из того же статуса регистрации
+        band_exists = status.has_band
+
+        # Число входящих лайков на кнопке (из кэша, без подсчета по таблице свайпов)
+        likes_text = "❤️ Лайки"
         try:
-            band_exists = await check_exist_band(user_id)
+            # Без счетчика меню все равно показываем — ошибка не должна прервать транзакцию апдейта
+            async with savepoint(session):
+                unread_likes = await count_unread_likes(user_id, session=session)
+            if unread_likes:
+                likes_text = f"❤️ Лайки ({unread_likes})"
         except Exception:
-            logger.exception("Ошибка при проверке группы пользователя %s в БД", user_id)
-            # В случае ошибки лучше считать, что группа есть, чтобы не предложить регистрацию повторно
-            band_exists = True
+            logger.exception("Ошибка при подсчете входящих лайков пользователя %s", user_id)
 
         kb = [
             [types.KeyboardButton(text="👤 Моя анкета")],
             [types.KeyboardButton(text="🔍 Смотреть анкеты")],
-            [types.KeyboardButton(text="❤️ Лайки")],
+            [types.KeyboardButton(text=likes_text)],
             [types.KeyboardButton(text="👥 Мои мэтчи")],
         ]
 
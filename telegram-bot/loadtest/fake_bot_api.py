@@ -0,0 +1,185 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных прогонов без настоящего Telegram.
+
+Бот подключается к ней через TELEGRAM_API_URL (см. main.py) и работает как обычно:
+забирает апдейты getUpdates и отвечает sendMessage/sendPhoto/sendAudio/answerCallbackQuery/...
+Заглушка отвечает правдоподобными объектами, а исходящие вызовы раскладывает по чатам —
+по ним сценарии (loadtest/scenarios.py) понимают, что бот ответил и какие кнопки показал.
+
+Отдельный запуск (например, чтобы проверить, что бот поднимается):
+
+    python -m loadtest.fake_bot_api --port 8081
+    TELEGRAM_API_URL=http://localhost:8081 BOT_TOKEN=1:fake python main.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Pivchiki", "username": "pivchiki_load_bot"}
+
+# Методы, которые в ответ возвращают отправленное или измененное сообщение
+MESSAGE_METHODS = {
+    "sendMessage", "sendPhoto", "sendAudio", "sendDocument", "sendVideo", "sendVoice", "sendAnimation",
+    "editMessageText", "editMessageCaption", "editMessageReplyMarkup", "editMessageMedia",
+}
+# Поля запроса, которые aiogram присылает в JSON-строке
+JSON_FIELDS = {"reply_markup", "entities", "caption_entities", "allowed_updates", "link_preview_options"}
+
+
+@dataclass
+class Outgoing:
+    """Вызов API, который бот сделал в адрес чата."""
+    method: str
+    params: dict
+    at: float
+    message: dict | None = None
+
+    @property
+    def inline_buttons(self) -> list[dict]:
+        markup = self.params.get("reply_markup") or {}
+        return [button for row in markup.get("inline_keyboard", []) for button in row]
+
+    @property
+    def reply_buttons(self) -> list[str]:
+        markup = self.params.get("reply_markup") or {}
+        return [
+            button["text"] if isinstance(button, dict) else button
+            for row in markup.get("keyboard", []) for button in row
+        ]
+
+
+@dataclass
+class _Chat:
+    outgoing: asyncio.Queue = field(default_factory=asyncio.Queue)
+    message_ids: itertools.count = field(default_factory=lambda: itertools.count(1))
+
+
+class FakeBotAPI:
+    def __init__(self):
+        self.updates: list[dict] = []
+        self._update_ids = itertools.count(1)
+        self._new_updates = asyncio.Condition()
+        self._chats: dict[int, _Chat] = {}
+        # callback_query_id -> chat_id: answerCallbackQuery не содержит chat_id
+        self._callbacks: dict[str, int] = {}
+        self.calls: dict[str, int] = {}
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner: web.AppRunner | None = None
+
+    def chat(self, chat_id: int) -> _Chat:
+        return self._chats.setdefault(chat_id, _Chat())
+
+    def prepare_update(self, update: dict) -> dict:
+        """Назначает update_id и запоминает чат нажатия — нужно и для getUpdates, и для вебхука."""
+        update["update_id"] = next(self._update_ids)
+        callback = update.get("callback_query")
+        if callback:
+            self._callbacks[callback["id"]] = callback["message"]["chat"]["id"]
+        return update
+
+    async def push_update(self, update: dict) -> None:
+        """Кладет апдейт в очередь getUpdates."""
+        self.prepare_update(update)
+        async with self._new_updates:
+            self.updates.append(update)
+            self._new_updates.notify_all()
+
+    async def _get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset", 0))
+        timeout = float(params.get("timeout", 0))
+        limit = int(params.get("limit", 100))
+
+        async with self._new_updates:
+            # Подтвержденные ботом апдейты больше не нужны
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+            if not self.updates and timeout:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait_for(lambda: self.updates), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return self.updates[:limit]
+
+    def _message(self, chat_id: int, params: dict) -> dict:
+        message_id = params.get("message_id")
+        message = {
+            "message_id": int(message_id) if message_id else next(self.chat(chat_id).message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        if params.get("reply_markup", {}).get("inline_keyboard"):
+            message["reply_markup"] = params["reply_markup"]
+        return message
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = {}
+        for key, value in (await request.post()).items():
+            if isinstance(value, web.FileField):
+                value = value.filename
+            elif key in JSON_FIELDS:
+                value = json.loads(value)
+            params[key] = value
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == "getUpdates":
+            result: Any = await self._get_updates(params)
+        elif method == "getMe":
+            result = BOT_USER
+        elif method in MESSAGE_METHODS and "chat_id" in params:
+            chat_id = int(params["chat_id"])
+            result = self._message(chat_id, params)
+            self.chat(chat_id).outgoing.put_nowait(Outgoing(method, params, time.perf_counter(), result))
+        elif method == "answerCallbackQuery":
+            chat_id = self._callbacks.pop(params.get("callback_query_id"), None)
+            if chat_id is not None:
+                self.chat(chat_id).outgoing.put_nowait(Outgoing(method, params, time.perf_counter()))
+            result = True
+        else:
+            # deleteWebhook, sendChatAction, deleteMessage и прочее — достаточно подтверждения
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self, host: str, port: int) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("Заглушка Bot API слушает %s:%s", host, port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def main(args: argparse.Namespace) -> None:
+    api = FakeBotAPI()
+    await api.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""
+Нагрузочный прогон вебхука: отправляет записанные апдейты POST-запросами, как это делает Telegram.
+
+Запуск из каталога telegram-bot при запущенном боте с BOT_MODE=webhook и WEBHOOK_SET_ON_STARTUP=0:
+
+    python -m loadtest.replay_updates updates.jsonl --url http://localhost:8000/telegram/webhook \\
+        --secret $WEBHOOK_SECRET --concurrency 50 --repeat 10
+
+Файл — по одному апдейту Telegram (JSON) на строку; update_id переписываются, чтобы не повторяться.
+--spread-users раздает повторам разные user_id/chat_id: иначе все запросы упрутся
+в блокировку FSM одного чата, а не в пропускную способность бота.
+"""
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import math
+import time
+
+import aiohttp
+
+
+def _load(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _shift_user(update: dict, offset: int) -> dict:
+    """Сдвигает id пользователя и чата во всех объектах апдейта на offset."""
+    update = copy.deepcopy(update)
+    stack = [update]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key in ("from", "chat", "user"):
+                if isinstance(node.get(key), dict) and "id" in node[key]:
+                    node[key]["id"] += offset
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return update
+
+
+def _expand(updates: list[dict], repeat: int, spread_users: bool) -> list[dict]:
+    result = []
+    update_ids = itertools.count(1)
+    for round_no in range(repeat):
+        for update in updates:
+            update = _shift_user(update, round_no * 10**9) if spread_users and round_no else copy.deepcopy(update)
+            update["update_id"] = next(update_ids)
+            result.append(update)
+    return result
+
+
+def percentile(values: list[float], q: int) -> float:
+    """Перцентиль по ближайшему рангу — всегда одно из измеренных значений."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+async def _send(session: aiohttp.ClientSession, url: str, headers: dict, update: dict,
+                latencies: list[float], statuses: dict) -> None:
+    started = time.perf_counter()
+    try:
+        async with session.post(url, json=update, headers=headers) as response:
+            await response.read()
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+    except aiohttp.ClientError as e:
+        statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+    latencies.append(time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    updates = _expand(_load(args.file), args.repeat, args.spread_users)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+    latencies: list[float] = []
+    statuses: dict = {}
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def worker(update: dict) -> None:
+        async with slots:
+            await _send(session, args.url, headers, update, latencies, statuses)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(update) for update in updates))
+    elapsed = time.perf_counter() - started
+
+    print(f"Апдейтов: {len(updates)}, за {elapsed:.2f} с, {len(updates) / elapsed:.1f} апд/с")
+    print(f"Ответы: {statuses}")
+    if latencies:
+        print(
+            "Время ответа, мс: "
+            f"p50={percentile(latencies, 50) * 1000:.1f} "
+            f"p95={percentile(latencies, 95) * 1000:.1f} "
+            f"p99={percentile(latencies, 99) * 1000:.1f} "
+            f"max={max(latencies) * 1000:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="JSONL с апдейтами Telegram")
+    parser.add_argument("--url", default="http://localhost:8000/telegram/webhook", help="адрес вебхука бота")
+    parser.add_argument("--secret", default="", help="значение WEBHOOK_SECRET бота")
+    parser.add_argument("--concurrency", type=int, default=20, help="сколько запросов держать одновременно")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз прогнать файл")
+    parser.add_argument("--spread-users", action="store_true", help="разные пользователи в каждом повторе")
+
+    asyncio.run(main(parser.parse_args()))
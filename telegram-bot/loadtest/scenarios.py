@@ -0,0 +1,339 @@
+"""
+Сквозной нагрузочный прогон: тысячи виртуальных пользователей проходят сценарии бота
+(регистрация, просмотр анкет, входящие лайки, мэтчи) через локальную заглушку Bot API.
+
+Порядок запуска из каталога telegram-bot:
+
+    # 1. Данные: зарегистрированные пользователи для просмотра, лайков и мэтчей
+    python -m benchmarks.seed_large --users 100000 --truncate
+    # 2. Драйвер поднимает заглушку Bot API и ждет, пока бот начнет забирать апдейты
+    python -m loadtest.scenarios --users 2000 --ramp 30 --mix registration=1,browse=6,likes=2,matches=1
+    # 3. Бот — против заглушки и без лимитов Telegram, иначе замеряется rate limiter
+    TELEGRAM_API_URL=http://localhost:8081 BOT_TOKEN=1:fake TG_GLOBAL_RATE=100000 TG_GLOBAL_BURST=100000 \\
+        TG_CHAT_RATE=1000 TG_CHAT_BURST=1000 APP_EXTERNAL_URL=https://example.org python main.py
+
+С --webhook-url апдейты отправляются POST-запросами в вебхук бота (BOT_MODE=webhook,
+WEBHOOK_SET_ON_STARTUP=0), ответы бота все так же приходят в заглушку.
+
+Время шага — от отправки апдейта до первого ответа бота в этот чат (сообщение, правка или
+ответ на нажатие). Следующий шаг начинается, когда чат затих на --settle секунд: хендлер
+успевает дописать ответ и сменить состояние FSM. Число запросов к БД берется из метрик бота
+(app_db_query_duration_seconds) до и после прогона.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections import defaultdict
+
+import aiohttp
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.seed_large import ID_OFFSET
+from loadtest.fake_bot_api import FakeBotAPI, Outgoing
+from loadtest.replay_updates import percentile
+
+# Кнопки «Свой вариант» ведут к вводу текста — сценарии выбирают из готовых вариантов
+CUSTOM_CHOICES = ("Свой вариант", "custom")
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.scenarios: dict[str, int] = defaultdict(int)
+        self.failed_scenarios: dict[str, int] = defaultdict(int)
+        self.updates = 0
+
+
+class VirtualUser:
+    def __init__(self, api: FakeBotAPI, user_id: int, args: argparse.Namespace, stats: Stats,
+                 http: aiohttp.ClientSession, rng: random.Random):
+        self.api = api
+        self.user_id = user_id
+        self.args = args
+        self.stats = stats
+        self.http = http
+        self.rng = rng
+        self.profile = {"id": user_id, "is_bot": False, "first_name": f"Load {user_id}", "username": f"load_{user_id}"}
+        self.chat = api.chat(user_id)
+        self.message_ids = itertools.count(1)
+        self.callback_ids = itertools.count(1)
+        # Последнее сообщение бота с inline-кнопками и текущая reply-клавиатура
+        self.inline: Outgoing | None = None
+        self.reply_buttons: list[str] = []
+
+    def _remember(self, outgoing: Outgoing) -> None:
+        markup = outgoing.params.get("reply_markup") or {}
+        if "inline_keyboard" in markup:
+            self.inline = outgoing
+        elif "keyboard" in markup:
+            self.reply_buttons = outgoing.reply_buttons
+        elif markup.get("remove_keyboard"):
+            self.reply_buttons = []
+
+    async def _deliver(self, step: str, update: dict) -> None:
+        # Хвост ответов предыдущего шага, пришедший после паузы, относится к нему
+        while not self.chat.outgoing.empty():
+            self._remember(self.chat.outgoing.get_nowait())
+
+        started = time.perf_counter()
+        if self.args.webhook_url:
+            self.api.prepare_update(update)
+            async with self.http.post(self.args.webhook_url, json=update, headers=self.args.webhook_headers) as r:
+                await r.read()
+        else:
+            await self.api.push_update(update)
+        self.stats.updates += 1
+
+        try:
+            outgoing = await asyncio.wait_for(self.chat.outgoing.get(), self.args.timeout)
+        except asyncio.TimeoutError:
+            self.stats.errors[step] += 1
+            raise StepFailed(f"{step}: нет ответа за {self.args.timeout} с")
+        self.stats.latencies[step].append(outgoing.at - started)
+        self._remember(outgoing)
+
+        while True:
+            try:
+                self._remember(await asyncio.wait_for(self.chat.outgoing.get(), self.args.settle))
+            except asyncio.TimeoutError:
+                break
+
+        if self.args.think:
+            await asyncio.sleep(self.rng.uniform(0, self.args.think))
+
+    async def send_text(self, step: str, text: str) -> None:
+        await self._deliver(step, {"message": {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": self.profile,
+            "text": text,
+        }})
+
+    async def press_reply(self, step: str, prefix: str) -> None:
+        """Нажатие reply-кнопки — это обычное сообщение с ее текстом (у «❤️ Лайки» бывает счетчик)."""
+        text = next((b for b in self.reply_buttons if b.startswith(prefix)), prefix)
+        await self.send_text(step, text)
+
+    def has_reply(self, prefix: str) -> bool:
+        return any(b.startswith(prefix) for b in self.reply_buttons)
+
+    def find_buttons(self, prefix: str) -> list[str]:
+        if self.inline is None:
+            return []
+        return [
+            b["callback_data"] for b in self.inline.inline_buttons
+            if b.get("callback_data", "").startswith(prefix)
+            and not any(custom in b["callback_data"] for custom in CUSTOM_CHOICES)
+        ]
+
+    async def click(self, step: str, data: str) -> None:
+        await self._deliver(step, {"callback_query": {
+            "id": f"{self.user_id}:{next(self.callback_ids)}",
+            "from": self.profile,
+            "chat_instance": str(self.user_id),
+            "message": self.inline.message,
+            "data": data,
+        }})
+
+    async def press(self, step: str, prefix: str, count: int = 1) -> None:
+        """Нажимает count разных inline-кнопок с callback_data, начинающимся с prefix."""
+        buttons = self.find_buttons(prefix)
+        if not buttons:
+            self.stats.errors[step] += 1
+            raise StepFailed(f"{step}: нет кнопки {prefix!r}")
+
+        for data in self.rng.sample(buttons, min(count, len(buttons))):
+            await self.click(step, data)
+
+
+async def registration(user: VirtualUser) -> None:
+    await user.send_text("start", "/start")
+    await user.press("registration.start", "start_registration")
+    await user.send_text("registration.name", f"Нагрузка {user.user_id}")
+    await user.press("registration.city", "city_")
+    await user.press("registration.city_confirm", "right")
+    await user.press("registration.instrument", "inst_", count=user.rng.randint(1, 2))
+    await user.press("registration.instruments_done", "done")
+    await user.press("registration.rating_open", "select_inst:")
+    await user.press("registration.rating", "practice_")
+    await user.press("registration.rating_done", "done_rating")
+    await user.press("registration.genre", "genre_", count=user.rng.randint(1, 3))
+    await user.press("registration.genres_done", "done")
+    await user.send_text("registration.contacts", f"@load_{user.user_id}")
+
+
+async def _swipe(user: VirtualUser, prefix: str, count: int) -> None:
+    for _ in range(count):
+        if not user.has_reply("Следующая анкета"):
+            return
+        if user.rng.random() < user.args.like_share:
+            await user.press_reply(f"{prefix}.like", "❤️ Оценить анкету")
+        await user.press_reply(f"{prefix}.next", "Следующая анкета")
+    await user.press_reply(f"{prefix}.exit", "Вернуться на главную")
+
+
+async def browse(user: VirtualUser) -> None:
+    await user.send_text("start", "/start")
+    await user.press_reply("browse.open", "🔍 Смотреть анкеты")
+    await user.press("browse.choose", "chs_artist")
+    await _swipe(user, "browse", user.args.swipes)
+
+
+async def likes(user: VirtualUser) -> None:
+    await user.send_text("start", "/start")
+    await user.press_reply("likes.open", "❤️ Лайки")
+    await _swipe(user, "likes", max(user.args.swipes // 3, 1))
+
+
+async def matches(user: VirtualUser) -> None:
+    await user.send_text("start", "/start")
+    await user.press_reply("matches.open", "👥 Мои мэтчи")
+    if user.find_buttons("match:next"):
+        await user.press("matches.next_page", "match:next")
+    if user.find_buttons("match:open"):
+        await user.press("matches.card", "match:open")
+
+
+SCENARIOS = {
+    "registration": registration,
+    "browse": browse,
+    "likes": likes,
+    "matches": matches,
+}
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"неизвестный сценарий {name!r}, есть: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _scrape(http: aiohttp.ClientSession, url: str | None) -> dict[str, float]:
+    """Число SQL-выражений по функциям database.queries из метрик бота."""
+    if not url:
+        return {}
+    async with http.get(url) as response:
+        text = await response.text()
+
+    counts: dict[str, float] = defaultdict(float)
+    for family in text_string_to_metric_families(text):
+        if family.name != "app_db_query_duration_seconds":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_count"):
+                counts[sample.labels["query"]] += sample.value
+    return counts
+
+
+def _report(stats: Stats, elapsed: float, queries_before: dict, queries_after: dict) -> None:
+    print(f"\nАпдейтов: {stats.updates} за {elapsed:.1f} с, {stats.updates / elapsed:.1f} апд/с")
+    print("Сценарии: " + ", ".join(
+        f"{name} {done} ок / {stats.failed_scenarios[name]} с ошибкой" for name, done in sorted(stats.scenarios.items())
+    ))
+
+    print(f"\n{'шаг':<34}{'кол-во':>8}{'ошибок':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (мс)")
+    for step in sorted(set(stats.latencies) | set(stats.errors)):
+        values = stats.latencies.get(step, [])
+        timings = [percentile(values, q) * 1000 for q in (50, 95, 99)] + [max(values) * 1000] if values else []
+        print(f"{step:<34}{len(values):>8}{stats.errors.get(step, 0):>8}" + "".join(f"{t:>9.1f}" for t in timings))
+
+    if queries_after:
+        delta = {q: queries_after[q] - queries_before.get(q, 0) for q in queries_after}
+        total = sum(delta.values())
+        print(f"\nSQL-выражений: {total:.0f}, на апдейт: {total / max(stats.updates, 1):.2f}")
+        for query, count in sorted(delta.items(), key=lambda item: -item[1])[:15]:
+            if count:
+                print(f"  {query:<40}{count:>10.0f}")
+
+
+async def _run_user(api: FakeBotAPI, user_id: int, scenario: str, args: argparse.Namespace,
+                    stats: Stats, http: aiohttp.ClientSession, delay: float) -> None:
+    await asyncio.sleep(delay)
+    user = VirtualUser(api, user_id, args, stats, http, random.Random(f"{args.seed}:{user_id}"))
+    for _ in range(args.iterations):
+        try:
+            await SCENARIOS[scenario](user)
+            stats.scenarios[scenario] += 1
+        except StepFailed as e:
+            stats.failed_scenarios[scenario] += 1
+            if args.verbose:
+                print(f"Пользователь {user_id} ({scenario}): {e}")
+            return
+
+
+async def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    names, weights = zip(*args.mix.items())
+    args.webhook_headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+
+    api = FakeBotAPI()
+    await api.start(args.api_host, args.api_port)
+    try:
+        async with aiohttp.ClientSession() as http:
+            if not args.webhook_url:
+                print(f"Жду бота: TELEGRAM_API_URL=http://{args.api_host}:{args.api_port}")
+                while not api.calls.get("getUpdates"):
+                    await asyncio.sleep(0.5)
+
+            queries_before = await _scrape(http, args.metrics_url)
+            registered = itertools.count(args.registered_start)
+            new_users = itertools.count(args.new_user_start)
+
+            stats = Stats()
+            tasks = []
+            for index in range(args.users):
+                scenario = rng.choices(names, weights)[0]
+                user_id = next(new_users) if scenario == "registration" else next(registered)
+                delay = args.ramp * index / args.users
+                tasks.append(_run_user(api, user_id, scenario, args, stats, http, delay))
+
+            started = time.perf_counter()
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+            # Счетчики метрик бота обновляются после ответа — даем хендлерам завершиться
+            await asyncio.sleep(args.settle * 2)
+            queries_after = await _scrape(http, args.metrics_url)
+    finally:
+        await api.stop()
+
+    _report(stats, elapsed, queries_before, queries_after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500, help="сколько виртуальных пользователей")
+    parser.add_argument("--ramp", type=float, default=10, help="за сколько секунд запустить всех пользователей")
+    parser.add_argument("--iterations", type=int, default=1, help="сколько раз каждый проходит свой сценарий")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("registration=1,browse=6,likes=2,matches=1"),
+                        help="доли сценариев: имя=вес через запятую")
+    parser.add_argument("--swipes", type=int, default=10, help="сколько анкет пролистать при просмотре")
+    parser.add_argument("--like-share", type=float, default=0.3, help="доля анкет, которым ставится лайк")
+    parser.add_argument("--think", type=float, default=0.5, help="пауза пользователя между шагами, до N секунд")
+    parser.add_argument("--settle", type=float, default=0.1, help="тишина в чате, после которой шаг завершен")
+    parser.add_argument("--timeout", type=float, default=30, help="сколько ждать ответа бота на шаг")
+    parser.add_argument("--registered-start", type=int, default=ID_OFFSET,
+                        help="первый id зарегистрированного пользователя (по умолчанию — из seed_large)")
+    parser.add_argument("--new-user-start", type=int, default=9 * 10 ** 11 + int(time.time()) % 10 ** 6 * 1000,
+                        help="первый id для регистрации; по умолчанию свой на каждый прогон")
+    parser.add_argument("--api-host", default="127.0.0.1")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--webhook-url", default="", help="слать апдейты в вебхук бота вместо getUpdates")
+    parser.add_argument("--secret", default="", help="значение WEBHOOK_SECRET бота")
+    parser.add_argument("--metrics-url", default="http://localhost:8000/metrics", help="метрики бота; пусто — без SQL")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="печатать причины прерванных сценариев")
+
+    asyncio.run(main(parser.parse_args()))
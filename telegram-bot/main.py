@@ -3,7 +3,7 @@ import os
 from dotenv import load_dotenv
 from asyncio import run
 from aiogram import Bot, Dispatcher
-from handlers import start
+from handlers import start, card_delivery
 from handlers.band.band_profile import edit_band_profile
 from handlers.band.band_registration import band_registration
 from handlers.likes import likes
@@ -11,12 +11,20 @@ from handlers.match import match
 from handlers.profile import profile
 from handlers.registration import registration
 from database.session import init_db
+from database.cache_bus import cache_bus
+from database.queries import load_filter_index, filter_index_sync, swipe_buffer, analytics_pipeline
+from utils.db_session import CommitBeforeTelegramRequest, DbSessionMiddleware
+from utils.handler_metrics import setup_handler_metrics
+from utils.fsm_storage import create_fsm_storage
+from utils.rate_limiter import TelegramRateLimiter
+from utils.webhook import MAX_UPDATE_WORKERS, run_webhook
 from handlers.show_profiles import show_profiles
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from prometheus_client import start_http_server
 
-start_http_server(8000, addr="0.0.0.0")
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
@@ -28,14 +36,31 @@ if os.path.exists(dotenv_path):
     load_dotenv(dotenv_path)
 
 TOKEN = os.getenv("BOT_TOKEN")
+# Как получаем апдейты: polling — long polling, webhook — aiohttp-сервер (см. utils/webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Адрес Bot API; для нагрузочных прогонов — локальная заглушка (loadtest/fake_bot_api.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
 
 
-bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher()
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+# Перед запросом к Telegram транзакция апдейта коммитится — соединение с БД не ждет сеть и лимиты.
+# Подключается первым, чтобы коммит был до ожидания в TelegramRateLimiter
+bot.session.middleware(CommitBeforeTelegramRequest())
+# Все исходящие запросы к Telegram идут через лимиты частоты и повтор после RetryAfter
+bot.session.middleware(TelegramRateLimiter())
+# Состояние FSM в Redis позволяет запускать несколько реплик бота (FSM_STORAGE=redis)
+storage, events_isolation = create_fsm_storage()
+dp = Dispatcher(storage=storage, events_isolation=events_isolation)
 
 async def main():
     await init_db()
+    await load_filter_index()
     # dp.update.outer_middleware(AnalyticsMiddleware())
+    # Время и ошибки по хендлерам; подключается первым, чтобы учитывать и работу остальных middleware
+    setup_handler_metrics(dp)
+    # Одна сессия БД на апдейт вместо сессии на каждый запрос
+    dp.update.outer_middleware(DbSessionMiddleware())
     dp.include_router(registration.router)
     dp.include_router(profile.router)
     dp.include_router(band_registration.router)
@@ -44,7 +69,29 @@ async def main():
     dp.include_router(show_profiles.router)
     dp.include_router(likes.router)
     dp.include_router(match.router)
-    await dp.start_polling(bot)
+    dp.include_router(card_delivery.router)
+
+    # Свайпы пишутся в БД пачками — при остановке дописываем остаток буфера
+    dp.startup.register(swipe_buffer.start)
+    dp.shutdown.register(swipe_buffer.stop)
+    # Аналитика пишется в фоне — при остановке дописываем очередь событий
+    dp.startup.register(analytics_pipeline.start)
+    dp.shutdown.register(analytics_pipeline.stop)
+    # Индекс фильтров в памяти периодически подтягивает изменения анкет с других реплик
+    dp.startup.register(filter_index_sync.start)
+    dp.shutdown.register(filter_index_sync.stop)
+    # Кэши в памяти (статусы регистрации, просмотренные анкеты, счетчики лайков) согласуются между репликами
+    dp.startup.register(cache_bus.start)
+    dp.shutdown.register(cache_bus.stop)
+
+    if BOT_MODE == "webhook":
+        # /metrics отдается тем же aiohttp-сервером
+        await run_webhook(dp, bot)
+    else:
+        start_http_server(8000, addr="0.0.0.0")
+        # Вебхук, оставшийся от webhook-режима, не дает получать апдейты поллингом
+        await bot.delete_webhook()
+        await dp.start_polling(bot, tasks_concurrency_limit=MAX_UPDATE_WORKERS)
 
 import asyncio
 # from utils.analytics import track_event, AnalyticsMiddleware  # Импортируй свою функцию
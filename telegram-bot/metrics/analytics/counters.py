@@ -0,0 +1,14 @@
+from prometheus_client import Counter
+
+# Кол-во записанных аналитических событий
+analytics_events_written = Counter(
+    "app_analytics_events_written_total",
+    "Количество аналитических событий, записанных в БД"
+)
+
+# Кол-во потерянных аналитических событий
+analytics_events_dropped = Counter(
+    "app_analytics_events_dropped_total",
+    "Количество отброшенных аналитических событий",
+    ["reason"]  # queue_full / write_error
+)
@@ -0,0 +1,14 @@
+from prometheus_client import Counter
+
+# Кол-во таймаутов ожидания соединения из пула
+db_pool_checkout_timeouts = Counter(
+    "app_db_pool_checkout_timeouts_total",
+    "Количество таймаутов ожидания соединения с БД из пула"
+)
+
+# Кол-во запросов к БД дольше DB_SLOW_QUERY_MS
+db_slow_queries = Counter(
+    "app_db_slow_queries_total",
+    "Количество медленных запросов к БД",
+    ["query"]  # функция из database.queries
+)
@@ -0,0 +1,25 @@
+from prometheus_client import Gauge
+
+# Размер пула соединений (постоянные соединения)
+db_pool_size = Gauge(
+    "app_db_pool_size",
+    "Настроенный размер пула соединений с БД"
+)
+
+# Кол-во выданных из пула соединений
+db_pool_checked_out = Gauge(
+    "app_db_pool_checked_out",
+    "Количество соединений с БД, выданных из пула"
+)
+
+# Кол-во свободных соединений в пуле
+db_pool_checked_in = Gauge(
+    "app_db_pool_checked_in",
+    "Количество свободных соединений с БД в пуле"
+)
+
+# Кол-во соединений сверх pool_size (отрицательное, пока пул не заполнен)
+db_pool_overflow = Gauge(
+    "app_db_pool_overflow",
+    "Текущее переполнение пула соединений с БД"
+)
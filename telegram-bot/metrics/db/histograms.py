@@ -0,0 +1,16 @@
+from prometheus_client import Histogram
+
+# Время ожидания соединения из пула
+db_pool_checkout_wait = Histogram(
+    "app_db_pool_checkout_wait_seconds",
+    "Время ожидания соединения с БД из пула",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# Время выполнения SQL-выражения
+db_query_duration = Histogram(
+    "app_db_query_duration_seconds",
+    "Время выполнения SQL-выражения",
+    ["query", "operation"],  # query: функция из database.queries, operation: SELECT / INSERT / ...
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
@@ -0,0 +1,15 @@
+from prometheus_client import Counter
+
+# Кол-во апдейтов по типу (message, callback_query, ...)
+updates_received = Counter(
+    "app_updates_total",
+    "Количество полученных апдейтов",
+    ["type", "status"]  # status: handled / unhandled (хендлер не нашелся) / error
+)
+
+# Кол-во исключений, вылетевших из хендлеров
+handler_errors = Counter(
+    "app_handler_errors_total",
+    "Количество необработанных исключений в хендлерах",
+    ["handler", "error"]  # handler: модуль.функция, error: класс исключения
+)
@@ -0,0 +1,7 @@
+from prometheus_client import Gauge
+
+# Кол-во апдейтов, которые обрабатываются в данный момент
+updates_in_progress = Gauge(
+    "app_updates_in_progress",
+    "Количество апдейтов, обрабатываемых в данный момент"
+)
@@ -0,0 +1,17 @@
+from prometheus_client import Histogram
+
+# Время работы хендлера (вместе с запросами в БД и к Telegram API)
+handler_duration = Histogram(
+    "app_handler_duration_seconds",
+    "Время выполнения хендлера",
+    ["handler"],  # модуль.функция, например show_profiles.like
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# Полное время обработки апдейта, включая фильтры и middleware
+update_duration = Histogram(
+    "app_update_duration_seconds",
+    "Время обработки апдейта",
+    ["type"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
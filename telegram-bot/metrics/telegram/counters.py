@@ -0,0 +1,15 @@
+from prometheus_client import Counter
+
+# Кол-во запросов к Telegram API, задержанных ограничителем частоты
+telegram_api_throttled = Counter(
+    "app_telegram_api_throttled_total",
+    "Количество запросов к Telegram API, задержанных ограничителем частоты",
+    ["scope"]  # global / chat
+)
+
+# Кол-во ответов 429 (Flood control) от Telegram
+telegram_api_retry_after = Counter(
+    "app_telegram_api_retry_after_total",
+    "Количество ответов Telegram с требованием подождать (RetryAfter)",
+    ["method"]
+)
@@ -0,0 +1,7 @@
+from prometheus_client import Gauge
+
+# Кол-во запросов к Telegram API, ждущих своей очереди в лимитере
+telegram_api_queue_depth = Gauge(
+    "app_telegram_api_queue_depth",
+    "Количество запросов к Telegram API, ожидающих в ограничителе частоты"
+)
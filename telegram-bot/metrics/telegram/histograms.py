@@ -0,0 +1,8 @@
+from prometheus_client import Histogram
+
+# Сколько запрос к Telegram API ждал в ограничителе частоты (включая паузы RetryAfter)
+telegram_api_throttle_wait = Histogram(
+    "app_telegram_api_throttle_wait_seconds",
+    "Время ожидания запроса к Telegram API в ограничителе частоты",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
@@ -0,0 +1,7 @@
+from prometheus_client import Counter
+
+# Кол-во запросов на вебхук с неверным секретным токеном
+webhook_unauthorized = Counter(
+    "app_webhook_unauthorized_total",
+    "Количество запросов на вебхук с неверным секретным токеном"
+)
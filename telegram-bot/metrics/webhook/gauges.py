@@ -0,0 +1,7 @@
+from prometheus_client import Gauge
+
+# Кол-во апдейтов, которые сейчас обрабатываются воркерами вебхука
+webhook_updates_in_progress = Gauge(
+    "app_webhook_updates_in_progress",
+    "Количество апдейтов из вебхука, обрабатываемых в данный момент"
+)
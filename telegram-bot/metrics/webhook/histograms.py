@@ -0,0 +1,8 @@
+from prometheus_client import Histogram
+
+# Время ожидания свободного воркера для апдейта из вебхука
+webhook_worker_wait = Histogram(
+    "app_webhook_worker_wait_seconds",
+    "Время ожидания свободного воркера для апдейта из вебхука",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
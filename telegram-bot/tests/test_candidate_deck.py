@@ -0,0 +1,87 @@
+import asyncio
+
+from database.candidate_deck import CandidateDeck, filters_fingerprint
+
+
+def _loader(pool, calls):
+    async def load(swiper_id, filters, exclude, limit):
+        calls.append(set(exclude))
+        return [target_id for target_id in pool if target_id not in exclude][:limit]
+    return load
+
+
+async def _settle():
+    """Дает фоновой догрузке колоды отработать."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def test_refill_starts_only_below_low_watermark():
+    calls = []
+    deck = CandidateDeck(_loader(range(1, 101), calls), size=10, low_watermark=3)
+
+    issued = [await deck.pop(1) for _ in range(7)]
+    await _settle()
+    assert issued == list(range(1, 8))
+    # В колоде осталось 3 — порог еще не пройден
+    assert len(calls) == 1
+
+    assert await deck.pop(1) == 8
+    await _settle()
+    assert len(calls) == 2
+    # Догрузка исключает то, что уже в колоде, и последние выданные (их SKIP еще не записан);
+    # остальное исключит индекс просмотренных в настоящем загрузчике
+    assert calls[1] == {9, 10, 4, 5, 6, 7, 8}
+
+    # Догруженное встает за остатком колоды без повторов
+    assert [await deck.pop(1) for _ in range(12)] == [9, 10, 1, 2, 3, 11, 12, 13, 14, 15, 16, 17]
+
+
+async def test_drained_deck_stops_loading_and_runs_out():
+    calls = []
+    deck = CandidateDeck(_loader([1, 2, 3], calls), size=10, low_watermark=5)
+
+    assert [await deck.pop(1) for _ in range(3)] == [1, 2, 3]
+    await _settle()
+    assert await deck.pop(1) is None
+    # Первая выборка вернула меньше size — догрузка не запускалась
+    assert len(calls) == 1
+
+
+async def test_empty_deck_waits_for_refill_in_progress():
+    calls = []
+    deck = CandidateDeck(_loader(range(1, 101), calls), size=2, low_watermark=1)
+
+    assert [await deck.pop(1) for _ in range(2)] == [1, 2]
+    # Колода пуста, а догрузка еще не отработала — выдача дожидается ее, а не отвечает None
+    assert await deck.pop(1) == 3
+
+
+async def test_changed_filters_rebuild_deck():
+    calls = []
+    deck = CandidateDeck(_loader(range(1, 50), calls), size=10, low_watermark=3)
+
+    await deck.pop(1, {"genres": ["Рок"]})
+    await deck.pop(1, {"genres": ["Рок"], "cities": []})
+    assert len(calls) == 1
+
+    await deck.pop(1, {"genres": ["Джаз"]})
+    assert len(calls) == 2
+    # Последние выданные id не возвращаются в пересобранную колоду
+    assert {1, 2} <= calls[1]
+
+
+async def test_invalidate_rebuilds_on_next_pop():
+    calls = []
+    deck = CandidateDeck(_loader(range(1, 50), calls), size=10, low_watermark=3)
+
+    await deck.pop(1)
+    deck.invalidate(1)
+    await deck.pop(1)
+    assert len(calls) == 2
+
+
+def test_filters_fingerprint_ignores_order_and_empty_values():
+    assert filters_fingerprint(None) == filters_fingerprint({}) == ""
+    assert filters_fingerprint({"genres": ["Рок", "Джаз"], "age_mode": "all"}) == \
+        filters_fingerprint({"genres": ["Джаз", "Рок"], "cities": []})
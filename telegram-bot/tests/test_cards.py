@@ -0,0 +1,70 @@
+from database import queries
+from database.cards import user_cards
+from database.models import User
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def tuples(self):
+        return self
+
+    def unique(self):
+        return self
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _Session:
+    """Отвечает на два запроса get_user_card: версии анкет и полные анкеты промахов кэша."""
+
+    def __init__(self, users):
+        self.users = users
+        self.full_loads = []
+        self.info = {}
+        self.new = self.dirty = self.deleted = ()
+
+    def get_nested_transaction(self):
+        return None
+
+    async def execute(self, stmt):
+        if stmt.column_descriptions[0]["name"] == "User":
+            self.full_loads.append(sorted(self.users))
+            return _Result(list(self.users.values()))
+        return _Result([(user.id, user.version) for user in self.users.values()])
+
+
+def _user(user_id: int, version: int, name: str) -> User:
+    return User(id=user_id, version=version, name=name, genres=[], instruments=[])
+
+
+async def test_card_is_reused_until_profile_version_changes():
+    user_cards.clear()
+    session = _Session({1: _user(1, 1, "Вася")})
+
+    first = await queries.get_user_card(1, session)
+    cached = await queries.get_user_card(1, session)
+    assert first["name"] == cached["name"] == "Вася"
+    assert len(session.full_loads) == 1
+
+    # Правка анкеты поднимает версию — старая карточка больше не подходит
+    session.users[1] = _user(1, 2, "Василий")
+    updated = await queries.get_user_card(1, session)
+    assert updated["name"] == "Василий"
+    assert updated["version"] == 2
+    assert len(session.full_loads) == 2
+
+
+async def test_card_is_not_cached_before_commit():
+    user_cards.clear()
+    session = _Session({1: _user(1, 1, "Вася")})
+    # В транзакции есть незаписанные изменения — кэш заполнится только после коммита
+    session.new = (object(),)
+
+    await queries.get_user_card(1, session)
+    assert user_cards.get((1, 1)) is None
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from database.city_registry import CITY_TYPO_CUTOFF, CityRegistry, haversine_km, normalize_city, split_cities
+
+
+class _Rows(list):
+    def all(self):
+        return self
+
+
+class _Session:
+    """Отвечает на два запроса загрузки справочника: города и их написания."""
+
+    def __init__(self, aliases: dict):
+        self.aliases = aliases
+
+    async def execute(self, stmt):
+        if stmt.column_descriptions[0]["name"] == "alias":
+            return _Rows(self.aliases.items())
+        return _Rows(
+            SimpleNamespace(id=city_id, name=alias, latitude=None, longitude=None)
+            for alias, city_id in self.aliases.items()
+        )
+
+
+def _registry(aliases: dict) -> CityRegistry:
+    registry = CityRegistry()
+    asyncio.run(registry.load(_Session(aliases)))
+    return registry
+
+
+@pytest.mark.parametrize("city", ["Челябинск", " челябинск ", "г. Челябинск", "город Челябинск", "г Челябинск"])
+def test_spellings_share_one_key(city):
+    assert normalize_city(city) == "челябинск"
+
+
+def test_normalize_replaces_yo_and_separators():
+    assert normalize_city("Верхний  Уфалей") == normalize_city("верхний-уфалей") == "верхний уфалей"
+    assert normalize_city("Королёв") == "королев"
+    assert normalize_city(None) == ""
+
+
+def test_split_cities_skips_empty_parts():
+    assert split_cities("Челябинск, Миасс,, ") == ["Челябинск", "Миасс"]
+    assert split_cities(None) == []
+
+
+def test_typo_matches_at_default_cutoff():
+    assert CITY_TYPO_CUTOFF == 0.85
+    registry = _registry({"копейск": 2, "челябинск": 1})
+
+    # Похожесть 12/14 ≈ 0.857 — выше границы
+    assert registry.lookup("Копейсе") == 2
+    assert registry.lookup("Челябинс") == 1
+    # Похожесть 10/14 ≈ 0.714 — другой город, а не опечатка
+    assert registry.lookup("Капейсе") is None
+    assert registry.lookup("") is None
+
+
+def test_lookup_ids_keeps_order_and_drops_unknown():
+    registry = _registry({"копейск": 2, "челябинск": 1})
+
+    assert registry.lookup_ids(["Копейск", "Москва", "г. Челябинск", "копейск"]) == [2, 1]
+
+
+def test_unloaded_registry_refuses_lookups():
+    with pytest.raises(RuntimeError):
+        CityRegistry().lookup_ids(["Челябинск"])
+
+
+def test_distance_between_chelyabinsk_and_miass():
+    assert haversine_km((55.1644, 61.4368), (55.0450, 60.1083)) == pytest.approx(85, abs=3)
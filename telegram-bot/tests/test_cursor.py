@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+
+from handlers.match.match import MatchesCB, _cursor
+from utils.cursor import decode_ts, encode_ts
+
+
+def test_round_trip_keeps_microseconds():
+    value = datetime(2026, 10, 17, 21, 4, 5, 123456, tzinfo=timezone.utc)
+    encoded = encode_ts(value)
+
+    assert isinstance(encoded, int)
+    assert decode_ts(encoded) == value
+
+
+def test_other_timezone_decodes_to_the_same_instant():
+    value = datetime(2026, 10, 18, 2, 4, 5, 1, tzinfo=timezone(timedelta(hours=5)))
+
+    assert decode_ts(encode_ts(value)) == value
+    assert decode_ts(encode_ts(value)).tzinfo == timezone.utc
+
+
+def test_encoding_preserves_order():
+    earlier = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    later = earlier + timedelta(microseconds=1)
+
+    assert encode_ts(later) - encode_ts(earlier) == 1
+
+
+def test_match_callback_cursor_round_trip():
+    created_at = datetime(2026, 10, 17, 21, 4, 5, 999999, tzinfo=timezone.utc)
+    packed = MatchesCB(action="next", user_id=987654321012, ts=encode_ts(created_at)).pack()
+
+    # Telegram ограничивает callback_data 64 байтами
+    assert len(packed.encode()) <= 64
+    assert _cursor(MatchesCB.unpack(packed)) == (created_at, 987654321012)
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from database.city_registry import city_registry
+from database.enums import PerformanceExperience
+from database.filter_index import IndexedProfile, ProfileFilterIndex
+from database.models import User
+from database.queries import _profile_filter_conditions
+
+SWIPER_ID = 1
+SWIPER_AGE = 30
+
+# (id, виден, возраст, уровень теории, опыт)
+PROFILES = [
+    (SWIPER_ID, True, SWIPER_AGE, 3, PerformanceExperience.TOURS),
+    (2, True, 28, 1, PerformanceExperience.NEVER),
+    (3, True, 32, 5, PerformanceExperience.TOURS),
+    (4, True, 33, None, None),
+    (5, True, 27, 4, PerformanceExperience.LOCAL_GIGS),
+    (6, True, None, 2, PerformanceExperience.NEVER),
+    (7, False, 30, 5, PerformanceExperience.TOURS),
+    (8, True, 30, 3, PerformanceExperience.PROFESSIONAL),
+]
+
+# Скалярные фильтры, которые можно выполнить и в индексе, и в SQL (sqlite);
+# фильтры по массивам (жанры, инструменты, города) используют операторы PostgreSQL
+FILTERS = [
+    None,
+    {"age_mode": "all"},
+    {"age_mode": "peers"},
+    {"age_mode": "older"},
+    {"age_mode": "younger"},
+    {"age_mode": "неизвестный"},
+    {"min_level": 3},
+    {"min_level": "Все"},
+    {"experience": [PerformanceExperience.TOURS.value, PerformanceExperience.NEVER.value]},
+    {"age_mode": "peers", "min_level": 2, "experience": [PerformanceExperience.TOURS.value]},
+]
+
+
+class _EmptyCities:
+    """Пустой справочник городов: индекс подбирает анкеты без учета расстояний."""
+
+    class _Result(list):
+        def all(self):
+            return self
+
+    async def execute(self, stmt):
+        return self._Result()
+
+
+@pytest.fixture(scope="module")
+def index():
+    profile_index = ProfileFilterIndex()
+    profile_index.load(
+        IndexedProfile(
+            id=user_id, is_visible=visible, age=age, theory_level=level,
+            experience=experience.value if experience else None,
+        )
+        for user_id, visible, age, level, experience in PROFILES
+    )
+    return profile_index
+
+
+@pytest.fixture(scope="module")
+def database():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, is_visible BOOLEAN, age INTEGER, "
+            "theoretical_knowledge_level INTEGER, has_performance_experience VARCHAR)"
+        ))
+        for user_id, visible, age, level, experience in PROFILES:
+            conn.execute(
+                text("INSERT INTO users VALUES (:id, :visible, :age, :level, :experience)"),
+                {"id": user_id, "visible": visible, "age": age, "level": level,
+                 "experience": experience.name if experience else None},
+            )
+    return engine
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cities():
+    if not city_registry.loaded:
+        asyncio.run(city_registry.load(_EmptyCities()))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+async def test_index_selects_what_sql_selects(index, database, filters):
+    conditions, _ = _profile_filter_conditions(SWIPER_ID, SWIPER_AGE, [], [], filters)
+    with database.connect() as conn:
+        expected = set(conn.execute(select(User.id).where(*conditions)).scalars())
+
+    assert set(index.select(SWIPER_ID, filters, [], limit=100)) == expected
+
+
+def test_age_modes_bounds(index):
+    def ages(mode):
+        return sorted(index.get_age(user_id) for user_id in index.select(SWIPER_ID, {"age_mode": mode}, [], 100))
+
+    assert ages("peers") == [28, 30, 32]
+    assert ages("older") == [32, 33]
+    assert ages("younger") == [27, 28]
+    # Неизвестный режим не фильтрует, анкета без возраста тоже остается
+    assert set(index.select(SWIPER_ID, {"age_mode": "неизвестный"}, [], 100)) == {2, 3, 4, 5, 6, 8}
+
+
+def test_swiper_hidden_and_excluded_profiles_are_not_selected(index):
+    assert set(index.select(SWIPER_ID, None, [2, 3], 100)) == {4, 5, 6, 8}
@@ -0,0 +1,122 @@
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetUpdates, SendMessage
+
+from utils import rate_limiter
+from utils.rate_limiter import (
+    TG_CHAT_BURST, TG_CHAT_RATE, TG_GROUP_BURST, TG_GROUP_RATE, TG_RETRY_AFTER_ATTEMPTS,
+    TelegramRateLimiter, TokenBucket,
+)
+
+
+class _Clock:
+    """Время, которое идет только когда его двигают: и для корзин, и для ожидания в middleware."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+class _Telegram:
+    """make_request: отвечает RetryAfter, пока не исчерпает retry_after_times."""
+
+    def __init__(self, retry_after_times=0):
+        self.retry_after_times = retry_after_times
+        self.requests = 0
+
+    async def __call__(self, bot, method):
+        self.requests += 1
+        if self.requests <= self.retry_after_times:
+            raise TelegramRetryAfter(method, "Flood control exceeded", retry_after=5)
+        return "ok"
+
+
+def _message(chat_id: int) -> SendMessage:
+    return SendMessage(chat_id=chat_id, text="анкета")
+
+
+def test_bucket_spends_burst_then_queues_by_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(5)] == [0, 0, 0, 0.5, 1.0]
+
+    # За секунду два ожидавших получили свои токены — новый запрос первый в очереди
+    clock.now += 1
+    assert bucket.reserve() == 0.5
+
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_pause_delays_next_tokens(clock):
+    bucket = TokenBucket(rate=1, burst=4)
+    bucket.pause(5)
+
+    assert bucket.reserve() == 6
+
+
+async def test_private_chat_waits_after_its_burst(clock):
+    limiter = TelegramRateLimiter()
+    telegram = _Telegram()
+
+    for _ in range(int(TG_CHAT_BURST) + 1):
+        assert await limiter(telegram, None, _message(42)) == "ok"
+
+    assert clock.sleeps == [pytest.approx(1 / TG_CHAT_RATE)]
+    # Другой чат не ждет чужой очереди
+    await limiter(telegram, None, _message(43))
+    assert len(clock.sleeps) == 1
+
+
+async def test_group_chat_has_its_own_limit(clock):
+    limiter = TelegramRateLimiter()
+    telegram = _Telegram()
+
+    for _ in range(int(TG_GROUP_BURST) + 1):
+        await limiter(telegram, None, _message(-100))
+
+    assert clock.sleeps == [pytest.approx(1 / TG_GROUP_RATE)]
+
+
+async def test_retry_after_pauses_chat_and_repeats_request(clock):
+    limiter = TelegramRateLimiter()
+    telegram = _Telegram(retry_after_times=1)
+
+    assert await limiter(telegram, None, _message(42)) == "ok"
+    assert telegram.requests == 2
+    # Повтор ждет паузы, о которой попросил Telegram
+    assert sum(clock.sleeps) >= 5
+
+
+async def test_retry_after_gives_up_after_attempts(clock):
+    limiter = TelegramRateLimiter()
+    telegram = _Telegram(retry_after_times=TG_RETRY_AFTER_ATTEMPTS + 1)
+
+    with pytest.raises(TelegramRetryAfter):
+        await limiter(telegram, None, _message(42))
+    assert telegram.requests == TG_RETRY_AFTER_ATTEMPTS + 1
+
+
+async def test_long_polling_is_not_throttled(clock):
+    limiter = TelegramRateLimiter()
+    telegram = _Telegram()
+
+    for _ in range(100):
+        await limiter(telegram, None, GetUpdates())
+
+    assert clock.sleeps == []
@@ -0,0 +1,85 @@
+import asyncio
+
+from database.seen_index import SeenIndex
+
+
+class _Loader:
+    """Отдает свайпы из словаря; gate позволяет придержать подгрузку."""
+
+    def __init__(self, swipes):
+        self.swipes = swipes
+        self.calls = []
+        self.gate = None
+
+    async def __call__(self, swiper_id):
+        self.calls.append(swiper_id)
+        if self.gate is not None:
+            await self.gate.wait()
+        return list(self.swipes.get(swiper_id, []))
+
+
+async def test_loaded_once_sorted_without_duplicates():
+    loader = _Loader({1: [30, 10, 20, 10]})
+    index = SeenIndex(loader)
+
+    assert list(await index.get(1)) == [10, 20, 30]
+    assert await index.contains(1, 20)
+    assert not await index.contains(1, 25)
+    assert loader.calls == [1]
+
+
+async def test_concurrent_gets_share_one_load():
+    loader = _Loader({1: [5]})
+    loader.gate = asyncio.Event()
+    index = SeenIndex(loader)
+
+    first = asyncio.create_task(index.get(1))
+    second = asyncio.create_task(index.get(1))
+    await asyncio.sleep(0)
+    loader.gate.set()
+
+    assert list(await first) == list(await second) == [5]
+    assert loader.calls == [1]
+
+
+async def test_swipe_during_load_is_not_lost():
+    loader = _Loader({1: [10]})
+    loader.gate = asyncio.Event()
+    index = SeenIndex(loader)
+
+    loading = asyncio.create_task(index.get(1))
+    await asyncio.sleep(0)
+    # Загрузчик уже прочитал БД и этот свайп не увидит
+    index.add(1, 5)
+    loader.gate.set()
+
+    assert list(await loading) == [5, 10]
+
+
+async def test_add_keeps_order_and_ignores_unloaded_swipers():
+    loader = _Loader({1: [10, 30]})
+    index = SeenIndex(loader)
+    await index.get(1)
+
+    index.add(1, 20)
+    index.add(1, 20)
+    assert list(await index.get(1)) == [10, 20, 30]
+
+    # Не загруженный свайпер подтянет свайп из БД при первом обращении
+    index.add(2, 7)
+    loader.swipes[2] = [7]
+    assert list(await index.get(2)) == [7]
+
+
+async def test_evicted_and_cleared_swipers_reload():
+    loader = _Loader({1: [1], 2: [2]})
+    index = SeenIndex(loader, max_entries=1)
+
+    await index.get(1)
+    await index.get(2)
+    await index.get(1)
+    assert loader.calls == [1, 2, 1]
+
+    index.clear()
+    await index.get(1)
+    assert loader.calls == [1, 2, 1, 1]
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database.models import City
+from database.session import after_commit, finish_transaction, track_failed_transactions
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    track_failed_transactions(engine)
+    City.__table__.create(engine)
+    return engine
+
+
+def _write(session: Session, name: str) -> None:
+    session.add(City(name=name))
+    session.flush()
+
+
+def test_after_commit_waits_for_commit_and_is_dropped_on_rollback(engine):
+    done = []
+    with Session(engine) as session:
+        _write(session, "Челябинск")
+        after_commit(lambda: done.append("committed"), session)
+        assert done == []
+        session.commit()
+        assert done == ["committed"]
+
+        _write(session, "Миасс")
+        after_commit(lambda: done.append("rolled back"), session)
+        session.rollback()
+        session.commit()
+        assert done == ["committed"]
+
+
+def test_after_commit_runs_at_once_without_writes(engine):
+    done = []
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        after_commit(lambda: done.append("now"), session)
+        assert done == ["now"]
+
+
+def test_savepoint_rollback_drops_only_its_callbacks(engine):
+    done = []
+    with Session(engine) as session:
+        _write(session, "Челябинск")
+        after_commit(lambda: done.append("outer"), session)
+
+        failed = session.begin_nested()
+        _write(session, "Миасс")
+        after_commit(lambda: done.append("failed savepoint"), session)
+        failed.rollback()
+
+        released = session.begin_nested()
+        after_commit(lambda: done.append("released savepoint"), session)
+        released.commit()
+        # Освобождение SAVEPOINT — еще не коммит
+        assert done == []
+
+        session.commit()
+        assert done == ["outer", "released savepoint"]
+
+
+class _UpdateSession:
+    """Сессия апдейта в той части, что нужна finish_transaction: соединение и исход транзакции."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.outcome = None
+
+    def in_transaction(self):
+        return self._connection.in_transaction()
+
+    async def connection(self):
+        return self._connection
+
+    async def commit(self):
+        self.outcome = "commit"
+        self._connection.commit()
+
+    async def rollback(self):
+        self.outcome = "rollback"
+        self._connection.rollback()
+
+
+def _fail(connection) -> None:
+    with pytest.raises(OperationalError):
+        connection.execute(text("SELECT * FROM missing_table"))
+
+
+async def test_failed_statement_rolls_back_update_transaction(engine):
+    with engine.connect() as connection:
+        session = _UpdateSession(connection)
+        connection.execute(text("SELECT 1"))
+        _fail(connection)
+
+        await finish_transaction(session)
+        assert session.outcome == "rollback"
+
+        # Следующая транзакция начинается исправной
+        connection.execute(text("SELECT 1"))
+        await finish_transaction(session)
+        assert session.outcome == "commit"
+
+
+async def test_error_recovered_by_savepoint_does_not_roll_back(engine):
+    with engine.connect() as connection:
+        session = _UpdateSession(connection)
+        connection.execute(text("SELECT 1"))
+        savepoint = connection.begin_nested()
+        _fail(connection)
+        savepoint.rollback()
+
+        await finish_transaction(session)
+        assert session.outcome == "commit"
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timezone
+
+from database.enums import Actions
+from database.swipe_buffer import SWIPE_FLUSH_RETRIES, Swipe, SwipeWriteBuffer
+
+BROKEN_TARGET = 13
+
+
+def _swipe(target_id: int, swiper_id: int = 1) -> Swipe:
+    return Swipe(swiper_id, target_id, Actions.SKIP, datetime.now(timezone.utc))
+
+
+class _Writer:
+    """Пачка с битым свайпом падает целиком, как INSERT с нарушением внешнего ключа."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.written = []
+
+    async def __call__(self, batch):
+        self.attempts += 1
+        if any(swipe.target_id == BROKEN_TARGET for swipe in batch):
+            raise RuntimeError("битая строка")
+        self.written.extend(batch)
+
+
+def _buffer(writer: _Writer) -> SwipeWriteBuffer:
+    # Фоновый сброс не успеет сработать — пачки пишем явным flush()
+    return SwipeWriteBuffer(writer, flush_interval=3600)
+
+
+async def test_failed_batch_is_retried_then_written_one_by_one():
+    writer = _Writer()
+    buffer = _buffer(writer)
+    for target_id in (10, BROKEN_TARGET, 11):
+        buffer.add(_swipe(target_id))
+
+    for _ in range(SWIPE_FLUSH_RETRIES - 1):
+        await buffer.flush()
+        # Пачка вернулась в буфер и по-прежнему видна как непросмотренная запись
+        assert buffer.pending_targets(1) == {10, BROKEN_TARGET, 11}
+        assert writer.written == []
+
+    await buffer.flush()
+    # Последняя попытка — пачкой, затем по одному свайпу; битый отброшен
+    assert writer.attempts == SWIPE_FLUSH_RETRIES + 3
+    assert [swipe.target_id for swipe in writer.written] == [10, 11]
+    assert buffer.pending_targets(1) == set()
+    await buffer.stop()
+
+
+async def test_failed_batch_stays_ahead_of_swipes_added_during_retries():
+    writer = _Writer()
+    buffer = _buffer(writer)
+    buffer.add(_swipe(BROKEN_TARGET))
+    await buffer.flush()
+
+    buffer.add(_swipe(20))
+    assert buffer.pending_targets(1) == {BROKEN_TARGET, 20}
+
+    for _ in range(SWIPE_FLUSH_RETRIES - 1):
+        await buffer.flush()
+    # Свайпы пишутся в порядке действий: сначала вернувшаяся пачка, затем новые
+    assert [swipe.target_id for swipe in writer.written] == [20]
+    assert buffer.pending_targets(1) == set()
+    await buffer.stop()
+
+
+async def test_stop_flushes_the_rest():
+    writer = _Writer()
+    buffer = _buffer(writer)
+    buffer.add(_swipe(10))
+    buffer.add(_swipe(11, swiper_id=2))
+    await buffer.stop()
+
+    assert sorted(swipe.target_id for swipe in writer.written) == [10, 11]
+
+
+async def test_full_batch_is_flushed_without_waiting_for_interval():
+    writer = _Writer()
+    buffer = SwipeWriteBuffer(writer, flush_interval=3600, max_batch=2)
+    buffer.add(_swipe(10))
+    buffer.add(_swipe(11))
+    # Интервал в час: запись сразу возможна только досрочным сбросом
+    for _ in range(100):
+        if writer.written:
+            break
+        await asyncio.sleep(0.01)
+
+    assert [swipe.target_id for swipe in writer.written] == [10, 11]
+    await buffer.stop()
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Delete, Insert
+
+from database import queries
+from database.enums import Actions
+from database.swipe_buffer import Swipe
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def tuples(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _Session:
+    """Отвечает на чтение свайпов пачки из stored и запоминает вставки и удаления по таблицам."""
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.inserted = {}
+        self.deleted = {}
+
+    async def execute(self, stmt):
+        if isinstance(stmt, Insert):
+            self.inserted.setdefault(stmt.table.name, []).extend(_rows(stmt))
+        elif isinstance(stmt, Delete):
+            params = stmt.compile(dialect=postgresql.dialect()).params
+            self.deleted.setdefault(stmt.table.name, []).extend(*params.values())
+        else:
+            return _Result([(swiper_id, target_id, action) for (swiper_id, target_id), action in self.stored.items()])
+
+
+def _rows(stmt: Insert) -> list:
+    """Строки многострочного INSERT из его параметров: user_id_m0, liker_id_m0, user_id_m1..."""
+    rows = {}
+    for key, value in stmt.compile(dialect=postgresql.dialect()).params.items():
+        column, _, number = key.rpartition("_m")
+        if not number.isdigit():
+            column, number = key, "0"
+        rows.setdefault(int(number), {})[column] = value
+    return [rows[number] for number in sorted(rows)]
+
+
+def _swipe(swiper_id: int, target_id: int, action: Actions = Actions.LIKE) -> Swipe:
+    return Swipe(swiper_id, target_id, action, NOW)
+
+
+async def test_second_like_of_pair_creates_match_for_both():
+    session = _Session({(1, 2): Actions.LIKE, (2, 1): Actions.LIKE})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2)])
+
+    assert session.inserted["matches"] == [
+        {"user_id": 1, "matched_user_id": 2, "created_at": NOW},
+        {"user_id": 2, "matched_user_id": 1, "created_at": NOW},
+    ]
+    assert "like_inbox" not in session.inserted
+
+
+async def test_like_answering_skip_is_not_a_match():
+    session = _Session({(1, 2): Actions.LIKE, (2, 1): Actions.SKIP})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2)])
+
+    assert session.inserted == {}
+
+
+async def test_both_likes_in_one_batch_make_one_match():
+    session = _Session({(1, 2): Actions.LIKE, (2, 1): Actions.LIKE})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2), _swipe(2, 1)])
+
+    assert sorted((row["user_id"], row["matched_user_id"]) for row in session.inserted["matches"]) == [(1, 2), (2, 1)]
+
+
+async def test_swipe_not_stored_has_no_effects():
+    # В БД остался прежний пропуск: повторный свайп той же пары не записался
+    session = _Session({(1, 2): Actions.SKIP, (2, 1): Actions.LIKE})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2)])
+
+    assert session.inserted == {}
+
+
+async def test_like_goes_to_inbox_until_recipient_swipes():
+    session = _Session({(1, 2): Actions.LIKE})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2)])
+
+    assert session.inserted["like_inbox"] == [{"user_id": 2, "liker_id": 1, "created_at": NOW}]
+    assert "matches" not in session.inserted
+
+
+async def test_like_to_someone_who_already_swiped_skips_inbox():
+    session = _Session({(1, 2): Actions.LIKE, (2, 1): Actions.SKIP})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2)])
+
+    assert "like_inbox" not in session.inserted
+
+
+async def test_any_swipe_answers_incoming_like():
+    session = _Session({(2, 1): Actions.LIKE, (1, 2): Actions.SKIP, (1, 3): Actions.SKIP})
+
+    await queries._write_swipe_effects(session, [_swipe(1, 2, Actions.SKIP), _swipe(1, 3, Actions.SKIP)])
+
+    # Входящий лайк от 2 к 1 убирается, даже если 1 пропустил анкету
+    assert session.deleted["like_inbox"] == [(1, 2), (1, 3)]
+    assert session.inserted == {}
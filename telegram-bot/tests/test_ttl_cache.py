@@ -0,0 +1,43 @@
+from database import ttl_cache
+from database.ttl_cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entry_expires_after_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    counts = TTLCache(ttl=60)
+
+    counts.set(1, 3)
+    clock.now += 59
+    assert counts.get(1) == 3
+
+    clock.now += 2
+    assert counts.get(1) is None
+
+
+def test_invalidate_drops_cached_count():
+    counts = TTLCache(ttl=60)
+    counts.set(1, 3)
+    counts.invalidate(1)
+
+    assert counts.get(1) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    counts = TTLCache(ttl=60, max_entries=2)
+    counts.set(1, 1)
+    counts.set(2, 2)
+    counts.get(1)
+    counts.set(3, 3)
+
+    assert counts.get(1) == 1
+    assert counts.get(2) is None
+    assert counts.get(3) == 3
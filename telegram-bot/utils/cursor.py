@@ -0,0 +1,13 @@
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_ts(value: datetime) -> int:
+    """Время для курсора в callback_data / FSM: микросекунды с начала эпохи."""
+    # Целочисленно, без float — курсор должен точно совпадать со значением в БД
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def decode_ts(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
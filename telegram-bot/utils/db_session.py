@@ -0,0 +1,62 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from database.session import AsyncSessionLocal, current_session, finish_transaction
+
+logger = logging.getLogger(__name__)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на апдейт: запросы хендлера идут через одну сессию.
+    Единица транзакции — запросы хендлера между обращениями к Telegram: перед каждым запросом
+    к Telegram транзакция коммитится (см. CommitBeforeTelegramRequest), поэтому хендлер,
+    который пишет в БД, отвечает и снова пишет, выполняет несколько транзакций.
+    Сессия доступна хендлерам как data["session"], а функции из database.queries подхватывают ее сами.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]) -> Any:
+        async with AsyncSessionLocal() as session:
+            token = current_session.set(session)
+            data["session"] = session
+            try:
+                result = await handler(event, data)
+                await finish_transaction(session)
+                return result
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                current_session.reset(token)
+
+
+class CommitBeforeTelegramRequest(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: перед запросом к Telegram коммитит транзакцию апдейта.
+    Иначе соединение с БД простаивает в транзакции, пока идет отправка и ожидание лимитов
+    TelegramRateLimiter, и серия карточек нескольким чатам выбирает весь пул.
+    Следующий запрос хендлера к БД начнет новую транзакцию — это и есть граница транзакций апдейта.
+    Транзакцию, в которой упал пойманный хендлером запрос, откатывает вместо коммита.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        session = current_session.get()
+        # Внутри SAVEPOINT (database.session.savepoint) коммитить нельзя — транзакцию завершит владелец
+        if session is not None and not session.in_nested_transaction():
+            await finish_transaction(session)
+        return await make_request(bot, method)
@@ -0,0 +1,57 @@
+import functools
+import json
+import logging
+import os
+from typing import Optional, Tuple
+
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+
+logger = logging.getLogger(__name__)
+
+# Где хранить состояние FSM: memory — в процессе бота (одна реплика), redis — общее для всех реплик
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+# Адрес Redis (или совместимого сервера) для FSM_STORAGE=redis
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Через сколько секунд без действий забываем брошенную сессию (ленту, фильтры, регистрацию)
+FSM_TTL = int(os.getenv("FSM_TTL", str(7 * 24 * 3600)))
+# Префикс ключей — несколько ботов могут жить в одном Redis
+FSM_KEY_PREFIX = os.getenv("FSM_KEY_PREFIX", "fsm")
+# Блокировать параллельную обработку апдейтов одного чата на разных репликах
+FSM_EVENT_ISOLATION = os.getenv("FSM_EVENT_ISOLATION", "1") == "1"
+
+# Данные FSM — буферы карточек и фильтры: без пробелов и без \u-экранирования кириллицы
+_compact_dumps = functools.partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+
+
+def redis_storage(redis) -> Tuple[BaseStorage, Optional[BaseEventIsolation]]:
+    """
+    Хранилище FSM поверх готового клиента redis.asyncio.Redis
+    (в тестах подходит fakeredis.aioredis.FakeRedis; блокировке изоляции нужен Lua — fakeredis[lua]).
+    """
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    storage = RedisStorage(
+        redis=redis,
+        key_builder=DefaultKeyBuilder(prefix=FSM_KEY_PREFIX),
+        state_ttl=FSM_TTL,
+        data_ttl=FSM_TTL,
+        json_dumps=_compact_dumps,
+    )
+    isolation = storage.create_isolation() if FSM_EVENT_ISOLATION else None
+    return storage, isolation
+
+
+def create_fsm_storage() -> Tuple[BaseStorage, Optional[BaseEventIsolation]]:
+    """Хранилище FSM и изоляция апдейтов для Dispatcher по FSM_STORAGE."""
+    if FSM_STORAGE == "memory":
+        return MemoryStorage(), None
+
+    if FSM_STORAGE == "redis":
+        # redis нужен только этому режиму
+        from redis.asyncio import Redis
+
+        logger.info("Состояние FSM хранится в Redis, TTL сессии %s с", FSM_TTL)
+        return redis_storage(Redis.from_url(REDIS_URL))
+
+    raise ValueError(f"Неизвестное FSM_STORAGE: {FSM_STORAGE!r} (ожидается memory или redis)")
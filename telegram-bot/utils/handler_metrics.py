@@ -0,0 +1,69 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+
+from metrics.handlers.counters import updates_received, handler_errors
+from metrics.handlers.gauges import updates_in_progress
+from metrics.handlers.histograms import handler_duration, update_duration
+
+
+def handler_name(callback: Callable) -> str:
+    """Метка хендлера: последний компонент модуля и имя функции, например show_profiles.like."""
+    module = getattr(callback, "__module__", None) or "unknown"
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', type(callback).__name__)}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware апдейтов: тип апдейта, чем закончилась обработка, общее время и число апдейтов в работе."""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]) -> Any:
+        update_type = event.event_type
+        started = time.perf_counter()
+        status = "error"
+        updates_in_progress.inc()
+        try:
+            result = await handler(event, data)
+            status = "unhandled" if result is UNHANDLED else "handled"
+            return result
+        finally:
+            updates_in_progress.dec()
+            update_duration.labels(type=update_type).observe(time.perf_counter() - started)
+            updates_received.labels(type=update_type, status=status).inc()
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: вызывается уже для выбранного хендлера (data["handler"]),
+    поэтому время и ошибки пишутся с меткой конкретной функции.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]) -> Any:
+        name = handler_name(data["handler"].callback)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.labels(handler=name, error=type(e).__name__).inc()
+            raise
+        finally:
+            handler_duration.labels(handler=name).observe(time.perf_counter() - started)
+
+
+def setup_handler_metrics(dp: Dispatcher) -> None:
+    """Подключает метрики ко всем типам событий диспетчера; внутренние middleware наследуются вложенными роутерами."""
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(handler_metrics)
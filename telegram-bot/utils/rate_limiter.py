@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetUpdates, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from database.ttl_cache import TTLCache
+from metrics.telegram.counters import telegram_api_throttled, telegram_api_retry_after
+from metrics.telegram.gauges import telegram_api_queue_depth
+from metrics.telegram.histograms import telegram_api_throttle_wait
+
+logger = logging.getLogger(__name__)
+
+# Общий лимит запросов бота к Telegram API (в секунду) и допустимый всплеск
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))
+TG_GLOBAL_BURST = float(os.getenv("TG_GLOBAL_BURST", "30"))
+# Лимит сообщений в один личный чат: карточка анкеты — это фото, аудио и текст подряд
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "1"))
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", "4"))
+# Лимит сообщений в одну группу — Telegram разрешает около 20 в минуту
+TG_GROUP_RATE = float(os.getenv("TG_GROUP_RATE", str(20 / 60)))
+TG_GROUP_BURST = float(os.getenv("TG_GROUP_BURST", "3"))
+# Сколько раз повторяем запрос после RetryAfter, прежде чем отдать ошибку хендлеру
+TG_RETRY_AFTER_ATTEMPTS = int(os.getenv("TG_RETRY_AFTER_ATTEMPTS", "3"))
+
+
+class TokenBucket:
+    """
+    Корзина токенов с резервированием: запрос сразу занимает токен (баланс может уйти в минус)
+    и получает время, которое нужно подождать. Очередь ожидающих обслуживается по порядку прихода.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Занимает токен и возвращает, сколько секунд ждать до его появления."""
+        self._refill()
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены ближайшие seconds секунд (ответ RetryAfter от Telegram)."""
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self._rate)
+
+
+class TelegramRateLimiter(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: выравнивает исходящие запросы под лимиты Telegram
+    (общий и на чат) и прозрачно повторяет запросы после RetryAfter.
+    """
+
+    def __init__(self):
+        self._global = TokenBucket(TG_GLOBAL_RATE, TG_GLOBAL_BURST)
+        # chat_id -> TokenBucket; простаивающая корзина полна, ее можно забыть
+        self._chats = TTLCache(ttl=300, max_entries=100000)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательный id — группа или канал
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(TG_GROUP_RATE, TG_GROUP_BURST)
+            else:
+                bucket = TokenBucket(TG_CHAT_RATE, TG_CHAT_BURST)
+        self._chats.set(chat_id, bucket)
+        return bucket
+
+    async def _wait_turn(self, chat_id) -> None:
+        started = time.monotonic()
+        telegram_api_queue_depth.inc()
+        try:
+            # Сначала очередь чата, потом общая: токен общего лимита не простаивает,
+            # пока запрос ждет своего чата
+            if chat_id is not None:
+                delay = self._chat_bucket(chat_id).reserve()
+                if delay:
+                    telegram_api_throttled.labels(scope="chat").inc()
+                    await asyncio.sleep(delay)
+
+            delay = self._global.reserve()
+            if delay:
+                telegram_api_throttled.labels(scope="global").inc()
+                await asyncio.sleep(delay)
+        finally:
+            telegram_api_queue_depth.dec()
+            telegram_api_throttle_wait.observe(time.monotonic() - started)
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        # Long polling не отправляет сообщений и держит соединение подолгу
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        attempt = 0
+        while True:
+            await self._wait_turn(chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                telegram_api_retry_after.labels(method=type(method).__name__).inc()
+                if attempt > TG_RETRY_AFTER_ATTEMPTS:
+                    raise
+
+                logger.warning("Telegram просит подождать %s с (%s, чат %s), попытка %s",
+                               e.retry_after, type(method).__name__, chat_id, attempt)
+                # Пауза через корзину: ждет не только этот запрос, но и все следующие в тот же чат
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self._global
+                bucket.pause(e.retry_after)
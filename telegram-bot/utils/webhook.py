@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from metrics.webhook.counters import webhook_unauthorized
+from metrics.webhook.gauges import webhook_updates_in_progress
+from metrics.webhook.histograms import webhook_worker_wait
+
+logger = logging.getLogger(__name__)
+
+# Публичный адрес бота (https://...), на который Telegram шлет апдейты
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+# Путь вебхука на сервере
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+# Секрет из заголовка X-Telegram-Bot-Api-Secret-Token; пустой — без проверки (только для локальной отладки)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# Адрес и порт сервера вебхука; /metrics отдается с него же
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8000"))
+# Сколько апдейтов обрабатываем одновременно (и в вебхуке, и в поллинге); остальные ждут свободного воркера
+MAX_UPDATE_WORKERS = int(os.getenv("MAX_UPDATE_WORKERS", "64"))
+# Регистрировать вебхук в Telegram при старте (выключить, если это делает деплой)
+WEBHOOK_SET_ON_STARTUP = os.getenv("WEBHOOK_SET_ON_STARTUP", "1") == "1"
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Отвечает Telegram сразу, а апдейт обрабатывает в фоне — но не больше max_workers одновременно.
+    Когда все воркеры заняты, запрос ждет слота: Telegram видит медленный ответ
+    и сам притормаживает отправку, вместо неограниченного роста числа задач.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_workers: int, **kwargs: Any) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self._workers = asyncio.Semaphore(max_workers)
+
+    def verify_secret(self, telegram_secret_token: str, bot: Bot) -> bool:
+        if super().verify_secret(telegram_secret_token, bot):
+            return True
+        webhook_unauthorized.inc()
+        return False
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+
+        started = time.perf_counter()
+        await self._workers.acquire()
+        webhook_worker_wait.observe(time.perf_counter() - started)
+
+        task = asyncio.create_task(self._run_worker(bot, update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _run_worker(self, bot: Bot, update: Dict[str, Any]) -> None:
+        webhook_updates_in_progress.inc()
+        try:
+            await self._background_feed_update(bot=bot, update=update)
+        except Exception:
+            logger.exception("Ошибка при обработке апдейта %s из вебхука", update.get("update_id"))
+        finally:
+            webhook_updates_in_progress.dec()
+            self._workers.release()
+
+    async def close(self) -> None:
+        # Дожидаемся начатых апдейтов до закрытия сессии бота и остановки буферов записи
+        if self._background_feed_update_tasks:
+            await asyncio.gather(*self._background_feed_update_tasks, return_exceptions=True)
+        await super().close()
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(body=generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """aiohttp-приложение: POST WEBHOOK_PATH для Telegram и GET /metrics для Prometheus."""
+    app = web.Application()
+
+    # Обработчик регистрируется раньше диспетчера: при остановке сначала дорабатывают апдейты,
+    # потом shutdown диспетчера сбрасывает буферы свайпов и аналитики
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_workers=MAX_UPDATE_WORKERS,
+        secret_token=WEBHOOK_SECRET or None,
+    ).register(app, path=WEBHOOK_PATH)
+    app.router.add_get("/metrics", _metrics)
+    setup_application(app, dp, bot=bot)
+
+    if WEBHOOK_SET_ON_STARTUP:
+        async def set_webhook(_: web.Application) -> None:
+            if not WEBHOOK_BASE_URL:
+                raise RuntimeError("BOT_MODE=webhook требует WEBHOOK_BASE_URL")
+            await bot.set_webhook(
+                url=WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=min(MAX_UPDATE_WORKERS, 100),
+            )
+            logger.info("Вебхук зарегистрирован: %s%s", WEBHOOK_BASE_URL, WEBHOOK_PATH)
+
+        app.on_startup.append(set_webhook)
+
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Запускает сервер вебхука и работает до SIGTERM/SIGINT."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(build_webhook_app(dp, bot))
+    await runner.setup()
+    site = web.TCPSite(runner, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+    await site.start()
+    logger.info("Вебхук слушает %s:%s%s, воркеров: %s", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, MAX_UPDATE_WORKERS)
+
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()